@@ -0,0 +1,233 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+"""
+Re-solve recorded bombs from a JSONL file, on all cores.
+
+Each line of the input is a bomb, with its edgework as for the ``new``
+request of `server`, and the modules to solve in order:
+
+    {"id": 7, "serial": "ipzcv0", "batteries": 1, "parallel": true,
+     "modules": [{"module": "wires", "args": ["wbk"]},
+                 {"module": "simon", "observations": ["r", "g"]},
+                 {"module": "strike"}]}
+
+Single-step modules are called with their ``args``. Multi-step modules are
+started with their ``args``, if any, and sent each of their
+``observations``, giving the list of results. A ``strike`` gives the number
+of strikes so far. Each line of the output has the ``id`` of the bomb, if
+any, and the ``answers`` of its modules in order. A module which fails has
+an ``error`` message in place of its answer, and a bomb which cannot be made
+has an ``error`` message instead of answers. Modules are never asked for
+more observations: a button without its strip colour is an error.
+
+Run ``python batch.py bombs.jsonl answers.jsonl --workers 8``. The input is
+read in chunks, which are solved in a process pool, and the answers are
+written in input order. Only a few chunks per worker are held at any time,
+whatever the size of the file. Reads standard input and writes standard
+output by default, and reports the throughput on standard error.
+
+Requires Python 3.
+
+"""
+import argparse
+import collections
+import concurrent.futures
+import itertools
+import json
+import os
+import sys
+import time
+
+from solver import Bomb, MACHINES, SOLVERS, solve_module, start_module
+
+
+def solve_record(record):
+    """
+    Solve the modules of a recorded bomb.
+
+    Parameters
+    ----------
+    record : dict
+        The decoded bomb, as described in the module docstring.
+
+    Returns
+    -------
+    dict
+        The answers.
+
+    """
+    answer = {}
+    if "id" in record:
+        answer["id"] = record["id"]
+    try:
+        bomb = Bomb(record["serial"], record.get("batteries", 0),
+                    has_parallel=record.get("parallel", False),
+                    frk=record.get("frk", False), car=record.get("car", False))
+    except Exception as error:
+        answer["error"] = "{}: {}".format(type(error).__name__, error)
+        return answer
+
+    answers = answer["answers"] = []
+    for module in record.get("modules", ()):
+        try:
+            answers.append(_solve_module(bomb, module))
+        except Exception as error:
+            answers.append({"error": "{}: {}".format(type(error).__name__,
+                                                     error)})
+    return answer
+
+
+def _solve_module(bomb, module):
+    """Solve a single recorded module."""
+    name = module["module"]
+    args = module.get("args", [])
+    if name == "strike":
+        bomb.strike()
+        return bomb.n_strikes
+    elif name in SOLVERS:
+        return solve_module(bomb, name, args)
+    elif name in MACHINES:
+        machine = start_module(bomb, name, args)
+        return [machine.send(observation)
+                for observation in module.get("observations", ())]
+    raise ValueError("Unknown module: {}".format(name))
+
+
+def solve_chunk(lines):
+    """
+    Solve a chunk of the input.
+
+    Parameters
+    ----------
+    lines : list of str
+        The lines of the chunk.
+
+    Returns
+    -------
+    output : str
+        The answers, one line per input line.
+    n_errors : int
+        The number of bombs and modules which failed.
+
+    """
+    output = []
+    n_errors = 0
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            answer = {"error": "Invalid JSON"}
+        else:
+            if isinstance(record, dict):
+                answer = solve_record(record)
+            else:
+                answer = {"error": "Not a bomb"}
+        n_errors += "error" in answer
+        n_errors += sum(isinstance(result, dict) and "error" in result
+                        for result in answer.get("answers", ()))
+        output.append(json.dumps(answer) + "\n")
+    return "".join(output), n_errors
+
+
+def _chunks(lines, chunk_size):
+    """Split the non-blank lines into lists of at most `chunk_size`."""
+    lines = (line for line in lines if line.strip())
+    while True:
+        chunk = list(itertools.islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run(lines, output, workers=None, chunk_size=1000, pending=4,
+        progress=None, report=sys.stderr):
+    """
+    Solve every recorded bomb on a process pool.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        The input, one bomb per line. Blank lines are skipped.
+    output : file-like
+        Where to write the answers, one line per bomb, in input order.
+    workers : int, optional
+        The number of worker processes. Defaults to the number of cores.
+    chunk_size : int, optional
+        The number of bombs sent to a worker at once.
+    pending : int, optional
+        The number of chunks in flight per worker. The input is only read
+        ahead by this many chunks.
+    progress : float, optional
+        Report the throughput every so many seconds. By default, it is only
+        reported at the end.
+    report : file-like, optional
+        Where to report the throughput. None for nowhere.
+
+    Returns
+    -------
+    dict
+        The number of ``records`` and ``errors``, the elapsed ``seconds``, and
+        the ``records_per_second``.
+
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = {"records": 0, "errors": 0}
+    start = last_report = time.perf_counter()
+    in_flight = collections.deque()
+
+    def collect():
+        nonlocal last_report
+        chunk, n_records = in_flight.popleft()
+        answers, n_errors = chunk.result()
+        output.write(answers)
+        stats["records"] += n_records
+        stats["errors"] += n_errors
+        now = time.perf_counter()
+        if progress is not None and now - last_report >= progress:
+            last_report = now
+            _report(report, stats, now - start)
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        for chunk in _chunks(lines, chunk_size):
+            if len(in_flight) >= workers * pending:
+                collect()
+            in_flight.append((pool.submit(solve_chunk, chunk), len(chunk)))
+        while in_flight:
+            collect()
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["records_per_second"] = stats["records"] / stats["seconds"]
+    _report(report, stats, stats["seconds"])
+    return stats
+
+
+def _report(report, stats, seconds):
+    if report is not None:
+        report.write("{} records, {} errors in {:.2f} s: {:.0f} records/s\n"
+                     .format(stats["records"], stats["errors"], seconds,
+                             stats["records"] / seconds))
+        report.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("input", nargs="?", default="-",
+                        help="the recorded bombs, or - for standard input")
+    parser.add_argument("output", nargs="?", default="-",
+                        help="the answers, or - for standard output")
+    parser.add_argument("--workers", type=int,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="bombs sent to a worker at once")
+    parser.add_argument("--progress", type=float, metavar="SECONDS",
+                        help="report the throughput every so many seconds")
+    args = parser.parse_args()
+    source = sys.stdin if args.input == "-" else open(args.input)
+    sink = sys.stdout if args.output == "-" else open(args.output, "w")
+    with source, sink:
+        run(source, sink, args.workers, args.chunk_size,
+            progress=args.progress)
+
+
+if __name__ == "__main__":
+    main()
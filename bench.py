@@ -0,0 +1,464 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+"""
+Benchmark every `Bomb` method, and flag regressions against a baseline.
+
+Each method is run over a seeded corpus of random modules on random bombs.
+The interactive methods read their observations from a script instead of
+standard input, and their output is discarded. The machines behind them are
+driven directly under the name of their factory, such as ``simon_machine``.
+
+For each method, the per-call latency percentiles, the throughput, and the
+peak memory allocated per call are reported.
+
+Run ``python bench.py --output results.json`` to save the results, and
+``python bench.py --baseline results.json`` to compare a later run with them.
+The exit status is one if anything got slower than the threshold allows.
+
+Requires Python 3.9 or later.
+
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import solver
+from bench_memory import edgework
+from solver import (Bomb, FREQUENCIES, KEYPAD_COLUMNS, MORSE_LETTERS,
+                    ORDINALS, PASSWORDS, WHOS_RESPONSES, WIRE_COLOURS,
+                    _MAZE_INDEX, _WHOS_DISPLAYS)
+
+
+_MORSE_CODES = dict((letter, code) for code, letter in MORSE_LETTERS.items())
+
+_WHOS_LABELS = sorted(WHOS_RESPONSES)
+
+_KNOB_ROWS = ("001011", "011001", "000010", "101010", "111111", "101010")
+
+
+class Call(object):
+    """
+    A single benchmarked call.
+
+    Parameters
+    ----------
+    bomb : Bomb
+        The bomb to call the method on.
+    args : tuple
+        The arguments of the method.
+    lines : list of str, optional
+        The lines read from standard input during the call.
+    observations : list of str, optional
+        If given, the method returns a state machine, and these are sent to it.
+
+    """
+    __slots__ = ("bomb", "args", "lines", "observations")
+
+    def __init__(self, bomb, args=(), lines=(), observations=None):
+        self.bomb = bomb
+        self.args = args
+        self.lines = lines
+        self.observations = observations
+
+
+class _Script(object):
+    """Stand-in for `input`, which reads lines from a list."""
+    def __init__(self):
+        self.lines = iter(())
+
+    def __call__(self, prompt=""):
+        try:
+            return next(self.lines)
+        except StopIteration:
+            # Interactive modules which never finish stop on an interrupt.
+            raise KeyboardInterrupt
+
+
+def _wires(rng):
+    return "".join(rng.choice(WIRE_COLOURS)
+                   for _ in range(rng.randrange(3, 7)))
+
+
+def _keys(rng):
+    keys = rng.sample(rng.choice(KEYPAD_COLUMNS), 4)
+    rng.shuffle(keys)
+    return tuple(keys)
+
+
+def _flashes(rng):
+    return ["".join(rng.choice("bgry") for _ in range(rng.randrange(1, 6)))
+            for _ in range(5)]
+
+
+def _whos(rng):
+    lines = []
+    for _ in range(3):
+        lines.append(rng.choice(sorted(_WHOS_DISPLAYS) + ["blank display"]))
+        lines.append(rng.choice(_WHOS_LABELS))
+    return lines
+
+
+def _memory(rng):
+    machine = solver.MemoryMachine()
+    lines = []
+    while not machine.done:
+        lines.append(str(rng.randrange(1, 5)))
+        machine.send(lines[-1])
+        if machine.prompt == "Button label: ":
+            lines.append(str(rng.randrange(1, 5)))
+        else:
+            lines.append(rng.choice(ORDINALS[:4]))
+        machine.send(lines[-1])
+    return lines
+
+
+def _morse(rng):
+    return list(rng.choice(sorted(FREQUENCIES)))
+
+
+def _signal(rng):
+    word = rng.choice(sorted(FREQUENCIES))
+    signal = "".join(_MORSE_CODES[letter] for letter in word.upper())
+    return signal[:rng.randrange(4, len(signal) + 1)]
+
+
+def _timing(rng):
+    """Time a looping signal from a random point, with some jitter."""
+    word = rng.choice(sorted(FREQUENCIES))
+    unit = rng.uniform(0.05, 0.5)
+    events = []
+    for _ in range(3):
+        for letter in word.upper():
+            for symbol in _MORSE_CODES[letter]:
+                events.append((True, unit * (1 if symbol == "." else 3)))
+                events.append((False, unit))
+            events[-1] = (False, unit * 3)
+        events[-1] = (False, unit * 7)
+    events = [(lit, duration * rng.uniform(0.8, 1.2))
+              for lit, duration in events]
+    return events[rng.randrange(len(events) // 3):]
+
+
+def _complicated(rng):
+    return ["".join((rng.choice("01"), rng.choice("rbsn"), rng.choice("01")))
+            for _ in range(6)]
+
+
+def _sequences(rng):
+    return [rng.choice("rbk") + rng.choice("abc") for _ in range(9)]
+
+
+def _maze(rng):
+    return (rng.choice(sorted(_MAZE_INDEX)),
+            (rng.randrange(6), rng.randrange(6)),
+            (rng.randrange(6), rng.randrange(6)))
+
+
+def _columns(rng):
+    password = rng.choice(PASSWORDS)
+    columns = []
+    for letter in password:
+        others = rng.sample("abcdefghijklmnopqrstuvwxyz", 5)
+        columns.append(letter + "".join(others))
+    return columns
+
+
+def _passwords(bomb, rng):
+    columns = _columns(rng)
+    initial = "".join(rng.choice(column) for column in columns)
+    return Call(bomb, (initial,), columns)
+
+
+def _bomb_modules(rng):
+    """Observe a whole bomb, with a few modules still needing live input."""
+    return [
+        {"module": "wires", "args": [_wires(rng)]},
+        {"module": "button",
+         "args": [rng.choice(("abort", "detonate", "hold", "press")),
+                  rng.choice("brwyn")]},
+        {"module": "keypad", "args": list(_keys(rng))},
+        {"module": "maze", "args": list(_maze(rng))},
+        {"module": "complicated_panel", "args": [_complicated(rng)]},
+        {"module": "knob", "args": [rng.choice(_KNOB_ROWS)]},
+        {"module": "simon", "observations": _flashes(rng)[:1]},
+        {"module": "whos"},
+        {"module": "memory"},
+    ]
+
+
+# The calls to benchmark, by method, as a function of the bomb and a random
+# number generator.
+GENERATORS = {
+    "wires": lambda bomb, rng: Call(bomb, (_wires(rng),)),
+    "wires_batch": lambda bomb, rng: Call(
+        bomb, ([_wires(rng) for _ in range(50)],)),
+    "button": lambda bomb, rng: Call(
+        bomb, (rng.choice(("abort", "detonate", "hold", "press", "other")),
+               rng.choice("brwyn")), [rng.choice("bwy")]),
+    "keypad": lambda bomb, rng: Call(bomb, _keys(rng)),
+    "keypad_batch": lambda bomb, rng: Call(
+        bomb, ([_keys(rng) for _ in range(50)],)),
+    "simon": lambda bomb, rng: Call(bomb, lines=_flashes(rng)),
+    "simon_machine": lambda bomb, rng: Call(
+        bomb, observations=_flashes(rng)),
+    "whos": lambda bomb, rng: Call(bomb, lines=_whos(rng)),
+    "whos_machine": lambda bomb, rng: Call(bomb, observations=_whos(rng)),
+    "whos_step": lambda bomb, rng: Call(
+        bomb, (rng.choice(sorted(_WHOS_DISPLAYS)),
+               rng.sample(_WHOS_LABELS, 6))),
+    "memory": lambda bomb, rng: Call(bomb, lines=_memory(rng)),
+    "memory_machine": lambda bomb, rng: Call(
+        bomb, observations=_memory(rng)),
+    "morse": lambda bomb, rng: Call(bomb, lines=_morse(rng)),
+    "morse_machine": lambda bomb, rng: Call(
+        bomb, observations=_morse(rng)),
+    "morse_stream": lambda bomb, rng: Call(bomb, (_signal(rng),)),
+    "morse_timing": lambda bomb, rng: Call(bomb, (_timing(rng),)),
+    "complicated": lambda bomb, rng: Call(bomb, lines=_complicated(rng)),
+    "complicated_machine": lambda bomb, rng: Call(
+        bomb, observations=_complicated(rng)),
+    "complicated_panel": lambda bomb, rng: Call(
+        bomb, (_complicated(rng),)),
+    "sequences": lambda bomb, rng: Call(bomb, lines=_sequences(rng)),
+    "sequences_machine": lambda bomb, rng: Call(
+        bomb, observations=_sequences(rng)),
+    "maze": lambda bomb, rng: Call(bomb, _maze(rng)),
+    "maze_many": lambda bomb, rng: Call(
+        bomb, (rng.choice(sorted(_MAZE_INDEX)),
+               [_maze(rng)[1:] for _ in range(20)])),
+    "passwords": _passwords,
+    "passwords_machine": lambda bomb, rng: Call(
+        bomb, observations=_columns(rng)),
+    "venting": lambda bomb, rng: Call(bomb),
+    "capacitor": lambda bomb, rng: Call(bomb),
+    "knob": lambda bomb, rng: Call(
+        bomb, (rng.choice(_KNOB_ROWS),), [rng.choice(_KNOB_ROWS)]),
+    "strike": lambda bomb, rng: Call(bomb),
+    "solve_all": lambda bomb, rng: Call(bomb, (_bomb_modules(rng),)),
+}
+
+
+def corpus(method, n_calls, seed=0):
+    """
+    Generate the calls to benchmark for a method.
+
+    Parameters
+    ----------
+    method : str
+        The name of the `Bomb` method.
+    n_calls : int
+        The number of calls.
+    seed : int, optional
+        The random seed. The same seed always gives the same calls.
+
+    Returns
+    -------
+    list of Call
+        The calls, each on a bomb of its own.
+
+    """
+    rng = random.Random("{}:{}".format(seed, method))
+    bombs = [Bomb(*args) for args in edgework(n_calls, seed)]
+    return [GENERATORS[method](bomb, rng) for bomb in bombs]
+
+
+def _run(method, call, script):
+    """Make a single call, with its lines given to `script`."""
+    script.lines = iter(call.lines)
+    result = getattr(call.bomb, method)(*call.args)
+    if call.observations is not None:
+        for observation in call.observations:
+            if result.done:
+                break
+            result.send(observation)
+
+
+def percentile(ordered, fraction):
+    """Get a percentile of a sorted list, without interpolation."""
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+def benchmark(method, calls, repeat=3, n_allocation_calls=200):
+    """
+    Benchmark a method over a corpus.
+
+    Parameters
+    ----------
+    method : str
+        The name of the `Bomb` method.
+    calls : list of Call
+        The corpus, from `corpus`.
+    repeat : int, optional
+        The number of timed passes over the corpus, after an untimed one
+        which builds any lazy tables. The fastest time of each call is kept.
+    n_allocation_calls : int, optional
+        The number of calls whose allocations are traced, in a separate pass.
+
+    Returns
+    -------
+    dict
+        The number of ``calls``, the ``p50``, ``p90`` and ``p99`` latency in
+        microseconds, the ``calls_per_second``, and the mean peak
+        ``bytes_per_call``.
+
+    """
+    script = _Script()
+    previous = vars(solver).get("input")
+    solver.input = script
+    try:
+        with open(os.devnull, "w") as devnull:
+            with contextlib.redirect_stdout(devnull):
+                for call in calls:
+                    _run(method, call, script)
+                timings = [float("inf")] * len(calls)
+                timer = time.perf_counter
+                for _ in range(repeat):
+                    for i, call in enumerate(calls):
+                        start = timer()
+                        _run(method, call, script)
+                        elapsed = timer() - start
+                        if elapsed < timings[i]:
+                            timings[i] = elapsed
+
+                sample = calls[:n_allocation_calls]
+                tracemalloc.start()
+                allocated = 0
+                for call in sample:
+                    tracemalloc.reset_peak()
+                    before = tracemalloc.get_traced_memory()[0]
+                    _run(method, call, script)
+                    allocated += tracemalloc.get_traced_memory()[1] - before
+                tracemalloc.stop()
+    finally:
+        if previous is None:
+            del solver.input
+        else:
+            solver.input = previous
+
+    total = sum(timings)
+    timings.sort()
+    return {
+        "calls": len(calls),
+        "p50": percentile(timings, 0.5) * 1e6,
+        "p90": percentile(timings, 0.9) * 1e6,
+        "p99": percentile(timings, 0.99) * 1e6,
+        "calls_per_second": len(calls) / total if total else float("inf"),
+        "bytes_per_call": allocated / len(sample) if sample else 0,
+    }
+
+
+def run(methods=None, n_calls=2000, seed=0, repeat=3):
+    """
+    Benchmark many methods.
+
+    Parameters
+    ----------
+    methods : iterable of str, optional
+        The methods to benchmark. Defaults to all of them.
+    n_calls : int, optional
+        The number of calls per method.
+    seed : int, optional
+        The random seed of the corpora.
+    repeat : int, optional
+        The number of timed passes over each corpus.
+
+    Returns
+    -------
+    dict
+        The settings of the run, and the results of each method, as from
+        `benchmark`, under ``methods``.
+
+    """
+    if methods is None:
+        methods = sorted(GENERATORS)
+    results = {}
+    for method in methods:
+        results[method] = benchmark(method, corpus(method, n_calls, seed),
+                                    repeat)
+    return {"python": platform.python_version(), "seed": seed,
+            "n_calls": n_calls, "methods": results}
+
+
+def compare(results, baseline, threshold=0.5):
+    """
+    Find the methods which got worse than their baseline.
+
+    A method regresses if its median latency or its allocations per call grew
+    by more than the threshold. A small absolute slack is also allowed, so that
+    the timer resolution does not flag the fastest methods. Methods missing
+    from either run are skipped.
+
+    Parameters
+    ----------
+    results, baseline : dict
+        The runs to compare, as from `run`.
+    threshold : float, optional
+        The allowed relative growth.
+
+    Returns
+    -------
+    list of str
+        A description of each regression.
+
+    """
+    regressions = []
+    for method, result in sorted(results["methods"].items()):
+        before = baseline["methods"].get(method)
+        if before is None:
+            continue
+        for key, unit, slack in (("p50", "us", 0.5),
+                                 ("bytes_per_call", "bytes", 16)):
+            if result[key] > before[key] * (1 + threshold) + slack:
+                regressions.append("{}: {} went from {:.2f} to {:.2f} {}"
+                                   .format(method, key, before[key],
+                                           result[key], unit))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("methods", nargs="*",
+                        help="the methods to run; defaults to all of them")
+    parser.add_argument("--calls", type=int, default=2000,
+                        help="calls per method")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="timed passes over each corpus")
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--baseline", help="compare with saved results")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="allowed relative slowdown")
+    args = parser.parse_args()
+    unknown = set(args.methods) - set(GENERATORS)
+    if unknown:
+        parser.error("unknown methods: {}".format(", ".join(sorted(unknown))))
+
+    results = run(args.methods or None, args.calls, args.seed, args.repeat)
+    print("{:>20}  {:>9}  {:>9}  {:>9}  {:>11}  {:>9}".format(
+        "method", "p50 us", "p90 us", "p99 us", "calls/s", "bytes"))
+    for method, result in sorted(results["methods"].items()):
+        print("{:>20}  {p50:9.2f}  {p90:9.2f}  {p99:9.2f}  "
+              "{calls_per_second:11.0f}  {bytes_per_call:9.1f}"
+              .format(method, **result))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline),
+                                  args.threshold)
+        for regression in regressions:
+            print("REGRESSION {}".format(regression))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+"""
+Measure the memory allocated by each call to the hot solvers.
+
+Reports the memory allocated to load `solver`, and by each call to its hot
+`Bomb` methods. Run ``python bench_allocations.py [calls] --output
+before.json`` to save the figures, and ``python bench_allocations.py
+--baseline before.json`` after a change to compare with them. The default is
+ten thousand calls per solver.
+
+Requires Python 3.9 or later.
+
+"""
+import argparse
+import json
+import os
+import tracemalloc
+import types
+
+import solver
+
+
+_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solver.py")
+
+
+def _load(code):
+    """Run compiled `solver` source as a new module."""
+    module = types.ModuleType("measured_solver")
+    module.__file__ = _PATH
+    exec(code, module.__dict__)
+    return module
+
+
+def cases():
+    """
+    The calls to measure, by module.
+
+    Returns
+    -------
+    list of (str, callable)
+        The name and the call of each module.
+
+    """
+    bomb = solver.Bomb("IPZCV0", 1)
+    simon = bomb.simon_machine()
+    return [
+        ("wires", lambda: bomb.wires("wbk")),
+        ("keypad", lambda: bomb.keypad("q", "at", "lambda", "moon")),
+        ("simon", lambda: simon.translate("r")),
+        ("whos", lambda: bomb.whos_step(
+            "ready", ["YES", "OKAY", "WHAT", "MIDDLE", "LEFT", "PRESS"])),
+        ("morse", lambda: bomb.morse_stream("-....-.")),
+        ("maze", lambda: bomb.maze((0, 1), (0, 0), (5, 5))),
+    ]
+
+
+def measure(call, n_calls):
+    """
+    Measure the memory allocated by a call.
+
+    Parameters
+    ----------
+    call : callable
+        The call to measure. It is run once before measuring, so that lazy
+        tables are already built.
+    n_calls : int
+        The number of calls to average over.
+
+    Returns
+    -------
+    float
+        The mean peak number of bytes allocated during a call.
+
+    """
+    call()
+    tracemalloc.start()
+    total = 0
+    for _ in range(n_calls):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        call()
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return total / n_calls
+
+
+def run(n_calls=10 ** 4):
+    """
+    Measure loading `solver` and calling each of its hot solvers.
+
+    Parameters
+    ----------
+    n_calls : int, optional
+        The number of calls to average over, for each solver.
+
+    Returns
+    -------
+    dict
+        The mean peak number of bytes allocated, by module, and under
+        "import" for loading `solver`.
+
+    """
+    with open(_PATH, "rb") as source_file:
+        code = compile(source_file.read(), _PATH, "exec")
+    # Loading the module is much slower than a call, so it is run less often.
+    results = {"import": measure(lambda: _load(code),
+                                 max(n_calls // 1000, 1))}
+    for name, call in cases():
+        results[name] = measure(call, n_calls)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("calls", nargs="?", type=int, default=10 ** 4,
+                        help="calls per solver")
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--baseline", help="compare with saved results")
+    args = parser.parse_args()
+    results = run(args.calls)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    print("{:>8}  {:>10}  {:>10}".format("module", "baseline", "current"))
+    for name, size in results.items():
+        print("{:>8}  {:>10}  {:10.1f}".format(
+            name, "{:.1f}".format(baseline[name]) if name in baseline
+            else "-", size))
+    print("Bytes per call, at peak.")
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+"""
+Measure the latency of matching spoken words with `fuzzy`.
+
+Each index is queried with misheard words which match none of its entries
+exactly, which is the slowest case. Run ``python bench_fuzzy.py [count]``;
+the default is a thousand queries per index.
+
+Requires Python 3.
+
+"""
+import sys
+import time
+
+import fuzzy
+from solver import keypad_aliases
+
+
+def measure(match, queries):
+    """
+    Measure the mean time taken to match each query.
+
+    Returns
+    -------
+    float
+        The mean latency, in seconds.
+
+    """
+    start = time.perf_counter()
+    for query in queries:
+        match(query)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main(count=1000):
+    index = fuzzy.FuzzyIndex(keypad_aliases())
+    for name, match, word in (
+            ("keypad aliases", index.match, "copyrite"),
+            ("labels", fuzzy.match_label, "uhhuh"),
+            ("displays", fuzzy.match_display, "theyre"),
+            ("keypad", fuzzy.match_keypad, "spanish question")):
+        queries = ["{}{}".format(word, n) for n in range(count)]
+        print("{:>14}: {:7.1f} us per match".format(
+            name, measure(match, queries) * 1e6))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,93 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+"""
+Measure the memory taken by many live bombs.
+
+Compares `Bomb` with a plain-attribute version of it, as it was before the
+edgework was packed. Run ``python bench_memory.py [count]``; the default is
+one million bombs.
+
+Requires Python 3.
+
+"""
+import random
+import sys
+import tracemalloc
+
+from solver import Bomb
+
+
+class DictSerialNumber(object):
+    """The serial number, stored in plain attributes."""
+    def __init__(self, number):
+        self.number = number
+        self.digits = [int(i) for i in self.number if i.isdigit()]
+
+
+class DictBomb(object):
+    """The bomb, stored in plain attributes."""
+    def __init__(self, serial_number, n_batteries, has_parallel=False,
+                 frk=False, car=False):
+        self.serial_number = DictSerialNumber(serial_number)
+        self.n_batteries = n_batteries
+        self.has_parallel = has_parallel
+        self.frk = frk
+        self.car = car
+        self.n_strikes = 0
+
+
+def edgework(count, seed=0):
+    """
+    Generate random edgework.
+
+    Parameters
+    ----------
+    count : int
+        The number of bombs.
+    seed : int, optional
+        The random seed.
+
+    Returns
+    -------
+    list of tuple
+        The arguments for each bomb.
+
+    """
+    rng = random.Random(seed)
+    characters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+    return [("".join(rng.choice(characters) for _ in range(5))
+             + str(rng.randrange(10)), rng.randrange(7), rng.random() < 0.5,
+             rng.random() < 0.3, rng.random() < 0.3)
+            for _ in range(count)]
+
+
+def measure(cls, arguments):
+    """
+    Measure the memory allocated to hold one instance per set of arguments.
+
+    Returns
+    -------
+    int
+        The number of bytes allocated, excluding the list holding them.
+
+    """
+    tracemalloc.start()
+    bombs = [None] * len(arguments)
+    before = tracemalloc.get_traced_memory()[0]
+    for i, args in enumerate(arguments):
+        bombs[i] = cls(*args)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before
+
+
+def main(count=10 ** 6):
+    arguments = edgework(count)
+    for cls in (DictBomb, Bomb):
+        size = measure(cls, arguments)
+        print("{:>8}: {:8.1f} MiB, {:6.1f} bytes per bomb".format(
+            cls.__name__, size / 2 ** 20, size / count))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
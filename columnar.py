@@ -0,0 +1,441 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+"""
+Columnar batch solvers for the stateless modules.
+
+Each function takes NumPy arrays with one row per module instance, together
+with the edgework of the bomb each row belongs to, and returns an array of
+answers. The answers match those of the corresponding `Bomb` methods row for
+row, under the manual in use.
+
+Requires NumPy.
+
+"""
+import itertools
+
+import numpy as np
+
+import solver
+from solver import WIRE_COLOURS, KEYPAD_COLUMNS, _wires_table
+
+
+ORDINALS = np.array(solver.ORDINALS)
+
+PRESS = "PRESS and immediately RELEASE"
+
+KEYPAD_SYMBOLS = tuple(sorted(set(key for column in KEYPAD_COLUMNS
+                                  for key in column)))
+
+# Wire codes are numbered by length first, then in base five.
+_WIRES_OFFSETS = np.cumsum([0, 0, 0, 0] + [5 ** n for n in range(3, 7)])
+
+# The tables built from the rules, with the manual they were built from.
+_tables = {}
+
+
+def _manual_table(name, build):
+    """
+    Get a table built from the manual in use.
+
+    It is rebuilt if another manual has been put in use since.
+
+    Parameters
+    ----------
+    name : str
+        The name of the table.
+    build : callable
+        Builds the table from a `rules.Manual`.
+
+    """
+    manual = solver.manual()
+    cached = _tables.get(name)
+    if cached is None or cached[0] is not manual:
+        cached = _tables[name] = (manual, build(manual))
+    return cached[1]
+
+
+def _by_edgework(*edgework):
+    """
+    Group rows by their edgework.
+
+    Parameters
+    ----------
+    *edgework : array_like of int
+        Each part of the edgework, for each row.
+
+    Returns
+    -------
+    groups : ndarray of int
+        The distinct edgework, one row each.
+    inverse : ndarray of int
+        The index in `groups` of the edgework of each row, in the broadcast
+        shape of the parts.
+
+    """
+    parts = np.broadcast_arrays(*[np.asarray(part, dtype=np.int64)
+                                  for part in edgework])
+    groups, inverse = np.unique(np.stack(parts, axis=-1).reshape(
+        -1, len(parts)), axis=0, return_inverse=True)
+    return groups, inverse.reshape(parts[0].shape)
+
+
+def _lookup(values, choices):
+    """
+    Encode an array of strings as indices into a tuple of choices.
+
+    Parameters
+    ----------
+    values : array_like of str
+        The values to encode.
+    choices : sequence of str
+        The known values.
+
+    Returns
+    -------
+    codes : ndarray of int
+        The index of each value in `choices`, or -1 if it is not known.
+
+    """
+    values = np.asarray(values, dtype=str)
+    codes = np.full(values.shape, -1, dtype=np.int8)
+    for code, choice in enumerate(choices):
+        codes[values == choice] = code
+    return codes
+
+
+def _bits(rows, width):
+    """
+    Encode strings of "0" and "1" as integers, most significant bit first.
+
+    Integer arrays are returned unchanged.
+
+    """
+    rows = np.asarray(rows)
+    if rows.dtype.kind in "iu":
+        return rows
+    chars = np.asarray(rows, dtype="U{}".format(width))
+    digits = chars.view(np.uint32).reshape(chars.shape + (width,))
+    digits = (digits == ord("1")).astype(np.int64)
+    return digits.dot(1 << np.arange(width - 1, -1, -1))
+
+
+def encode_wires(panels):
+    """
+    Encode *Wires* panels as indices into the exhaustive answer table.
+
+    Parameters
+    ----------
+    panels : array_like of str
+        The wire codes, in the same format as for `Bomb.wires`. Each must have
+        three to six wires.
+
+    Returns
+    -------
+    codes : ndarray of int
+        The encoded panels.
+
+    Raises
+    ------
+    ValueError
+        If a panel has an unknown colour or the wrong number of wires.
+
+    """
+    panels = np.asarray(panels, dtype=str)
+    if panels.dtype.itemsize > np.dtype("U6").itemsize:
+        # Longer panels would be cut short by the cast.
+        raise ValueError("No Wires rules for {} wires".format(
+            np.char.str_len(panels).max()))
+    chars = np.char.lower(panels.astype("U6"))
+    points = chars.view(np.uint32).reshape(chars.shape + (6,))
+    colours = np.full(128, -1, dtype=np.int64)
+    for value, colour in enumerate(WIRE_COLOURS):
+        colours[ord(colour)] = value
+    colours[0] = 0
+    if (points >= 128).any():
+        raise ValueError("Unknown wire colour")
+    values = colours[points]
+    lengths = (points != 0).sum(axis=-1)
+    if (values < 0).any() or ((lengths < 3) | (lengths > 6)).any():
+        raise ValueError("Panels must have three to six known wire colours")
+
+    codes = np.zeros(chars.shape, dtype=np.int64)
+    for position in range(6):
+        within = position < lengths
+        codes = np.where(within, codes * 5 + values[..., position], codes)
+    return _WIRES_OFFSETS[lengths] + codes
+
+
+def wires(codes, last_odd):
+    """
+    Solve many *Wires* modules.
+
+    Parameters
+    ----------
+    codes : array_like of int
+        The panels, from `encode_wires`.
+    last_odd : array_like of bool
+        Whether the last digit of the serial number is odd, for each row.
+
+    Returns
+    -------
+    ndarray of str
+        The wire to cut for each row.
+
+    """
+    answers = _manual_table("wires", _build_wires)
+    parity = np.asarray(last_odd, dtype=bool).astype(np.intp)
+    return ORDINALS[answers[parity, codes]]
+
+
+def _build_wires(manual):
+    """Build the index in `ORDINALS` of every *Wires* answer."""
+    tables = _wires_table()
+    answers = np.empty((2, _WIRES_OFFSETS[-1]), dtype=np.int8)
+    ordinals = {ordinal: i for i, ordinal in enumerate(ORDINALS)}
+    for parity, table in enumerate(tables):
+        for n_wires in range(3, 7):
+            start = _WIRES_OFFSETS[n_wires]
+            panels = itertools.product(WIRE_COLOURS, repeat=n_wires)
+            answers[parity, start:start + 5 ** n_wires] = [
+                ordinals[table["".join(panel)]] for panel in panels]
+    return answers
+
+
+def button_hold(texts, colours, n_batteries, car, frk):
+    """
+    Decide whether many *Button* modules should be held.
+
+    Parameters
+    ----------
+    texts : array_like of str
+        The text on each button.
+    colours : array_like of str
+        The colour code of each button, as for `Bomb.button`.
+    n_batteries : array_like of int
+        The number of batteries on the bomb, for each row.
+    car : array_like of bool
+        Whether the bomb has a CAR indicator, for each row.
+    frk : array_like of bool
+        Whether the bomb has a FRK indicator, for each row.
+
+    Returns
+    -------
+    ndarray of bool
+        True where the button is to be held.
+
+    """
+    manual = solver.manual()
+    text = _lookup(np.char.lower(np.asarray(texts, dtype=str)),
+                   manual.button_texts)
+    colour = _lookup(colours, manual.button_colours)
+    groups, group = _by_edgework(n_batteries, car, frk)
+    # Texts and colours which no rule mentions are encoded as -1, so they
+    # pick the last one, which stands for all of them.
+    holds = np.array([
+        [[table.hold(text_, colour_)
+          for colour_ in manual.button_colours + ("",)]
+         for text_ in manual.button_texts + ("",)]
+        for table in (manual.button(n, [label for label, lit in
+                                        (("CAR", has_car), ("FRK", has_frk))
+                                        if lit])
+                      for n, has_car, has_frk in groups)], dtype=bool)
+    return holds[group, text, colour]
+
+
+def button(texts, colours, n_batteries, car, frk, strips):
+    """
+    Solve many *Button* modules.
+
+    The parameters are the same as for `button_hold`, with the addition of
+    the strip colours.
+
+    Parameters
+    ----------
+    strips : array_like of str
+        The colour of the strip for each row. It is ignored for buttons which
+        are pressed and immediately released.
+
+    Returns
+    -------
+    ndarray of str
+        The instruction for each row.
+
+    """
+    to_hold = button_hold(texts, colours, n_batteries, car, frk)
+    strips = np.char.lower(np.asarray(strips, dtype=str))
+    known, strip = np.unique(strips, return_inverse=True)
+    holds = np.array(["HOLD until the timer contains a " +
+                      solver.manual().release(colour) for colour in known])
+    return np.where(to_hold, holds[strip.reshape(strips.shape)], PRESS)
+
+
+def encode_keypad(keys):
+    """
+    Encode keypad symbols as indices into `KEYPAD_SYMBOLS`.
+
+    Parameters
+    ----------
+    keys : array_like of str
+        The symbol names, as for `Bomb.keypad`.
+
+    Returns
+    -------
+    ndarray of int
+        The encoded symbols. Unknown symbols are -1.
+
+    """
+    names = np.asarray(keys, dtype=str)
+    canonical = np.char.lower(names)
+    aliases = solver.keypad_aliases()
+    for name in np.unique(canonical):
+        canonical[canonical == name] = aliases.get(name, name)
+    return _lookup(canonical, KEYPAD_SYMBOLS)
+
+
+def keypad(keys):
+    """
+    Solve many *Keypads* modules.
+
+    Parameters
+    ----------
+    keys : array_like of int
+        The encoded symbols, from `encode_keypad`, with four per row.
+
+    Returns
+    -------
+    ndarray of str
+        The symbols of each row, in the order in which they are to be pressed.
+
+    Raises
+    ------
+    ValueError
+        If the symbols of a row do not all appear in a single column.
+
+    """
+    keys = np.asarray(keys)
+    n_symbols = len(KEYPAD_SYMBOLS)
+    columns = np.zeros(n_symbols + 1, dtype=np.int64)
+    positions = np.zeros((len(KEYPAD_COLUMNS), n_symbols + 1), dtype=np.int64)
+    for i, column in enumerate(KEYPAD_COLUMNS):
+        for position, key in enumerate(column):
+            columns[KEYPAD_SYMBOLS.index(key)] |= 1 << i
+            positions[i, KEYPAD_SYMBOLS.index(key)] = position
+
+    # Unknown symbols (-1) index the final, empty entry.
+    shared = np.bitwise_and.reduce(columns[keys], axis=-1)
+    if (shared == 0).any():
+        bad = np.flatnonzero(shared == 0)
+        raise ValueError("No column contains all the keys in rows {}"
+                         .format(bad.tolist()))
+    working_column = (shared & -shared).astype(np.float64)
+    working_column = np.log2(working_column).astype(np.intp)
+    order = np.argsort(positions[working_column[:, None], keys], axis=-1)
+    return np.array(KEYPAD_SYMBOLS)[np.take_along_axis(keys, order, axis=-1)]
+
+
+def encode_complicated(leds, colours, stars):
+    """
+    Encode complicated wires as indices into
+    `rules.Manual.complicated_instructions`.
+
+    Parameters
+    ----------
+    leds : array_like of bool
+        Whether the LED above each wire is on.
+    colours : array_like of str
+        The colour code of each wire, as for `Bomb.complicated`.
+    stars : array_like of bool
+        Whether a star is drawn below each wire.
+
+    Returns
+    -------
+    ndarray of int
+        The case of each wire.
+
+    """
+    colour = np.asarray(colours, dtype=str)
+    red = ((colour == "r") | (colour == "s")).astype(np.int64)
+    blue = ((colour == "b") | (colour == "s")).astype(np.int64)
+    return (np.asarray(leds, dtype=np.int64) << 3 | red << 2 | blue << 1
+            | np.asarray(stars, dtype=np.int64))
+
+
+def complicated(cases, last_odd, has_parallel, n_batteries):
+    """
+    Solve many complicated wires.
+
+    Parameters
+    ----------
+    cases : array_like of int
+        The case of each wire, from `encode_complicated`.
+    last_odd : array_like of bool
+        Whether the last digit of the serial number is odd, for each row.
+    has_parallel : array_like of bool
+        Whether the bomb has a parallel port, for each row.
+    n_batteries : array_like of int
+        The number of batteries on the bomb, for each row.
+
+    Returns
+    -------
+    ndarray of bool
+        True where the wire is to be cut.
+
+    """
+    groups, group = _by_edgework(np.asarray(last_odd, dtype=bool),
+                                 np.asarray(has_parallel, dtype=bool),
+                                 n_batteries)
+    manual = solver.manual()
+    masks = np.array([
+        manual.complicated_mask(odd, n, ("parallel",) if parallel else ())
+        for odd, parallel, n in groups], dtype=np.int64)
+    return (masks[group] >> np.asarray(cases)) & 1 == 1
+
+
+def knob(top_rows, bottom_rows=None):
+    """
+    Solve many *Knob* modules.
+
+    Parameters
+    ----------
+    top_rows : array_like
+        The LEDs on the top row, either as strings in the same format as for
+        `Bomb.knob`, or as six-bit integers with the leftmost LED as the most
+        significant bit.
+    bottom_rows : array_like, optional
+        The LEDs on the bottom row, in the same format. Only needed for rows
+        whose top row needs it, as for `Bomb.knob`.
+
+    Returns
+    -------
+    ndarray of str
+        The direction relative to "UP" in which to move each knob.
+
+    Raises
+    ------
+    ValueError
+        If the bottom rows are not given, but a top row needs its bottom row.
+
+    """
+    top = _bits(top_rows, 6)
+    if bottom_rows is None:
+        needed = _manual_table("knob_needs_bottom", _build_knob_needs_bottom)
+        if needed[top].any():
+            raise ValueError("The bottom row is needed for top row {:06b}"
+                             .format(top[needed[top]].flat[0]))
+        bottom = np.zeros_like(top)
+    else:
+        bottom = _bits(bottom_rows, 6)
+    return _manual_table("knob", _build_knob)[top, bottom]
+
+
+def _build_knob_needs_bottom(manual):
+    """Build whether each top row of a *Knob* needs the bottom row."""
+    return np.array([manual.knob_needs_bottom("{:06b}".format(row))
+                     for row in range(64)])
+
+
+def _build_knob(manual):
+    """Build the direction of every *Knob*, by its top and bottom rows."""
+    rows = ["{:06b}".format(row) for row in range(64)]
+    return np.array([[manual.knob(top, bottom) for bottom in rows]
+                     for top in rows])
@@ -0,0 +1,332 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+"""
+Match noisy transcripts of spoken labels to the words the solver knows.
+
+Many of the words in *Who's on First* sound alike, such as "YOU'RE",
+"YOUR", "UR" and "U", or "READ", "RED" and "REED", and the keypad symbols
+go by many free-form names. Each index maps a transcript to the known
+entries which it could have been, ranked from the most likely:
+
+    >>> match_label("your")
+    [Candidate('YOUR', 0, True), Candidate("YOU'RE", 1, True),
+     Candidate('YOU', 1, False), Candidate('UR', 2, True),
+     Candidate('YOU ARE', 2, True)]
+    >>> match_keypad("copyrite")
+    [Candidate('copy', 3, True)]
+
+Entries are found if their spelling is within a small edit distance of the
+transcript, using a BK-tree, or if they sound the same, using a phonetic
+code. A single candidate means the match is unambiguous; otherwise, the
+diffuser should be asked which one it is. Candidates which sound the same
+are ranked as if they were spelt one letter closer.
+
+"""
+import itertools
+import string
+
+from solver import WHOS_RESPONSES, _WHOS_DISPLAYS, keypad_aliases
+
+
+# Sounds alike are coded with the same digit, as in Soundex. Vowels, and the
+# letters which are mostly silent, are dropped. Digits which are spelt as such
+# are coded as letters, so that they do not sound like the consonants.
+_PHONETIC_CODES = dict(
+    [(letter, digit) for digit, letters in (
+        ("1", "BFPV"), ("2", "CGJKQSXZ"), ("3", "DT"), ("4", "L"),
+        ("5", "MN"), ("6", "R")) for letter in letters] +
+    [(letter, "") for letter in "AEIOUHWY"] +
+    [(digit, "abcdefghij"[int(digit)]) for digit in string.digits])
+
+_KEEP = frozenset(string.ascii_uppercase + string.digits)
+
+
+def _normalize(text):
+    """Spell a transcript in upper case, without spaces or punctuation."""
+    return "".join(char for char in text.upper() if char in _KEEP)
+
+
+def _phonetic(spelling):
+    """
+    Get the phonetic code of a normalized spelling.
+
+    Unlike Soundex, the first letter is coded like the others rather than
+    kept as it is. The code is empty if only vowels and silent letters are
+    spelt, and then tells nothing about the sound.
+
+    """
+    spelling = spelling.replace("GH", "").replace("PH", "F")
+    code = "".join(_PHONETIC_CODES[char] for char in spelling)
+    return "".join(digit for digit, _ in itertools.groupby(code))
+
+
+def _pattern(spelling):
+    """
+    Prepare a spelling to be compared with many others by `_distance`.
+
+    Returns
+    -------
+    dict
+        The positions of each character in the spelling, as a bit mask.
+
+    """
+    positions = {}
+    for i, char in enumerate(spelling):
+        positions[char] = positions.get(char, 0) | 1 << i
+    return positions
+
+
+def _distance(spelling, pattern, other):
+    """
+    Get the Levenshtein distance between two spellings.
+
+    This is the bit-parallel algorithm of Myers, as formulated by Hyyro, so
+    each character of `other` costs a few operations on ints, whatever the
+    length of `spelling`.
+
+    Parameters
+    ----------
+    spelling : str
+        The first spelling.
+    pattern : dict
+        The `_pattern` of `spelling`.
+    other : str
+        The second spelling.
+
+    """
+    if not spelling:
+        return len(other)
+    mask = (1 << len(spelling)) - 1
+    high = 1 << (len(spelling) - 1)
+    # The vertical deltas of the current column, which are +1 or -1.
+    plus, minus = mask, 0
+    score = len(spelling)
+    for char in other:
+        matches = pattern.get(char, 0)
+        vertical = matches | minus
+        horizontal = (((matches & plus) + plus) ^ plus) | matches
+        horizontal_plus = minus | ~(horizontal | plus)
+        horizontal_minus = plus & horizontal
+        if horizontal_plus & high:
+            score += 1
+        elif horizontal_minus & high:
+            score -= 1
+        horizontal_plus = horizontal_plus << 1 | 1
+        horizontal_minus <<= 1
+        plus = (horizontal_minus | ~(vertical | horizontal_plus)) & mask
+        minus = horizontal_plus & vertical
+    return score
+
+
+class Candidate(object):
+    """
+    An entry which a transcript may have been.
+
+    Parameters
+    ----------
+    entry : str
+        The entry, as the solver expects it.
+    distance : int
+        The edit distance between the spellings of the transcript and of the
+        entry, ignoring case, spaces and punctuation.
+    phonetic : bool
+        Whether the transcript and the entry sound the same.
+
+    """
+    __slots__ = ("entry", "distance", "phonetic")
+
+    def __init__(self, entry, distance, phonetic):
+        self.entry = entry
+        self.distance = distance
+        self.phonetic = phonetic
+
+    def rank(self):
+        """Get the sort key, from the most likely."""
+        return self.distance - self.phonetic, self.distance, self.entry
+
+    def __eq__(self, other):
+        return (isinstance(other, Candidate) and
+                (self.entry, self.distance, self.phonetic) ==
+                (other.entry, other.distance, other.phonetic))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "Candidate({!r}, {!r}, {!r})".format(
+            self.entry, self.distance, self.phonetic)
+
+
+class FuzzyIndex(object):
+    """
+    A phonetic and edit-distance index over a vocabulary.
+
+    Parameters
+    ----------
+    entries : mapping or iterable of str
+        The spoken form of each entry, mapped to the entry itself. An iterable
+        maps each entry to itself.
+    max_distance : int, optional
+        The largest edit distance at which an entry is still a candidate,
+        unless it sounds the same.
+    limit : int, optional
+        The largest number of candidates returned.
+    cache_size : int, optional
+        The number of transcripts whose candidates are remembered.
+
+    """
+    def __init__(self, entries, max_distance=2, limit=5, cache_size=4096):
+        if not hasattr(entries, "items"):
+            entries = dict((entry, entry) for entry in entries)
+        self.max_distance = max_distance
+        self.limit = limit
+        self.cache_size = cache_size
+        # The entries and phonetic code of each spelling, and the spellings
+        # of each phonetic code.
+        self._spellings = {}
+        self._codes = {}
+        self._sounds = {}
+        self._tree = None
+        for spoken, entry in sorted(entries.items()):
+            spelling = _normalize(spoken)
+            # Nothing is close to an empty spelling but another one.
+            if spelling and spelling not in self._spellings:
+                code = self._codes[spelling] = _phonetic(spelling)
+                if code:
+                    self._sounds.setdefault(code, set()).add(spelling)
+                self._insert(spelling)
+            self._spellings.setdefault(spelling, set()).add(entry)
+        self._cache = {}
+
+    def _insert(self, spelling):
+        """Add a spelling to the BK-tree."""
+        if self._tree is None:
+            self._tree = (spelling, {})
+            return
+        node = self._tree
+        pattern = _pattern(spelling)
+        while True:
+            distance = _distance(spelling, pattern, node[0])
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (spelling, {})
+                return
+            node = child
+
+    def _near(self, spelling):
+        """Find the spellings within `max_distance`, with their distances."""
+        found = {}
+        pattern = _pattern(spelling)
+        stack = [self._tree] if self._tree is not None else []
+        while stack:
+            word, children = stack.pop()
+            distance = _distance(spelling, pattern, word)
+            if distance <= self.max_distance:
+                found[word] = distance
+            for edge in range(distance - self.max_distance,
+                              distance + self.max_distance + 1):
+                child = children.get(edge)
+                if child is not None:
+                    stack.append(child)
+        return found
+
+    def match(self, transcript):
+        """
+        Find the entries a transcript may have been.
+
+        Parameters
+        ----------
+        transcript : str
+            What was heard.
+
+        Returns
+        -------
+        list of Candidate
+            The candidates, from the most likely, each entry at most once. It
+            is empty if nothing is close.
+
+        """
+        try:
+            return list(self._cache[transcript])
+        except KeyError:
+            pass
+        spelling = _normalize(transcript)
+        sound = _phonetic(spelling)
+        if spelling:
+            found = self._near(spelling)
+            pattern = _pattern(spelling)
+            for alike in self._sounds.get(sound, ()):
+                if alike not in found:
+                    found[alike] = _distance(spelling, pattern, alike)
+        else:
+            found = {"": 0} if "" in self._spellings else {}
+
+        best = {}
+        for alike, distance in found.items():
+            # An empty code tells nothing, but the same spelling sounds the
+            # same.
+            candidate_sound = (distance == 0 or
+                               bool(sound) and self._codes.get(alike) == sound)
+            for entry in self._spellings[alike]:
+                candidate = Candidate(entry, distance, candidate_sound)
+                if (entry not in best or
+                        candidate.rank() < best[entry].rank()):
+                    best[entry] = candidate
+        candidates = tuple(sorted(best.values(),
+                                  key=Candidate.rank)[:self.limit])
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[transcript] = candidates
+        return list(candidates)
+
+
+_indices = {}
+
+
+def _index(name, entries):
+    """Get a shared index, building it on first use."""
+    try:
+        return _indices[name]
+    except KeyError:
+        index = _indices[name] = FuzzyIndex(entries())
+        return index
+
+
+def match_label(transcript):
+    """
+    Match a *Who's on First* button label, as for `Bomb.whos_step`.
+
+    Returns
+    -------
+    list of Candidate
+        The labels, in upper case.
+
+    """
+    return _index("labels", lambda: list(WHOS_RESPONSES)).match(transcript)
+
+
+def match_display(transcript):
+    """
+    Match a *Who's on First* display, as for `Bomb.whos_step`.
+
+    Returns
+    -------
+    list of Candidate
+        The displays, in lower case. The empty display is only matched by an
+        empty transcript.
+
+    """
+    return _index("displays", lambda: list(_WHOS_DISPLAYS)).match(transcript)
+
+
+def match_keypad(transcript):
+    """
+    Match the name of a *Keypads* symbol, as for `Bomb.keypad`.
+
+    Returns
+    -------
+    list of Candidate
+        The canonical names of the symbols.
+
+    """
+    return _index("keypad", keypad_aliases).match(transcript)
@@ -0,0 +1,361 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+"""
+Opt-in call counts and latencies for every `Bomb` method.
+
+While enabled, each public method of `Bomb` is wrapped to count its calls and
+errors, and to record its latency in a histogram. Time spent waiting on
+`input` is recorded separately from compute, so the interactive modules can
+be told apart from slow ones. A method called by another one, such as
+`Bomb.keypad` by `Bomb.keypad_batch`, is only recorded as part of the
+outermost call. When disabled, the original methods are put back, and
+nothing is left to slow them down.
+
+    >>> metrics = Instrumentation()
+    >>> metrics.enable()
+    >>> Bomb("ipzcv0", 1).wires("wbk")
+    'SECOND'
+    >>> metrics.snapshot()["wires"]["calls"]
+    1
+    >>> metrics.write("/var/lib/node_exporter/ktane.prom")
+
+The metrics can be read in-process with `Instrumentation.snapshot`, or
+exported in the Prometheus text format with `Instrumentation.render`, to a
+file or to a socket.
+
+Requires Python 3.
+
+"""
+import bisect
+import builtins
+import functools
+import os
+import socket
+import threading
+import time
+
+import solver
+from solver import Bomb
+
+
+# Upper bounds of the histogram buckets, in seconds.
+COMPUTE_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4,
+                   1e-3, 1e-2, 0.1, 1.0)
+INPUT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_active = None
+
+
+def methods():
+    """
+    List the public methods of `Bomb`.
+
+    Returns
+    -------
+    list of str
+        The method names, sorted.
+
+    """
+    return sorted(name for name, value in vars(Bomb).items()
+                  if not name.startswith("_") and callable(value))
+
+
+class Histogram(object):
+    """
+    A histogram with fixed buckets.
+
+    Parameters
+    ----------
+    bounds : sequence of float
+        The upper bound of each bucket, in increasing order. A final bucket
+        holds everything above the last bound.
+
+    Attributes
+    ----------
+    counts : list of int
+        The number of observations in each bucket, not cumulative.
+    total : float
+        The sum of the observations.
+
+    """
+    __slots__ = ("bounds", "counts", "total")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+    def cumulative(self):
+        """
+        Get the cumulative count of each bucket, as Prometheus expects.
+
+        Returns
+        -------
+        list of (str, int)
+            The upper bound of each bucket, with "+Inf" last, and the number of
+            observations no greater than it.
+
+        """
+        running = 0
+        buckets = []
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            running += count
+            buckets.append(("+Inf" if bound == float("inf") else repr(bound),
+                            running))
+        return buckets
+
+
+class _Metrics(object):
+    """The metrics of a single method."""
+    __slots__ = ("calls", "errors", "compute", "input_wait", "inputs")
+
+    def __init__(self, compute_buckets, input_buckets):
+        self.calls = 0
+        self.errors = 0
+        self.compute = Histogram(compute_buckets)
+        self.input_wait = Histogram(input_buckets)
+        self.inputs = 0
+
+
+class Instrumentation(object):
+    """
+    Record the calls to every `Bomb` method.
+
+    Only one instance can be enabled at a time.
+
+    Parameters
+    ----------
+    compute_buckets : sequence of float, optional
+        The bucket bounds of the compute time of a call, in seconds.
+    input_buckets : sequence of float, optional
+        The bucket bounds of the time a call spends waiting on `input`.
+    namespace : str, optional
+        The prefix of the exported metric names.
+
+    """
+    def __init__(self, compute_buckets=COMPUTE_BUCKETS,
+                 input_buckets=INPUT_BUCKETS, namespace="ktane"):
+        self.compute_buckets = tuple(compute_buckets)
+        self.input_buckets = tuple(input_buckets)
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._calls = threading.local()
+        self._originals = {}
+        self._input = None
+        self.reset()
+
+    @property
+    def enabled(self):
+        return bool(self._originals)
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        with self._lock:
+            self._metrics = dict(
+                (method, _Metrics(self.compute_buckets, self.input_buckets))
+                for method in methods())
+
+    def enable(self):
+        """
+        Start recording, by wrapping the methods of `Bomb` and `input`.
+
+        Raises
+        ------
+        RuntimeError
+            If another instance is already enabled.
+
+        """
+        global _active
+        if _active is self:
+            return
+        if _active is not None:
+            raise RuntimeError("Another instrumentation is already enabled")
+        for method in methods():
+            self._originals[method] = vars(Bomb)[method]
+            setattr(Bomb, method, self._wrap(method, vars(Bomb)[method]))
+        self._input = vars(solver).get("input")
+        solver.input = self._timed_input
+        _active = self
+
+    def disable(self):
+        """Stop recording, and put back the original methods."""
+        global _active
+        if _active is not self:
+            return
+        for method, original in self._originals.items():
+            setattr(Bomb, method, original)
+        self._originals = {}
+        if self._input is None:
+            del solver.input
+        else:
+            solver.input = self._input
+        self._input = None
+        _active = None
+
+    def _stack(self):
+        """Get the input waits of the calls in progress on this thread."""
+        try:
+            return self._calls.stack
+        except AttributeError:
+            self._calls.stack = []
+            return self._calls.stack
+
+    def _wrap(self, method, function):
+        """Wrap a method to record its calls."""
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            stack = self._stack()
+            if stack:
+                # The outermost call in progress already records this one.
+                return function(*args, **kwargs)
+            # The time spent waiting on input, and the number of lines read.
+            waits = [0.0, 0]
+            stack.append(waits)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                with self._lock:
+                    self._metrics[method].errors += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                stack.pop()
+                with self._lock:
+                    metrics = self._metrics[method]
+                    metrics.calls += 1
+                    metrics.compute.observe(elapsed - waits[0])
+                    if waits[1]:
+                        metrics.input_wait.observe(waits[0])
+                        metrics.inputs += waits[1]
+        return wrapper
+
+    def _timed_input(self, prompt=""):
+        """Read a line, charging the wait to every call in progress."""
+        read = self._input if self._input is not None else builtins.input
+        start = time.perf_counter()
+        try:
+            return read(prompt)
+        finally:
+            elapsed = time.perf_counter() - start
+            for waits in self._stack():
+                waits[0] += elapsed
+                waits[1] += 1
+
+    def snapshot(self):
+        """
+        Get the metrics recorded so far.
+
+        Returns
+        -------
+        dict
+            For each method, the number of ``calls`` and ``errors``, the total
+            ``compute_seconds`` and ``input_wait_seconds``, the number of
+            ``inputs`` read, and the ``compute_buckets`` and ``input_buckets``
+            as cumulative counts by upper bound.
+
+        """
+        with self._lock:
+            return dict(
+                (method, {
+                    "calls": metrics.calls,
+                    "errors": metrics.errors,
+                    "compute_seconds": metrics.compute.total,
+                    "input_wait_seconds": metrics.input_wait.total,
+                    "inputs": metrics.inputs,
+                    "compute_buckets": metrics.compute.cumulative(),
+                    "input_buckets": metrics.input_wait.cumulative(),
+                })
+                for method, metrics in self._metrics.items())
+
+    def render(self):
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        Returns
+        -------
+        str
+            The metrics, one sample per line.
+
+        """
+        name = (self.namespace + "_{}").format
+        snapshot = sorted(self.snapshot().items())
+        lines = []
+
+        def family(metric, kind, doc):
+            lines.append("# HELP {} {}".format(name(metric), doc))
+            lines.append("# TYPE {} {}".format(name(metric), kind))
+
+        family("calls_total", "counter", "Calls to each Bomb method.")
+        for method, metrics in snapshot:
+            lines.append('{}{{module="{}"}} {}'.format(
+                name("calls_total"), method, metrics["calls"]))
+        family("errors_total", "counter",
+               "Calls to each Bomb method which raised an exception.")
+        for method, metrics in snapshot:
+            lines.append('{}{{module="{}"}} {}'.format(
+                name("errors_total"), method, metrics["errors"]))
+        family("inputs_total", "counter",
+               "Lines read from standard input by each Bomb method.")
+        for method, metrics in snapshot:
+            lines.append('{}{{module="{}"}} {}'.format(
+                name("inputs_total"), method, metrics["inputs"]))
+
+        for metric, key, doc in (
+                ("compute_seconds", "compute",
+                 "Time spent in each Bomb method, apart from input."),
+                ("input_wait_seconds", "input",
+                 "Time each Bomb method spent waiting on input, per call "
+                 "which read any.")):
+            family(metric, "histogram", doc)
+            for method, metrics in snapshot:
+                buckets = metrics[key + "_buckets"]
+                for bound, count in buckets:
+                    lines.append('{}_bucket{{module="{}",le="{}"}} {}'.format(
+                        name(metric), method, bound, count))
+                lines.append('{}_sum{{module="{}"}} {!r}'.format(
+                    name(metric), method, metrics[metric]))
+                lines.append('{}_count{{module="{}"}} {}'.format(
+                    name(metric), method, buckets[-1][1]))
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Export the metrics to a file, such as for the textfile collector of
+        the Prometheus node exporter.
+
+        The file is replaced atomically, so it is never read half-written.
+
+        Parameters
+        ----------
+        path : str
+            The file to write.
+
+        """
+        temporary = "{}.{}.tmp".format(path, os.getpid())
+        with open(temporary, "w") as output:
+            output.write(self.render())
+        os.replace(temporary, path)
+
+    def send(self, address):
+        """
+        Export the metrics to a socket.
+
+        Parameters
+        ----------
+        address : str or (str, int)
+            The path of a Unix socket, or the host and port of a TCP socket.
+
+        """
+        data = self.render().encode()
+        if isinstance(address, str):
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.connect(address)
+        else:
+            connection = socket.create_connection(address)
+        with connection:
+            connection.sendall(data)
@@ -0,0 +1,481 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+"""
+Compile the rules of a *Bomb Defusal Manual* revision from data.
+
+A manual is a JSON document with a section for each module whose rules differ
+between revisions. See ``manuals/v1r2-241.json`` for the layout of each one.
+
+Rules are tried in order, and the first one whose conditions all hold
+applies. A rule without conditions always applies. Each condition is a list
+whose first item names what it tests:
+
+- ``["count", colour, op, n]``: the number of wires of a colour, compared
+  with `n` by one of ``==``, ``!=``, ``<``, ``<=``, ``>`` and ``>=``.
+- ``["last", colour]``: the colour of the last wire.
+- ``["text", text]`` and ``["colour", colour]``: the text and colour of a
+  button.
+- ``["serial", "odd"]`` or ``["serial", "even"]``: the last digit of the
+  serial number.
+- ``["batteries", op, n]``: the number of batteries.
+- ``["indicator", label]``: a lit indicator, such as "CAR".
+- ``["port", name]``: a port, such as "parallel".
+
+Every section is compiled into lookup tables over all the inputs its rules
+can tell apart, so that solving a module does not go through the rules
+again.
+
+"""
+import json
+import operator
+
+
+_COMPARISONS = {"==": operator.eq, "!=": operator.ne, "<": operator.lt,
+                "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+_MEMORY_ACTIONS = frozenset(("position", "label", "position of", "label of"))
+
+
+def _parity(spec):
+    """Check a serial number condition, returning True for odd."""
+    if spec[1] not in ("odd", "even"):
+        raise ValueError("Unknown serial number condition: {}".format(spec))
+    return spec[1] == "odd"
+
+
+def _wires_condition(spec):
+    """Compile a *Wires* condition into a function of the wires and parity."""
+    kind = spec[0]
+    if kind == "count":
+        colour, compare, value = spec[1], _COMPARISONS[spec[2]], spec[3]
+        return lambda wires, last_odd: compare(wires.count(colour), value)
+    elif kind == "last":
+        colour = spec[1]
+        return lambda wires, last_odd: wires[-1:] == colour
+    elif kind == "serial":
+        odd = _parity(spec)
+        return lambda wires, last_odd: bool(last_odd) == odd
+    raise ValueError("Unknown Wires condition: {}".format(spec))
+
+
+def _wires_cut(action, n_wires):
+    """Compile a *Wires* action into a function giving the wire to cut."""
+    if isinstance(action, int):
+        position = action if action > 0 else n_wires + 1 + action
+        if not 0 < position <= n_wires:
+            raise ValueError("No wire {} of {}".format(action, n_wires))
+        return lambda wires: position
+    elif action[0] == "last":
+        colour = action[1]
+        return lambda wires: wires.rindex(colour) + 1
+    raise ValueError("Unknown Wires action: {}".format(action))
+
+
+def _button_condition(spec):
+    """
+    Compile a *Button* condition into a function of the text, colour, number
+    of batteries and lit indicators.
+
+    """
+    kind = spec[0]
+    if kind == "text":
+        text = spec[1].lower()
+        return lambda text_, colour, n_batteries, lit: text_ == text
+    elif kind == "colour":
+        colour = spec[1]
+        return lambda text, colour_, n_batteries, lit: colour_ == colour
+    elif kind == "batteries":
+        compare, value = _COMPARISONS[spec[1]], spec[2]
+        return lambda text, colour, n_batteries, lit: compare(n_batteries,
+                                                              value)
+    elif kind == "indicator":
+        label = spec[1].upper()
+        return lambda text, colour, n_batteries, lit: label in lit
+    raise ValueError("Unknown Button condition: {}".format(spec))
+
+
+def _edgework_condition(spec):
+    """
+    Compile an edgework condition into a function of the parity, number of
+    batteries and ports.
+
+    """
+    kind = spec[0]
+    if kind == "serial":
+        odd = _parity(spec)
+        return lambda last_odd, n_batteries, ports: bool(last_odd) == odd
+    elif kind == "batteries":
+        compare, value = _COMPARISONS[spec[1]], spec[2]
+        return lambda last_odd, n_batteries, ports: compare(n_batteries, value)
+    elif kind == "port":
+        port = spec[1].lower()
+        return lambda last_odd, n_batteries, ports: port in ports
+    raise ValueError("Unknown edgework condition: {}".format(spec))
+
+
+def _battery_cap(specs):
+    """
+    Find the number of batteries above which no condition changes.
+
+    Counts can then be clipped to it when looking up a table.
+
+    """
+    values = [spec[2] for spec in specs if spec[0] == "batteries"]
+    return max(values) + 1 if values else 0
+
+
+class ButtonTable(object):
+    """
+    Whether to hold a *Button*, for one number of batteries and set of lit
+    indicators.
+
+    """
+    __slots__ = ("_rows",)
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def hold(self, text, colour):
+        """
+        Decide whether a button is to be held.
+
+        Parameters
+        ----------
+        text : str
+            The text on the button, in any case.
+        colour : str
+            The colour code of the button.
+
+        Returns
+        -------
+        bool
+            True if the button is to be held.
+
+        """
+        row = self._rows.get(text.lower()) or self._rows[None]
+        return row.get(colour, row[None])
+
+
+class Manual(object):
+    """
+    The compiled rules of a manual revision.
+
+    Parameters
+    ----------
+    data : dict
+        The decoded manual.
+
+    Attributes
+    ----------
+    version : str
+        The revision of the manual, such as "v1r2".
+    verification : int
+        The verification code of the manual.
+    button_texts : tuple of str
+        The lowercase button texts which the *Button* rules mention. Any other
+        text is treated alike.
+    button_colours : tuple of str
+        The button colours which the *Button* rules mention, in the same way.
+    complicated_instructions : tuple of str
+        The letter of each complicated wire, indexed by its LED, red, blue and
+        star bits, most significant first.
+    memory_rules : tuple of dict
+        The action of each *Memory* stage by display, as for `memory`. The
+        action under None applies to any other display.
+
+    Raises
+    ------
+    ValueError
+        If a rule cannot be compiled.
+
+    """
+    def __init__(self, data):
+        self.version = data.get("version")
+        self.verification = data.get("verification")
+        self._compile_wires(data["wires"])
+        self._compile_button(data["button"])
+        self._compile_complicated(data["complicated"])
+        self._compile_knob(data["knob"])
+        self._compile_memory(data["memory"])
+
+    def _compile_wires(self, section):
+        self._wires = {}
+        for n_wires, rules in section.items():
+            n_wires = int(n_wires)
+            self._wires[n_wires] = tuple(
+                (tuple(_wires_condition(spec) for spec in rule.get("if", ())),
+                 _wires_cut(rule["cut"], n_wires))
+                for rule in rules)
+
+    def _compile_button(self, section):
+        specs = [spec for rule in section["hold"]
+                 for spec in rule.get("if", ())]
+        self._button_rules = tuple(
+            (tuple(_button_condition(spec) for spec in rule.get("if", ())),
+             bool(rule["hold"]))
+            for rule in section["hold"])
+        self.button_texts = tuple(sorted(set(
+            spec[1].lower() for spec in specs if spec[0] == "text")))
+        self.button_colours = tuple(sorted(set(
+            spec[1] for spec in specs if spec[0] == "colour")))
+        self._button_indicators = frozenset(spec[1].upper() for spec in specs
+                                            if spec[0] == "indicator")
+        self._button_cap = _battery_cap(specs)
+        self._button_tables = {}
+        release = section["release"]
+        self._release = dict((colour.lower(), number)
+                             for colour, number in release.items()
+                             if colour != "*")
+        self._release_default = release["*"]
+
+    def _compile_complicated(self, section):
+        wires = section["wires"]
+        self.complicated_instructions = tuple(
+            wires["{:04b}".format(case)] for case in range(16))
+        self._letters = {}
+        specs = []
+        for letter, cut in section["letters"].items():
+            if isinstance(cut, bool):
+                self._letters[letter] = cut
+            else:
+                specs.extend(cut)
+                self._letters[letter] = tuple(_edgework_condition(spec)
+                                              for spec in cut)
+        unknown = set(self.complicated_instructions) - set(self._letters)
+        if unknown:
+            raise ValueError("No rule for letters {}".format(
+                ", ".join(sorted(unknown))))
+        self._complicated_ports = frozenset(spec[1].lower() for spec in specs
+                                            if spec[0] == "port")
+        self._complicated_cap = _battery_cap(specs)
+        self._complicated_masks = {}
+
+    def _compile_knob(self, section):
+        self._knob = {}
+        self._knob_split = {}
+        for top, direction in section.items():
+            if isinstance(direction, dict):
+                self._knob_split[top] = (
+                    dict((bottom, answer) for bottom, answer
+                         in direction.items() if bottom != "*"),
+                    direction["*"])
+            elif top != "*":
+                self._knob[top] = direction
+        self._knob_default = section["*"]
+
+    def _compile_memory(self, section):
+        stages = []
+        for stage in section:
+            rules = {}
+            for display, action in stage.items():
+                if action[0] not in _MEMORY_ACTIONS:
+                    raise ValueError("Unknown Memory action: {}"
+                                     .format(action))
+                rules[None if display == "*" else display] = tuple(action)
+            stages.append(rules)
+        self.memory_rules = tuple(stages)
+
+    def wires(self, wires, last_odd):
+        """
+        Apply the *Wires* rules to a single panel.
+
+        Parameters
+        ----------
+        wires : str
+            The lowercase wire code, as for `Bomb.wires`.
+        last_odd : bool
+            Whether the last digit of the serial number is odd.
+
+        Returns
+        -------
+        int
+            The position of the wire to cut, starting with one.
+
+        Raises
+        ------
+        ValueError
+            If there are no rules for that many wires.
+
+        """
+        try:
+            rules = self._wires[len(wires)]
+        except KeyError:
+            raise ValueError("No Wires rules for {} wires".format(len(wires)))
+        for conditions, cut in rules:
+            for condition in conditions:
+                if not condition(wires, last_odd):
+                    break
+            else:
+                return cut(wires)
+
+    def button(self, n_batteries, indicators):
+        """
+        Get the *Button* table for the edgework of a bomb.
+
+        Tables are compiled on first use, and shared by all bombs with
+        edgework the rules cannot tell apart.
+
+        Parameters
+        ----------
+        n_batteries : int
+            The number of batteries.
+        indicators : iterable of str
+            The labels of the lit indicators.
+
+        Returns
+        -------
+        ButtonTable
+            Whether to hold each button.
+
+        """
+        key = (min(n_batteries, self._button_cap),
+               self._button_indicators.intersection(
+                   label.upper() for label in indicators))
+        try:
+            return self._button_tables[key]
+        except KeyError:
+            pass
+        n_batteries, lit = key
+        rows = {}
+        for text in self.button_texts + (None,):
+            row = rows[text] = {}
+            for colour in self.button_colours + (None,):
+                for conditions, hold in self._button_rules:
+                    if all(condition(text, colour, n_batteries, lit)
+                           for condition in conditions):
+                        row[colour] = hold
+                        break
+        table = self._button_tables[key] = ButtonTable(rows)
+        return table
+
+    def release(self, strip):
+        """
+        Find the digit at which to release a held *Button*.
+
+        Parameters
+        ----------
+        strip : str
+            The colour code of the strip, in any case.
+
+        Returns
+        -------
+        str
+            The digit, in words.
+
+        """
+        return self._release.get(strip.lower(), self._release_default)
+
+    def complicated_mask(self, last_odd, n_batteries, ports):
+        """
+        Resolve the *Complicated Wires* instructions against the edgework.
+
+        Parameters
+        ----------
+        last_odd : bool
+            Whether the last digit of the serial number is odd.
+        n_batteries : int
+            The number of batteries.
+        ports : iterable of str
+            The names of the ports on the bomb.
+
+        Returns
+        -------
+        mask : int
+            A 16-bit mask with the bit of each case in
+            `complicated_instructions` set if the wire is to be cut.
+
+        """
+        key = (bool(last_odd), min(n_batteries, self._complicated_cap),
+               self._complicated_ports.intersection(
+                   port.lower() for port in ports))
+        try:
+            return self._complicated_masks[key]
+        except KeyError:
+            pass
+        cut = {}
+        for letter, conditions in self._letters.items():
+            if isinstance(conditions, bool):
+                cut[letter] = conditions
+            else:
+                cut[letter] = all(condition(*key) for condition in conditions)
+        mask = 0
+        for case, letter in enumerate(self.complicated_instructions):
+            if cut[letter]:
+                mask |= 1 << case
+        self._complicated_masks[key] = mask
+        return mask
+
+    def knob_needs_bottom(self, top_row):
+        """Check whether the bottom row of a *Knob* is needed."""
+        return top_row in self._knob_split
+
+    def knob(self, top_row, bottom_row=None):
+        """
+        Find the direction of a *Knob*.
+
+        Parameters
+        ----------
+        top_row : str
+            The LEDs on the top row, as for `Bomb.knob`.
+        bottom_row : str, optional
+            The LEDs on the bottom row. Only needed if `knob_needs_bottom`.
+
+        Returns
+        -------
+        str or None
+            The direction relative to "UP" in which to move the knob. None if
+            the bottom row is needed but not given.
+
+        """
+        direction = self._knob.get(top_row)
+        if direction is not None:
+            return direction
+        split = self._knob_split.get(top_row)
+        if split is None:
+            return self._knob_default
+        elif bottom_row is None:
+            return None
+        return split[0].get(bottom_row, split[1])
+
+    def memory(self, stage, display):
+        """
+        Find the action for a *Memory* stage.
+
+        Parameters
+        ----------
+        stage : int
+            The stage, starting with one. Any stage after the last one uses its
+            rules.
+        display : str
+            The number on the display.
+
+        Returns
+        -------
+        (str, object) or None
+            The kind of action, and its argument. The kinds are "position" and
+            "label", with the position from one or the label of the button to
+            press, and "position of" and "label of", with the stage from one
+            whose button to match. None if no rule applies.
+
+        """
+        rules = self.memory_rules[min(stage, len(self.memory_rules)) - 1]
+        return rules.get(display, rules.get(None))
+
+
+def load(path):
+    """
+    Compile a manual from a JSON file.
+
+    Parameters
+    ----------
+    path : str
+        The manual file.
+
+    Returns
+    -------
+    Manual
+        The compiled rules.
+
+    """
+    with open(path) as manual:
+        return Manual(json.load(manual))
@@ -0,0 +1,431 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+"""
+Session server for running many bombs at once.
+
+Each expert station connects over TCP and exchanges newline-delimited JSON.
+Every request is an object with an ``op`` field, and optionally an ``id``
+which is echoed back in the response.
+
+- ``{"op": "new", "serial": "ipzcv0", "batteries": 1, "parallel": true}``
+  creates a session, and returns its ``session`` ID. ``frk`` and ``car`` are
+  also accepted.
+- ``{"op": "solve", "session": ..., "module": "wires", "args": ["wbk"]}``
+  solves a module in one call, and returns its ``result``.
+- ``{"op": "start", "session": ..., "module": "simon", "args": []}`` starts
+  a multi-step module, and returns its ``machine`` ID and first ``prompt``.
+  Only ``morse`` (whether the letters start the word) and ``passwords``
+  (the initial letters) take arguments.
+- ``{"op": "send", "session": ..., "machine": ..., "observation": "r"}``
+  advances a multi-step module, and returns its ``result``, next
+  ``prompt``, and whether it is ``done``.
+- ``{"op": "solve_all", "session": ..., "modules": [...]}`` plans every
+  module in one call, as for `Bomb.solve_all`, with each module as for
+  ``solve`` and ``start``, and optionally its ``observations`` so far. It
+  returns the ``plan``, each step with the ``index`` and ``module`` it is
+  for, and its ``result`` or ``error``. A step which needs live input also
+  has its ``prompt``, and the ``machine`` ID of a multi-step module.
+- ``{"op": "strike", "session": ...}`` registers a strike, and returns the
+  number of ``strikes`` and the ``corrections`` of the running Simon Says
+  modules, by machine ID.
+- ``{"op": "close", "session": ...}`` ends a session.
+
+Failed requests get an ``error`` message instead, as do lines over 1 MiB.
+
+Run ``python server.py`` to serve on localhost, or ``python server.py
+--load-test 1000`` to measure the throughput of a local server.
+
+Requires Python 3.
+
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+
+from solver import Bomb, solve_module, start_module
+
+
+async def _read_line(reader):
+    """
+    Read a request line, discarding it whole if it is over the stream limit.
+
+    Parameters
+    ----------
+    reader : asyncio.StreamReader
+        The incoming stream.
+
+    Returns
+    -------
+    bytes or None
+        The line, which is empty at the end of the stream, or None if it was
+        too long.
+
+    """
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as error:
+        return error.partial
+    except asyncio.LimitOverrunError:
+        pass
+    # The rest of the line may not have arrived yet.
+    while True:
+        try:
+            await reader.readuntil(b"\n")
+            return None
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError as error:
+            await reader.readexactly(error.consumed)
+
+
+class _Session(object):
+    """
+    A bomb being defused, with its multi-step modules in progress.
+
+    """
+    __slots__ = ("bomb", "machines", "ids")
+
+    def __init__(self, bomb):
+        self.bomb = bomb
+        self.machines = {}
+        self.ids = itertools.count(1)
+
+
+class SessionServer(object):
+    """
+    Route requests to the bombs of many sessions.
+
+    All sessions are held in a single process. Since the solvers do not
+    block, every request is handled to completion on the event loop.
+
+    Attributes
+    ----------
+    sessions : dict
+        The sessions, by ID.
+
+    """
+    def __init__(self):
+        self.sessions = {}
+        self._ids = itertools.count(1)
+
+    def handle(self, request):
+        """
+        Handle a single request.
+
+        Parameters
+        ----------
+        request : dict
+            The decoded request.
+
+        Returns
+        -------
+        dict
+            The response.
+
+        """
+        if not isinstance(request, dict):
+            return {"error": "Not a request: {}".format(json.dumps(request))}
+        response = {}
+        if "id" in request:
+            response["id"] = request["id"]
+        op = request.get("op")
+        handler = (getattr(self, "_op_" + op, None) if isinstance(op, str)
+                   else None)
+        if handler is None:
+            response["error"] = "Unknown op: {}".format(op)
+            return response
+        try:
+            response.update(handler(request))
+        except Exception as error:
+            response["error"] = "{}: {}".format(type(error).__name__, error)
+        return response
+
+    def _session(self, request):
+        try:
+            return self.sessions[request["session"]]
+        except KeyError:
+            raise KeyError("No such session")
+
+    def _op_new(self, request):
+        bomb = Bomb(request["serial"], request.get("batteries", 0),
+                    has_parallel=request.get("parallel", False),
+                    frk=request.get("frk", False),
+                    car=request.get("car", False))
+        session = "s{}".format(next(self._ids))
+        self.sessions[session] = _Session(bomb)
+        return {"session": session}
+
+    def _op_solve(self, request):
+        bomb = self._session(request).bomb
+        return {"result": solve_module(bomb, request["module"],
+                                       request.get("args", []))}
+
+    def _op_start(self, request):
+        module = request["module"]
+        session = self._session(request)
+        machine = start_module(session.bomb, module, request.get("args", []))
+        name = "{}{}".format(module, next(session.ids))
+        session.machines[name] = machine
+        return {"machine": name, "prompt": machine.prompt}
+
+    def _op_solve_all(self, request):
+        session = self._session(request)
+        plan = []
+        for step in session.bomb.solve_all(request.get("modules", [])):
+            entry = {"index": step.index, "module": step.module}
+            if step.error is not None:
+                entry["error"] = step.error
+            else:
+                entry["result"] = step.answer
+            if step.machine is not None:
+                name = "{}{}".format(step.module, next(session.ids))
+                session.machines[name] = step.machine
+                entry["machine"] = name
+            if step.needs_input:
+                entry["prompt"] = step.prompt
+            plan.append(entry)
+        return {"plan": plan}
+
+    def _op_send(self, request):
+        session = self._session(request)
+        machine = session.machines[request["machine"]]
+        result = machine.send(request["observation"])
+        if machine.done:
+            del session.machines[request["machine"]]
+        return {"result": result, "prompt": machine.prompt,
+                "done": machine.done}
+
+    def _op_strike(self, request):
+        session = self._session(request)
+        session.bomb.strike()
+        corrections = dict((name, machine.correction) for name, machine in
+                           session.machines.items()
+                           if getattr(machine, "correction", None) is not None)
+        return {"strikes": session.bomb.n_strikes, "corrections": corrections}
+
+    def _op_close(self, request):
+        del self.sessions[request["session"]]
+        return {}
+
+    async def serve_client(self, reader, writer):
+        """
+        Answer the requests of one connection until it closes.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            The incoming stream.
+        writer : asyncio.StreamWriter
+            The outgoing stream.
+
+        """
+        try:
+            while True:
+                line = await _read_line(reader)
+                if line is None:
+                    response = {"error": "Line too long"}
+                elif not line:
+                    break
+                else:
+                    try:
+                        response = self.handle(json.loads(line))
+                    except ValueError:
+                        response = {"error": "Invalid JSON"}
+                    except TypeError as error:
+                        response = {"error": "TypeError: {}".format(error)}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Start listening for connections.
+
+        Parameters
+        ----------
+        host : str, optional
+            The address to listen on. Defaults to localhost.
+        port : int, optional
+            The port to listen on. Defaults to any free port.
+
+        Returns
+        -------
+        asyncio.AbstractServer
+            The running server.
+
+        """
+        return await asyncio.start_server(self.serve_client, host, port,
+                                          limit=2 ** 20)
+
+
+class Client(object):
+    """
+    A connection to a session server, with one request in flight at a time.
+
+    """
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._ids = itertools.count(1)
+
+    @classmethod
+    async def connect(cls, host, port):
+        """Open a connection to the server at the given address."""
+        reader, writer = await asyncio.open_connection(host, port,
+                                                       limit=2 ** 20)
+        return cls(reader, writer)
+
+    async def request(self, op, **fields):
+        """
+        Send a request and wait for its response.
+
+        Raises
+        ------
+        RuntimeError
+            If the server reports an error.
+
+        """
+        fields["op"] = op
+        fields["id"] = next(self._ids)
+        self.writer.write(json.dumps(fields).encode() + b"\n")
+        response = json.loads(await self.reader.readline())
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def _defuse(client, rng, latencies):
+    """Run a scripted session with one client, timing every request."""
+    async def timed(op, **fields):
+        start = time.perf_counter()
+        response = await client.request(op, **fields)
+        latencies.append(time.perf_counter() - start)
+        return response
+
+    serial = "".join(rng.choice("abcdeuvwxyz012") for _ in range(5))
+    serial += str(rng.randrange(10))
+    session = (await timed("new", serial=serial,
+                           batteries=rng.randrange(5),
+                           parallel=rng.random() < 0.5))["session"]
+    wires = "".join(rng.choice("bkrwy") for _ in range(rng.randrange(3, 7)))
+    await timed("solve", session=session, module="wires", args=[wires])
+    await timed("solve", session=session, module="button",
+                args=[rng.choice(["abort", "detonate", "hold", "press"]),
+                      rng.choice("brwy"), rng.choice("bwy")])
+    await timed("solve", session=session, module="keypad",
+                args=["q", "at", "lambda", "moon"])
+    await timed("solve", session=session, module="maze",
+                args=[[0, 1], [rng.randrange(6), rng.randrange(6)],
+                      [rng.randrange(6), rng.randrange(6)]])
+    machine = (await timed("start", session=session,
+                           module="simon"))["machine"]
+    for _ in range(3):
+        await timed("send", session=session, machine=machine,
+                    observation=rng.choice("rgby"))
+    await timed("strike", session=session)
+    await timed("send", session=session, machine=machine, observation="r")
+    machine = (await timed("start", session=session,
+                           module="passwords"))["machine"]
+    await timed("send", session=session, machine=machine,
+                observation="tpw")
+    await timed("close", session=session)
+
+
+async def load_test(n_sessions, n_clients=100, host=None, port=None, seed=0):
+    """
+    Measure the throughput of a session server.
+
+    Each client connects once and runs its share of the sessions one after
+    the other, with all the clients running concurrently. Without an address,
+    a server is started in this process for the duration of the test.
+
+    Parameters
+    ----------
+    n_sessions : int
+        The total number of sessions to run.
+    n_clients : int, optional
+        The number of concurrent connections.
+    host, port : optional
+        The address of a running server.
+    seed : int, optional
+        The seed of the random module observations.
+
+    Returns
+    -------
+    dict
+        The number of requests, the elapsed time in seconds, the requests
+        per second, and the median and 99th percentile latency in seconds.
+
+    """
+    server = None
+    if port is None:
+        server = await SessionServer().start()
+        host, port = server.sockets[0].getsockname()[:2]
+    rng = random.Random(seed)
+    latencies = []
+
+    async def run_client(n):
+        client = await Client.connect(host, port)
+        for _ in range(n):
+            await _defuse(client, rng, latencies)
+        await client.close()
+
+    shares = [n_sessions // n_clients + (i < n_sessions % n_clients)
+              for i in range(n_clients)]
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(n) for n in shares if n))
+    elapsed = time.perf_counter() - start
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[int(len(latencies) * 0.99)],
+    }
+
+
+async def _serve(host, port):
+    server = await SessionServer().start(host, port)
+    print("Serving on {}:{}".format(*server.sockets[0].getsockname()[:2]))
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8241)
+    parser.add_argument("--load-test", type=int, metavar="N_SESSIONS",
+                        help="measure a local server instead of serving")
+    parser.add_argument("--clients", type=int, default=100,
+                        help="concurrent connections for the load test")
+    args = parser.parse_args()
+    if args.load_test:
+        stats = asyncio.run(load_test(args.load_test, args.clients))
+        print("{requests} requests in {seconds:.2f} s: "
+              "{requests_per_second:.0f} requests/s, "
+              "p50 {p50:.6f} s, p99 {p99:.6f} s".format(**stats))
+    else:
+        try:
+            asyncio.run(_serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
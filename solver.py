@@ -3,7 +3,9 @@
 """
 Solver for *Keep Talking and Nobody Explodes*.
 
-Based on *Bomb Defusal Manual*, v1r2, verification code 241. [#]_
+Based on *Bomb Defusal Manual*, v1r2, verification code 241. [#]_ The rules
+which differ between revisions of the manual are read from ``manuals/``, and
+another revision can be used with `use_manual`.
 
 References
 ----------
@@ -11,6 +13,1452 @@ References
        http://www.bombmanual.com/manual/1/html/index.html
 
 """
+import collections
+import hashlib
+import itertools
+import mmap
+import os
+import struct
+import weakref
+from types import MappingProxyType as _freeze
+
+import rules
+
+
+WIRE_COLOURS = "bkrwy"
+
+ORDINALS = ("FIRST", "SECOND", "THIRD", "FOURTH", "FIFTH", "SIXTH")
+
+# The modules solved in a single call, by `Bomb` method.
+SOLVERS = ("wires", "wires_batch", "button", "keypad", "keypad_batch",
+           "whos_step", "complicated_panel", "maze", "maze_many",
+           "morse_stream", "morse_timing", "venting", "capacitor", "knob")
+
+# The modules solved over several observations. Each has a `Bomb` method
+# named after it with a "_machine" suffix.
+MACHINES = ("simon", "whos", "memory", "morse", "complicated", "sequences",
+            "passwords")
+
+# The types of the arguments which each multi-step module may be started
+# with from plain data, as by `start_module`. The others, such as the
+# callback of Simon Says, are only for local callers.
+_MACHINE_ARGS = {"morse": (bool,), "passwords": ((str, type(None)),)}
+
+# The rules of the manual in use. See `rules` for the format.
+MANUAL_PATH = os.environ.get(
+    "KTANE_MANUAL",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "manuals",
+                 "v1r2-241.json"))
+
+_manual = None
+
+
+def manual():
+    """Get the compiled rules of the manual in use, loading them if needed."""
+    global _manual
+    if _manual is None:
+        _manual = rules.load(MANUAL_PATH)
+    return _manual
+
+
+def use_manual(path):
+    """
+    Use the rules of another revision of the manual.
+
+    The tables built from the previous rules are dropped, as is any answer
+    file compiled from them. Bombs resolve the rules which depend on their
+    edgework when it is set, so this should be called before making any.
+
+    Parameters
+    ----------
+    path : str
+        The manual file.
+
+    Returns
+    -------
+    rules.Manual
+        The compiled rules.
+
+    Raises
+    ------
+    ValueError
+        If a rule cannot be compiled. The rules in use are kept.
+
+    """
+    global MANUAL_PATH, _manual, _memory_stages
+    compiled = rules.load(path)
+    MANUAL_PATH, _manual = path, compiled
+    _memory_stages = None
+    open_answers()
+    return compiled
+
+
+# The compiled answer file, which is built with ``python solver.py [path]``
+# and shared read-only between processes.
+ANSWERS_PATH = os.environ.get(
+    "KTANE_ANSWERS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "solver.answers"))
+
+_ANSWERS_MAGIC = b"KTANSWER"
+_ANSWERS_VERSION = 1
+_ANSWERS_HEADER = struct.Struct("<8sHH20s")
+_ANSWERS_SECTION = struct.Struct("<8sII")
+
+# The item format of each section, as for `struct`.
+_ANSWERS_FORMATS = {b"wires": "B", b"mazes": "b", b"password": "Q"}
+
+_answer_sections = None
+
+
+def _rules_digest():
+    """
+    Get the digest of the rules, from the source of this module and of
+    `rules`, and from the manual in use.
+
+    An answer file compiled from any other version of the rules is stale.
+
+    """
+    digest = hashlib.sha1()
+    for module in (__file__, rules.__file__):
+        source = os.path.splitext(os.path.abspath(module))[0] + ".py"
+        with open(source, "rb") as code:
+            digest.update(code.read())
+    with open(MANUAL_PATH, "rb") as data:
+        digest.update(data.read())
+    return digest.digest()
+
+
+def _load_answers(path):
+    """
+    Map a compiled answer file into memory.
+
+    Parameters
+    ----------
+    path : str
+        The answer file.
+
+    Returns
+    -------
+    dict
+        The items of each section, as a read-only `memoryview` of the file,
+        keyed by section name. It is empty if the file is missing, corrupt, or
+        stale.
+
+    """
+    try:
+        with open(path, "rb") as answers:
+            data = mmap.mmap(answers.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_sections, digest = _ANSWERS_HEADER.unpack_from(data)
+        if (magic, version, digest) != (_ANSWERS_MAGIC, _ANSWERS_VERSION,
+                                        _rules_digest()):
+            return {}
+        view = memoryview(data)
+        sections = {}
+        for i in range(n_sections):
+            name, offset, length = _ANSWERS_SECTION.unpack_from(
+                data, _ANSWERS_HEADER.size + i * _ANSWERS_SECTION.size)
+            name = name.rstrip(b"\0")
+            sections[name] = view[offset:offset + length].cast(
+                _ANSWERS_FORMATS[name])
+        return sections
+    except (OSError, ValueError, TypeError, KeyError, struct.error):
+        return {}
+
+
+def _answers():
+    """Get the sections of the answer file, opening it on first use."""
+    global _answer_sections
+    if _answer_sections is None:
+        _answer_sections = _load_answers(ANSWERS_PATH)
+    return _answer_sections
+
+
+def open_answers(path=None):
+    """
+    Use a compiled answer file for the tables of this process.
+
+    The tables built so far are dropped, and are read from the file instead
+    when next used. If the file cannot be used, they are computed in memory.
+
+    Parameters
+    ----------
+    path : str, optional
+        The answer file. Defaults to `ANSWERS_PATH`, or the file last opened.
+
+    Returns
+    -------
+    bool
+        True if the file is in use.
+
+    """
+    global ANSWERS_PATH, _answer_sections, _wires_tables, _password_masks
+    if path is not None:
+        ANSWERS_PATH = path
+    _answer_sections = _load_answers(ANSWERS_PATH)
+    _wires_tables = None
+    _password_masks = None
+    _maze_routes[:] = [None] * len(_MAZES)
+    return bool(_answer_sections)
+
+
+def write_answers(path=None):
+    """
+    Compile the answer tables into a file.
+
+    The file holds every *Wires* answer, the routing tables of every maze,
+    and the *Passwords* index, in the byte order of this machine.
+
+    Parameters
+    ----------
+    path : str, optional
+        The answer file. Defaults to `ANSWERS_PATH`. It is replaced
+        atomically, so running processes keep reading the old version.
+
+    Returns
+    -------
+    str
+        The path of the file.
+
+    """
+    if path is None:
+        path = ANSWERS_PATH
+    wires = bytearray()
+    for last_odd in (False, True):
+        for n_wires in range(3, 7):
+            for code in itertools.product(WIRE_COLOURS, repeat=n_wires):
+                wires.append(ORDINALS.index(_solve_wires("".join(code),
+                                                         last_odd)))
+    mazes = b"".join(struct.pack("36b", *hops)
+                     for index in range(len(_MAZES))
+                     for hops in _build_maze_routes(index))
+    masks = _build_password_masks()
+    password = struct.pack("={}Q".format(5 * 26), *(
+        masks.get((position, chr(letter)), 0)
+        for position in range(5) for letter in range(ord("a"), ord("z") + 1)))
+
+    sections = ((b"wires", bytes(wires)), (b"mazes", mazes),
+                (b"password", password))
+    header = _ANSWERS_HEADER.pack(_ANSWERS_MAGIC, _ANSWERS_VERSION,
+                                  len(sections), _rules_digest())
+    offset = len(header) + len(sections) * _ANSWERS_SECTION.size
+    table = []
+    body = []
+    for name, data in sections:
+        # Keep every section aligned for its items.
+        padding = -offset % 8
+        body.append(b"\0" * padding + data)
+        offset += padding
+        table.append(_ANSWERS_SECTION.pack(name, offset, len(data)))
+        offset += len(data)
+
+    temporary = "{}.{}.tmp".format(path, os.getpid())
+    with open(temporary, "wb") as answers:
+        answers.write(header + b"".join(table) + b"".join(body))
+    os.replace(temporary, path)
+    return path
+
+
+_wires_tables = None
+
+
+def _solve_wires(wires, last_odd):
+    """
+    Apply the *Wires* rules to a single panel.
+
+    Parameters
+    ----------
+    wires : str
+        The lowercase wire code, as for `Bomb.wires`.
+    last_odd : bool
+        Whether the last digit of the serial number is odd.
+
+    Returns
+    -------
+    to_cut : str
+        The wire to cut, ordinal from left to right starting with one.
+
+    """
+    return ORDINALS[manual().wires(wires, last_odd) - 1]
+
+
+def _wires_table():
+    """
+    Get the exhaustive *Wires* answer table, building it on first use.
+
+    Returns
+    -------
+    tuple of mapping
+        The answers for every panel of three to six wires, keyed by the wire
+        code. The first mapping is for an even last digit, the second for odd.
+
+    """
+    global _wires_tables
+    if _wires_tables is None and b"wires" in _answers():
+        answers = _answers()[b"wires"]
+        half = len(answers) // 2
+        _wires_tables = (_WiresAnswers(answers[:half]),
+                         _WiresAnswers(answers[half:]))
+    if _wires_tables is None:
+        tables = ({}, {})
+        for last_odd, table in enumerate(tables):
+            for n_wires in range(3, 7):
+                for code in itertools.product(WIRE_COLOURS, repeat=n_wires):
+                    wires = "".join(code)
+                    table[wires] = _solve_wires(wires, last_odd)
+        _wires_tables = tuple(_freeze(table) for table in tables)
+    return _wires_tables
+
+
+# The offset of the first panel with each number of wires in the compiled
+# answers, which are numbered in base five within each length.
+_WIRES_OFFSETS = {3: 0, 4: 125, 5: 750, 6: 3875}
+
+_wires_digit_table = None
+
+
+def _wires_digits():
+    """
+    Get the translation of wire colours to base-five digits, building it on
+    first use. Any other byte is translated to "x".
+
+    """
+    global _wires_digit_table
+    if _wires_digit_table is None:
+        _wires_digit_table = bytes(bytearray(
+            ord(str(WIRE_COLOURS.index(chr(byte)))) if chr(byte) in
+            WIRE_COLOURS else ord("x") for byte in range(256)))
+    return _wires_digit_table
+
+
+class _WiresAnswers(object):
+    """
+    The *Wires* answers for one parity, read from the compiled answer file.
+
+    Parameters
+    ----------
+    answers : memoryview
+        The index in `ORDINALS` of the answer to every panel.
+
+    """
+    __slots__ = ("_answers",)
+
+    def __init__(self, answers):
+        self._answers = answers
+
+    def __len__(self):
+        return len(self._answers)
+
+    def __getitem__(self, wires):
+        try:
+            code = int(wires.encode("utf-8").translate(
+                _wires_digit_table or _wires_digits()), 5)
+            code += _WIRES_OFFSETS[len(wires)]
+        except (ValueError, KeyError):
+            raise KeyError(wires)
+        return ORDINALS[self._answers[code]]
+
+
+KEYPAD_COLUMNS = (
+    ("q", "at", "lambda", "koppa", "an", "h", "moon"),
+    ("eh", "q", "moon", "loop", "star", "h", "que"),
+    ("copy", "ot", "loop", "zhe", "hoe", "lambda", "star"),
+    ("6", "para", "b", "an", "zhe", "que", "smile"),
+    ("psi", "smile", "b", "c", "para", "ksi", "black"),
+    ("6", "eh", "neq", "ae", "psi", "i", "omega"),
+)
+
+# Other names for the keypad symbols, by the name used in `KEYPAD_COLUMNS`.
+_KEYPAD_NAMES = _freeze({
+    "q": ("neuter", "uncrossed-female", "hand-mirror"),
+    "at": ("three-legged a", "little yus"),
+    "lambda": ("crossed lambda", "half-life"),
+    "an": ("cthulhu", "big yus"),
+    "koppa": ("zigzag",),
+    "h": ("cursive h",),
+    "moon": ("crescent", "backwards c", "backwards c with a dot"),
+    "eh": ("epsilon", "epsilon umlaut", "euro"),
+    "loop": ("rollercoaster", "cursive i", "loop-dee-loop"),
+    "star": ("open star", "empty star"),
+    "que": ("question", "upside-down question mark",
+            "spanish question mark"),
+    "copy": ("copyright",),
+    "ot": ("butt", "xbox", "cyrillic omega"),
+    "zhe": ("x with an i",),
+    "hoe": ("komi dzje", "incomplete r", "trailing off 3"),
+    "b": ("keyblade", "crossed b", "barred b", "bt smashed"),
+    "6": ("six", "smashed 6", "upside-down g", "hooktop b"),
+    "para": ("paragraph", "line-break", "backwards p"),
+    "smile": ("derp-face", "smiley", "isolated teh"),
+    "c": ("c with a dot",),
+    "ksi": ("dragon", "alien 3", "3-with-antenna"),
+    "black": ("blackstar", "filled star", "full star"),
+    "psi": ("trident",),
+    "neq": ("neck", "inequality", "unequal"),
+    "ae": ("a e", "ash"),
+    "i": ("n", "n with antenna", "n with tail"),
+    "omega": (),
+})
+
+_keypad_aliases = None
+
+_keypad_columns = None
+
+_keypad_orders = {}
+
+
+def keypad_aliases():
+    """
+    Get the canonical name of every keypad symbol, building them on first
+    use.
+
+    Returns
+    -------
+    mapping
+        The canonical name of each symbol, by each of its names, such as
+        "copyright" for "copy".
+
+    """
+    global _keypad_aliases
+    if _keypad_aliases is None:
+        _keypad_aliases = _freeze(dict(
+            (name, symbol) for symbol, names in _KEYPAD_NAMES.items()
+            for name in names + (symbol,)))
+    return _keypad_aliases
+
+
+def _keypad_index():
+    """
+    Get the columns containing each keypad symbol, building them on first use.
+
+    Returns
+    -------
+    mapping
+        The bitmask of the columns in `KEYPAD_COLUMNS` containing each symbol.
+
+    """
+    global _keypad_columns
+    if _keypad_columns is None:
+        index = {}
+        for i, column in enumerate(KEYPAD_COLUMNS):
+            for symbol in column:
+                index[symbol] = index.get(symbol, 0) | 1 << i
+        _keypad_columns = _freeze(index)
+    return _keypad_columns
+
+
+def _keypad_order(symbols):
+    """
+    Find the order in which keypad symbols are to be pressed.
+
+    The order for each set of symbols is cached after first use.
+
+    Parameters
+    ----------
+    symbols : frozenset of str
+        The canonical names of the symbols.
+
+    Returns
+    -------
+    tuple of str
+        The symbols, in order.
+
+    Raises
+    ------
+    ValueError
+        If no column contains all of the symbols.
+
+    """
+    try:
+        return _keypad_orders[symbols]
+    except KeyError:
+        pass
+    index = _keypad_index()
+    columns = (1 << len(KEYPAD_COLUMNS)) - 1
+    for symbol in symbols:
+        columns &= index.get(symbol, 0)
+    if not columns:
+        raise ValueError("No column contains all of {}"
+                         .format(", ".join(sorted(symbols))))
+    column = KEYPAD_COLUMNS[(columns & -columns).bit_length() - 1]
+    order = tuple(symbol for symbol in column if symbol in symbols)
+    _keypad_orders[symbols] = order
+    return order
+
+
+_MAZES = (
+    # Indicators at (0, 1) and (5, 2).
+    (
+        ("rd", "lr", "ld", "rd", "lr", "l"),
+        ("ud", "rd", "ul", "ur", "lr", "ld"),
+        ("ud", "ur", "ld", "rd", "lr", "uld"),
+        ("ud", "r", "ulr", "lu", "r", "uld"),
+        ("urd", "lr", "ld", "rd", "l", "ud"),
+        ("ur", "l", "ur", "ul", "r", "ul"),
+    ),
+    # Indicators at (4, 1) and (1, 3).
+    (
+        ("r", "lrd", "l", "rd", "lrd", "l"),
+        ("rd", "ul", "rd", "ul", "ur", "ld"),
+        ("ud", "rd", "ul", "rd", "lr", "uld"),
+        ("urd", "ul", "rd", "ul", "d", "ud"),
+        ("ud", "d", "ud", "rd", "ul", "ud"),
+        ("u", "ur", "ul", "ur", "lr", "lu"),
+    ),
+    # Indicators at (3, 3) and (5, 3).
+    (
+        ("dr", "lr", "ld", "d", "dr", "dl"),
+        ("u", "d", "ud", "ur", "lu", "ud"),
+        ("dr", "uld", "ud", "rd", "ld", "ud"),
+        ("ud", "ud", "ud", "ud", "ud", "ud"),
+        ("ud", "ur", "ul", "ud", "ud", "ud"),
+        ("ur", "lr", "lr", "ul", "ur", "ul"),
+    ),
+    # Indicators at (0, 0) and (0, 3).
+    (
+        ("rd", "ld", "r", "lr", "lr", "ld"),
+        ("ud", "ud", "dr", "lr", "lr", "uld"),
+        ("ud", "ur", "lu", "rd", "l", "ud"),
+        ("ud", "r", "lr", "lru", "lr", "lud"),
+        ("udr", "lr", "lr", "lr", "ld", "ud"),
+        ("ur", "lr", "l", "r", "ul", "u"),
+    ),
+    # Indicators at (4, 2) and (3, 5).
+    (
+        ("r", "lr", "lr", "lr", "lrd", "ld"),
+        ("rd", "lr", "lr", "lrd", "lu", "u"),
+        ("udr", "ld", "r", "ul", "rd", "ld"),
+        ("ud", "ur", "lr", "ld", "u", "ud"),
+        ("ud", "rd", "lr", "ulr", "l", "ud"),
+        ("u", "ur", "lr", "lr", "lr", "lu"),
+    ),
+    # Indicators at (4, 0) and (2, 4).
+    (
+        ("d", "dr", "ld", "r", "ldr", "ld"),
+        ("ud", "ud", "ud", "rd", "ul", "ud"),
+        ("udr", "ul", "u", "ud", "rd", "ul"),
+        ("ur", "ld", "dr", "udl", "ud", "d"),
+        ("rd", "ul", "u", "ud", "ur", "uld"),
+        ("ur", "lr", "lr", "ul", "r", "ul"),
+    ),
+    # Indicators at (1, 0) and (1, 5).
+    (
+        ("dr", "lr", "lr", "ld", "dr", "ld"),
+        ("ud", "rd", "l", "ur", "lu", "ud"),
+        ("ur", "ul", "rd", "l", "rd", "ul"),
+        ("dr", "ld", "udr", "lr", "ul", "d"),
+        ("ud", "u", "ur", "lr", "ld", "ud"),
+        ("ur", "lr", "lr", "lr", "ulr", "ul"),
+    ),
+    # Indicators at (3, 0) and (2, 3).
+    (
+        ("d", "dr", "lr", "ld", "dr", "ld"),
+        ("udr", "ulr", "l", "ur", "ul", "ud"),
+        ("ud", "dr", "lr", "lr", "ld", "ud"),
+        ("ud", "ur", "ld", "r", "ulr", "ul"),
+        ("ud", "d", "ur", "lr", "lr", "l"),
+        ("ur", "ulr", "lr", "lr", "lr", "l"),
+    ),
+    # Indicators at (1, 2) and (0, 4).
+    (
+        ("d", "dr", "lr", "lr", "ldr", "ld"),
+        ("ud", "ud", "rd", "l", "ud", "ud"),
+        ("udr", "ulr", "ul", "rd", "ul", "ud"),
+        ("ud", "d", "dr", "ul", "r", "uld"),
+        ("ud", "ud", "ud", "dr", "dl", "u"),
+        ("ur", "ul", "ur", "ul", "ur", "l"),
+    ),
+)
+
+_MAZE_INDEX = _freeze({
+    (0, 1): 0, (5, 2): 0,
+    (4, 1): 1, (1, 3): 1,
+    (3, 3): 2, (5, 3): 2,
+    (0, 0): 3, (0, 3): 3,
+    (4, 2): 4, (3, 5): 4,
+    (4, 0): 5, (2, 4): 5,
+    (1, 0): 6, (1, 5): 6,
+    (3, 0): 7, (2, 3): 7,
+    (1, 2): 8, (0, 4): 8,
+})
+
+_MAZE_MOVES = ((-6, "up"), (6, "down"), (-1, "left"), (1, "right"))
+
+_MAZE_DIRECTIONS = _freeze({"u": 0, "d": 1, "l": 2, "r": 3})
+
+_maze_routes = [None] * len(_MAZES)
+
+
+def _maze_routing_table(index):
+    """
+    Get the next-hop routing table of a maze, compiling it on first use.
+
+    Cells are numbered ``x + 6 * y``.
+
+    Parameters
+    ----------
+    index : int
+        The index of the maze in `_MAZES`.
+
+    Returns
+    -------
+    tuple of sequence of int
+        For each target cell, the index in `_MAZE_MOVES` of the first move
+        along a shortest route from every cell. The target itself has -1.
+
+    """
+    routes = _maze_routes[index]
+    if routes is None:
+        answers = _answers().get(b"mazes")
+        if answers is None:
+            routes = _build_maze_routes(index)
+        else:
+            start = index * 36 * 36
+            routes = tuple(
+                answers[start + target * 36:start + (target + 1) * 36]
+                for target in range(36))
+        _maze_routes[index] = routes
+    return routes
+
+
+def _build_maze_routes(index):
+    """Compute the routing table of a maze, as for `_maze_routing_table`."""
+    walls = [cell for row in _MAZES[index] for cell in row]
+    routes = []
+    for target in range(36):
+        hops = [None] * 36
+        hops[target] = -1
+        queue = collections.deque([target])
+        while queue:
+            cell = queue.popleft()
+            for direction in walls[cell]:
+                move = _MAZE_DIRECTIONS[direction]
+                neighbour = cell + _MAZE_MOVES[move][0]
+                if hops[neighbour] is None:
+                    # The opposite move leads back towards the target.
+                    hops[neighbour] = move ^ 1
+                    queue.append(neighbour)
+        routes.append(tuple(hops))
+    return tuple(routes)
+
+
+def _maze_cell(point):
+    """
+    Get the index of a maze cell, row by row.
+
+    Raises
+    ------
+    ValueError
+        If the point is not in the maze.
+
+    """
+    x, y = point
+    if not (0 <= x < 6 and 0 <= y < 6):
+        raise ValueError("Not in the maze: {}".format(tuple(point)))
+    return x + 6 * y
+
+
+def _maze_route(routes, start, target):
+    """
+    Walk a routing table from the start to the target.
+
+    Parameters
+    ----------
+    routes : sequence of sequence of int
+        The next-hop tables of the maze, from `_maze_routing_table`.
+    start : (int, int)
+        The starting location.
+    target : (int, int)
+        The location of the target.
+
+    Returns
+    -------
+    instructions : list of str
+        The moves along a shortest route.
+
+    Raises
+    ------
+    ValueError
+        If either location is not in the maze.
+
+    """
+    cell = _maze_cell(start)
+    goal = _maze_cell(target)
+    hops = routes[goal]
+    instructions = []
+    while cell != goal:
+        step, name = _MAZE_MOVES[hops[cell]]
+        instructions.append(name)
+        cell += step
+    return instructions
+
+
+PASSWORDS = (
+    "about", "after", "again", "below", "could",
+    "every", "first", "found", "great", "house",
+    "large", "learn", "never", "other", "place",
+    "plant", "point", "right", "small", "sound",
+    "spell", "still", "study", "their", "there",
+    "these", "thing", "think", "three", "water",
+    "where", "which", "world", "would", "write",
+)
+
+_password_masks = None
+
+
+def _password_index():
+    """
+    Get the *Passwords* position index, building it on first use.
+
+    Returns
+    -------
+    mapping
+        The bitmask of the words in `PASSWORDS` with a given letter in a given
+        position, keyed by ``(position, letter)``.
+
+    """
+    global _password_masks
+    if _password_masks is None:
+        answers = _answers().get(b"password")
+        if answers is None:
+            _password_masks = _freeze(_build_password_masks())
+        else:
+            _password_masks = _PasswordMasks(answers)
+    return _password_masks
+
+
+def _build_password_masks():
+    """Compute the *Passwords* position index, as for `_password_index`."""
+    masks = {}
+    for i, word in enumerate(PASSWORDS):
+        for position, letter in enumerate(word):
+            key = (position, letter)
+            masks[key] = masks.get(key, 0) | 1 << i
+    return masks
+
+
+class _PasswordMasks(object):
+    """
+    The *Passwords* position index, read from the compiled answer file.
+
+    Only lowercase letters are known, as in the index built in memory.
+
+    Parameters
+    ----------
+    masks : memoryview
+        The bitmask for each letter from "a" to "z", for each position.
+
+    """
+    __slots__ = ("_masks",)
+
+    def __init__(self, masks):
+        self._masks = masks
+
+    def get(self, key, default=None):
+        position, letter = key
+        if 0 <= position < 5 and "a" <= letter <= "z" and len(letter) == 1:
+            return self._masks[position * 26 + ord(letter) - 97] or default
+        return default
+
+
+MORSE_LETTERS = _freeze({
+    ".-"  : "A",   "-...": "B",   "-.-.": "C",
+    "-.." : "D",   "."   : "E",   "..-.": "F",
+    "--." : "G",   "....": "H",   ".."  : "I",
+    ".---": "J",   "-.-" : "K",   ".-..": "L",
+    "--"  : "M",   "-."  : "N",   "---" : "O",
+    ".--.": "P",   "--.-": "Q",   ".-." : "R",
+    "..." : "S",   "-"   : "T",   "..-" : "U",
+    "...-": "V",   ".--" : "W",   "-..-": "X",
+    "-.--": "Y",   "--..": "Z",
+})
+
+FREQUENCIES = _freeze({
+    "shell": "3.505",
+    "halls": "3.515",
+    "slick": "3.522",
+    "trick": "3.532",
+    "boxes": "3.535",
+    "leaks": "3.542",
+    "strobe": "3.545",
+    "bistro": "3.552",
+    "flick": "3.555",
+    "bombs": "3.565",
+    "break": "3.572",
+    "brick": "3.575",
+    "steak": "3.582",
+    "sting": "3.592",
+    "vector": "3.595",
+    "beats": "3.600",
+})
+
+_morse_tries = None
+
+
+def _morse_trie():
+    """
+    Get the trie of the words in `FREQUENCIES`, building it on first use.
+
+    Each word is spelt as an unbroken sequence of dits and dahs, repeated
+    twice since the signal loops.
+
+    Returns
+    -------
+    children : tuple of mapping
+        The next node for a dit or a dah, for each node.
+    words : tuple of tuple of str
+        The words which pass through each node. The root is node zero.
+
+    """
+    global _morse_tries
+    if _morse_tries is None:
+        codes = dict((letter, code) for code, letter in MORSE_LETTERS.items())
+        children = [{}]
+        words = [[]]
+        for word in sorted(FREQUENCIES):
+            signal = "".join(codes[letter] for letter in word.upper()) * 2
+            node = 0
+            words[node].append(word)
+            for symbol in signal:
+                if symbol not in children[node]:
+                    children[node][symbol] = len(children)
+                    children.append({})
+                    words.append([])
+                node = children[node][symbol]
+                words[node].append(word)
+        _morse_tries = (tuple(_freeze(i) for i in children),
+                        tuple(tuple(i) for i in words))
+    return _morse_tries
+
+
+_morse_rotation_indices = {}
+
+
+def _morse_rotations(from_start=False):
+    """
+    Get the index of the words in `FREQUENCIES` by their letters, building it
+    on first use.
+
+    Since the word loops, the letters may start anywhere in it, and go on
+    past its end. Each node is a window of letters, and has children until
+    only one word has it.
+
+    Parameters
+    ----------
+    from_start : bool, optional
+        Whether the letters start with the first one of the word.
+
+    Returns
+    -------
+    children : tuple of mapping
+        The next node for each letter, for each node. The root is node zero.
+    words : tuple of tuple of str
+        The words which could still be heard, for each node.
+    needed : tuple of int
+        The most letters still needed to tell the words apart, for each node.
+
+    """
+    try:
+        return _morse_rotation_indices[from_start]
+    except KeyError:
+        pass
+    children = []
+    words = []
+    needed = []
+
+    def build(states):
+        """Add the node of a set of words and positions, and its children."""
+        node = len(children)
+        children.append({})
+        words.append(tuple(sorted(set(word for word, _ in states))))
+        needed.append(0)
+        if len(words[node]) > 1:
+            by_letter = {}
+            for word, position in states:
+                by_letter.setdefault(word[position], set()).add(
+                    (word, (position + 1) % len(word)))
+            for letter, following in sorted(by_letter.items()):
+                child = children[node][letter] = build(following)
+                needed[node] = max(needed[node], needed[child] + 1)
+        return node
+
+    build(set((word, position) for word in FREQUENCIES
+              for position in (range(1) if from_start else range(len(word)))))
+    index = _morse_rotation_indices[from_start] = (
+        tuple(_freeze(i) for i in children), tuple(words), tuple(needed))
+    return index
+
+
+SIMON_MAPS = _freeze({
+    # With a vowel in the serial number, by the number of strikes.
+    True: _freeze({
+        0: _freeze({"r": "b", "b": "r", "g": "y", "y": "g"}),
+        1: _freeze({"r": "y", "b": "g", "g": "b", "y": "r"}),
+        2: _freeze({"r": "g", "b": "r", "g": "y", "y": "b"}),
+    }),
+    # Without a vowel.
+    False: _freeze({
+        0: _freeze({"r": "b", "b": "y", "g": "g", "y": "r"}),
+        1: _freeze({"r": "r", "b": "b", "g": "y", "y": "g"}),
+        2: _freeze({"r": "y", "b": "g", "g": "b", "y": "r"}),
+    }),
+})
+
+_SIMON_COLOURS = frozenset("bgry")
+
+_simon_translations = None
+
+
+def _simon_tables(vowel):
+    """
+    Get `SIMON_MAPS` as translation tables, building them on first use.
+
+    Parameters
+    ----------
+    vowel : bool
+        Whether the serial number contains a vowel.
+
+    Returns
+    -------
+    tuple of mapping
+        The table for `str.translate`, by the number of strikes.
+
+    """
+    global _simon_translations
+    if _simon_translations is None:
+        _simon_translations = dict(
+            (has_vowel, tuple(_freeze(dict((ord(flash), press)
+                                           for flash, press in
+                                           maps[strikes].items()))
+                              for strikes in range(3)))
+            for has_vowel, maps in SIMON_MAPS.items())
+    return _simon_translations[vowel]
+
+
+WHOS_RESPONSES = _freeze({
+    "READY": ("YES, OKAY, WHAT, MIDDLE, LEFT, PRESS, RIGHT, BLANK, "
+              "READY, NO, FIRST, UHHH, NOTHING, WAIT"),
+    "FIRST": ("LEFT, OKAY, YES, MIDDLE, NO, RIGHT, NOTHING, UHHH, "
+              "WAIT, READY, BLANK, WHAT, PRESS, FIRST"),
+    "NO": ("BLANK, UHHH, WAIT, FIRST, WHAT, READY, RIGHT, YES, "
+           "NOTHING, LEFT, PRESS, OKAY, NO, MIDDLE"),
+    "BLANK": ("WAIT, RIGHT, OKAY, MIDDLE, BLANK, PRESS, READY, "
+              "NOTHING, NO, WHAT, LEFT, UHHH, YES, FIRST"),
+    "NOTHING": ("UHHH, RIGHT, OKAY, MIDDLE, YES, BLANK, NO, PRESS, "
+                "LEFT, WHAT, WAIT, FIRST, NOTHING, READY"),
+    "YES": ("OKAY, RIGHT, UHHH, MIDDLE, FIRST, WHAT, PRESS, READY, "
+            "NOTHING, YES, LEFT, BLANK, NO, WAIT"),
+    "WHAT": ("UHHH, WHAT, LEFT, NOTHING, READY, BLANK, MIDDLE, NO, "
+             "OKAY, FIRST, WAIT, YES, PRESS, RIGHT"),
+    "UHHH": ("READY, NOTHING, LEFT, WHAT, OKAY, YES, RIGHT, NO, PRESS, "
+             "BLANK, UHHH, MIDDLE, WAIT, FIRST"),
+    "LEFT": ("RIGHT, LEFT, FIRST, NO, MIDDLE, YES, BLANK, WHAT, UHHH, "
+             "WAIT, PRESS, READY, OKAY, NOTHING"),
+    "RIGHT": ("YES, NOTHING, READY, PRESS, NO, WAIT, WHAT, RIGHT, "
+              "MIDDLE, LEFT, UHHH, BLANK, OKAY, FIRST"),
+    "MIDDLE": ("BLANK, READY, OKAY, WHAT, NOTHING, PRESS, NO, WAIT, "
+               "LEFT, MIDDLE, RIGHT, FIRST, UHHH, YES"),
+    "OKAY": ("MIDDLE, NO, FIRST, YES, UHHH, NOTHING, WAIT, OKAY, LEFT, "
+             "READY, BLANK, PRESS, WHAT, RIGHT"),
+    "WAIT": ("UHHH, NO, BLANK, OKAY, YES, LEFT, FIRST, PRESS, WHAT, "
+             "WAIT, NOTHING, READY, RIGHT, MIDDLE"),
+    "PRESS": ("RIGHT, MIDDLE, YES, READY, PRESS, OKAY, NOTHING, UHHH, "
+              "BLANK, LEFT, FIRST, WHAT, NO, WAIT"),
+    "YOU": ("SURE, YOU ARE, YOUR, YOU'RE, NEXT, UH HUH, UR, HOLD, "
+            "WHAT?, YOU, UH UH, LIKE, DONE, U"),
+    "YOU ARE": ("YOUR, NEXT, LIKE, UH HUH, WHAT?, DONE, UH UH, HOLD, "
+                "YOU, U, YOU'RE, SURE, UR, YOU ARE"),
+    "YOUR": ("UH UH, YOU ARE, UH HUH, YOUR, NEXT, UR, SURE, U, YOU'RE, "
+             "YOU, WHAT?, HOLD, LIKE, DONE"),
+    "YOU'RE": ("YOU, YOU'RE, UR, NEXT, UH UH, YOU ARE, U, YOUR, WHAT?, "
+               "UH HUH, SURE, DONE, LIKE, HOLD"),
+    "UR": ("DONE, U, UR, UH HUH, WHAT?, SURE, YOUR, HOLD, YOU'RE, "
+           "LIKE, NEXT, UH UH, YOU ARE, YOU"),
+    "U": ("UH HUH, SURE, NEXT, WHAT?, YOU'RE, UR, UH UH, DONE, U, YOU, "
+          "LIKE, HOLD, YOU ARE, YOUR"),
+    "UH HUH": ("UH HUH, YOUR, YOU ARE, YOU, DONE, HOLD, UH UH, NEXT, "
+               "SURE, LIKE, YOU'RE, UR, U, WHAT?"),
+    "UH UH": ("UR, U, YOU ARE, YOU'RE, NEXT, UH UH, DONE, YOU, UH HUH, "
+              "LIKE, YOUR, SURE, HOLD, WHAT?"),
+    "WHAT?": ("YOU, HOLD, YOU'RE, YOUR, U, DONE, UH UH, LIKE, YOU ARE, "
+              "UH HUH, UR, NEXT, WHAT?, SURE"),
+    "DONE": ("SURE, UH HUH, NEXT, WHAT?, YOUR, UR, YOU'RE, HOLD, LIKE, "
+             "YOU, U, YOU ARE, UH UH, DONE"),
+    "NEXT": ("WHAT?, UH HUH, UH UH, YOUR, HOLD, SURE, NEXT, LIKE, "
+             "DONE, YOU ARE, UR, YOU'RE, U, YOU"),
+    "HOLD": ("YOU ARE, U, DONE, UH UH, YOU, UR, SURE, WHAT?, YOU'RE, "
+             "NEXT, HOLD, UH HUH, YOUR, LIKE"),
+    "SURE": ("YOU ARE, DONE, LIKE, YOU'RE, YOU, HOLD, UH HUH, UR, "
+             "SURE, U, WHAT?, NEXT, YOUR, UH UH"),
+    "LIKE": ("YOU'RE, NEXT, U, UR, HOLD, DONE, UH UH, WHAT?, UH HUH, "
+             "YOU, LIKE, SURE, YOU ARE, YOUR"),
+})
+
+SEQUENCE_CUTS = _freeze({
+    "r": ("c", "b", "a", "ac", "b", "ac", "abc", "ab", "b"),
+    "b": ("b", "ac", "b", "a", "b", "bc", "c", "ac", "a"),
+    "k": ("abc", "ac", "b", "ac", "b", "bc", "ab", "c", "c"),
+})
+
+
+WHOS_POSITIONS = ("TOP LEFT", "TOP RIGHT", "MIDDLE LEFT", "MIDDLE RIGHT",
+                  "BOTTOM LEFT", "BOTTOM RIGHT")
+
+# The position of the button to read, by the lowercase display, for every
+# display in the manual. Any other display means the bottom right button.
+_WHOS_DISPLAYS = _freeze({
+    "ur": 0,
+    "first": 1, "okay": 1, "c": 1,
+    "yes": 2, "nothing": 2, "led": 2, "they are": 2,
+    "blank": 3, "read": 3, "red": 3, "you": 3, "your": 3, "you're": 3,
+    "their": 3,
+    "": 4, "reed": 4, "leed": 4, "they're": 4,
+    "display": 5, "says": 5, "no": 5, "lead": 5, "hold on": 5, "you are": 5,
+    "there": 5, "see": 5, "cee": 5,
+})
+
+_whos_rank_tables = None
+
+
+def _whos_ranks():
+    """
+    Get the rank of every word in each *Who's on First* list.
+
+    Returns
+    -------
+    mapping of mapping
+        The position of each word in the list of `WHOS_RESPONSES`, by label.
+
+    """
+    global _whos_rank_tables
+    if _whos_rank_tables is None:
+        _whos_rank_tables = _freeze(dict(
+            (label, _freeze(dict((word, rank) for rank, word in
+                                 enumerate(words.split(", ")))))
+            for label, words in WHOS_RESPONSES.items()))
+    return _whos_rank_tables
+
+
+def _whos_position(display):
+    """
+    Find the button to read in a *Who's on First* stage.
+
+    Parameters
+    ----------
+    display : str
+        The text on the display, in lowercase.
+
+    Returns
+    -------
+    str
+        The position of the button whose label should be read.
+
+    """
+    return WHOS_POSITIONS[_WHOS_DISPLAYS.get(display, 5)]
+
+
+class MemoryStage(object):
+    """
+    The button pressed during a *Memory* stage.
+
+    Parameters
+    ----------
+    position : str, optional
+        The position of the button, from "FIRST" to "FOURTH".
+    label : str, optional
+        The label of the button.
+
+    """
+    __slots__ = ("position", "label")
+
+    def __init__(self, position=None, label=None):
+        self.position = position
+        self.label = label
+
+    def __eq__(self, other):
+        return (isinstance(other, MemoryStage) and
+                (self.position, self.label) == (other.position, other.label))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "MemoryStage({!r}, {!r})".format(self.position, self.label)
+
+
+def _memory_stage(stage, display, pressed):
+    """
+    Solve a given *Memory* stage.
+
+    Parameters
+    ----------
+    stage : int
+        The stage to be solved, starting with one.
+    display : str
+        The text on the module display.
+    pressed : sequence of MemoryStage
+        The buttons pressed in the previous stages, by stage.
+
+    Returns
+    -------
+    soln : MemoryStage
+        The button to press. Only one of the position and label is known.
+
+    Raises
+    ------
+    ValueError
+        If no rule of the stage applies to the display.
+
+    """
+    stages = _memory_stages or _memory_solutions()
+    try:
+        solutions, default = stages[stage - 1]
+    except IndexError:
+        # Any stage after the last one uses its rules.
+        solutions, default = stages[-1]
+    solution = solutions.get(display, default)
+    if solution is None:
+        raise ValueError("Stage {}: no rule for display {}".format(
+            stage, display))
+    return solution(pressed)
+
+
+_memory_stages = None
+
+
+def _memory_solution(action):
+    """
+    Compile a *Memory* action from the manual.
+
+    Parameters
+    ----------
+    action : (str, object) or None
+        The action, as for `rules.Manual.memory`.
+
+    Returns
+    -------
+    callable or None
+        Gives the `MemoryStage` to press from those pressed so far. None if
+        there is no action.
+
+    """
+    if action is None:
+        return None
+    kind, value = action
+    if kind == "position":
+        position = ORDINALS[value - 1]
+        return lambda pressed: MemoryStage(position)
+    elif kind == "label":
+        return lambda pressed: MemoryStage(None, value)
+    elif kind == "position of":
+        return lambda pressed: MemoryStage(pressed[value - 1].position)
+    else:
+        return lambda pressed: MemoryStage(None, pressed[value - 1].label)
+
+
+def _memory_solutions():
+    """
+    Get the compiled *Memory* actions, compiling them on first use.
+
+    Returns
+    -------
+    tuple of (mapping, callable)
+        The action for each display, and for any other display, by stage.
+
+    """
+    global _memory_stages
+    if _memory_stages is None:
+        _memory_stages = tuple(
+            (_freeze(dict((display, _memory_solution(action))
+                          for display, action in stage.items()
+                          if display is not None)),
+             _memory_solution(stage.get(None)))
+            for stage in manual().memory_rules)
+    return _memory_stages
+
+
+def solve_memory(displays, labels):
+    """
+    Solve a whole *Memory* module from a record of its stages.
+
+    Parameters
+    ----------
+    displays : sequence of str or int
+        The number on the display at each of the five stages.
+    labels : sequence of sequence of str or int
+        The labels of the four buttons at each stage, from left to right.
+
+    Returns
+    -------
+    list of MemoryStage
+        The button pressed at each stage.
+
+    Raises
+    ------
+    ValueError
+        If no rule applies to a display, or a label to be pressed is not on
+        the buttons.
+
+    """
+    pressed = []
+    for stage, (display, buttons) in enumerate(zip(displays, labels), 1):
+        buttons = [str(label) for label in buttons]
+        soln = _memory_stage(stage, str(display), pressed)
+        if soln.position is None:
+            try:
+                soln.position = ORDINALS[buttons.index(soln.label)]
+            except ValueError:
+                raise ValueError("Stage {}: no button is labelled {}"
+                                 .format(stage, soln.label))
+        else:
+            soln.label = buttons[ORDINALS.index(soln.position)]
+        pressed.append(soln)
+    return pressed
+
+
+def solve_memory_batch(games):
+    """
+    Solve many *Memory* modules from records of their stages.
+
+    Parameters
+    ----------
+    games : iterable of (sequence, sequence)
+        The displays and labels of each module, as for `solve_memory`.
+
+    Returns
+    -------
+    list of list of MemoryStage
+        The buttons pressed in each module.
+
+    """
+    return [solve_memory(displays, labels) for displays, labels in games]
+
+
+def _complicated_case(led, colour, star):
+    """
+    Find the case of a complicated wire.
+
+    Parameters
+    ----------
+    led : str
+        "1" if the LED is on, "0" otherwise.
+    colour : char
+        The colour of the wire, as for `Bomb.complicated`.
+    star : str
+        "1" if a star is drawn, "0" otherwise.
+
+    Returns
+    -------
+    int
+        The index of the wire in `rules.Manual.complicated_instructions`.
+
+    """
+    if colour == "r":
+        blue = "0"
+        red = "1"
+    elif colour == "b":
+        blue = "1"
+        red = "0"
+    elif colour == "s":
+        blue = "1"
+        red = "1"
+    else:
+        blue = "0"
+        red = "0"
+    return int("".join((led, red, blue, star)), 2)
+
+
+_complicated_descriptions = None
+
+
+def _complicated_cases():
+    """
+    Get the case of every complicated wire, building them on first use.
+
+    Returns
+    -------
+    mapping
+        The index in `rules.Manual.complicated_instructions` of each wire,
+        by its description as for `Bomb.complicated`.
+
+    """
+    global _complicated_descriptions
+    if _complicated_descriptions is None:
+        _complicated_descriptions = _freeze(dict(
+            (led + colour + star, _complicated_case(led, colour, star))
+            for led in "01" for colour in "rbsn" for star in "01"))
+    return _complicated_descriptions
+
+
+def _interact(machine):
+    """
+    Drive a state machine from standard input.
+
+    Each instruction is printed, except for the one which completes the
+    machine, which is returned instead.
+
+    Parameters
+    ----------
+    machine : StateMachine
+        The machine to run.
+
+    Returns
+    -------
+    str or None
+        The final instruction, if the machine completed.
+
+    """
+    while not machine.done:
+        try:
+            instruction = machine.send(input(machine.prompt))
+        except KeyboardInterrupt:
+            break
+        if machine.done:
+            return instruction
+        if instruction is not None:
+            print(instruction)
+
+
+# Facts about the serial number, packed into an int.
+_SERIAL_VOWEL = 1
+_SERIAL_ODD = 2
+_SERIAL_DIGIT = 4
+
+_VOWELS = frozenset("aeiou")
+
+# Facts about the rest of the edgework, packed into an int. The battery
+# bucket is zero for fewer than two batteries, one for two, and two for more.
+_EDGE_PARALLEL = 1
+_EDGE_FRK = 2
+_EDGE_CAR = 4
+_EDGE_BUCKET_SHIFT = 3
+_EDGE_COUNT_SHIFT = 5
+
+
+def _pack_edgework(n_batteries, has_parallel, frk, car):
+    """
+    Pack the edgework of a bomb, apart from its serial number, into an int.
+
+    """
+    bucket = min(max(n_batteries - 1, 0), 2)
+    return ((_EDGE_PARALLEL if has_parallel else 0)
+            | (_EDGE_FRK if frk else 0)
+            | (_EDGE_CAR if car else 0)
+            | bucket << _EDGE_BUCKET_SHIFT
+            | n_batteries << _EDGE_COUNT_SHIFT)
+
+
+# The decision tables of each edgework signature, shared between bombs, from
+# the least recently used.
+SPECIALIZATION_CACHE_SIZE = 256
+
+_specializations = collections.OrderedDict()
+_specialization_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+class _Specialization(object):
+    """
+    The decision tables of a bomb which depend on its edgework.
+
+    Attributes
+    ----------
+    serial_facts : int
+        The packed facts about the serial number they were resolved for.
+    last_odd : bool or None
+        The *Wires* branch: whether the last digit of the serial number is
+        odd. None if it has no digits.
+    button : rules.ButtonTable
+        Which buttons are held.
+    complicated_mask : int
+        The *Complicated Wires* cases to cut, as a bit mask.
+    simon : tuple of mapping
+        The *Simon Says* translation tables, by the number of strikes.
+
+    """
+    __slots__ = ("serial_facts", "last_odd", "button", "complicated_mask",
+                 "simon")
+
+    def __init__(self, serial_facts, edgework, rules_in_use):
+        n_batteries = edgework >> _EDGE_COUNT_SHIFT
+        self.serial_facts = serial_facts
+        self.last_odd = (bool(serial_facts & _SERIAL_ODD)
+                         if serial_facts & _SERIAL_DIGIT else None)
+        # A serial number without digits counts as even.
+        self.complicated_mask = rules_in_use.complicated_mask(
+            serial_facts & _SERIAL_ODD, n_batteries,
+            ("parallel",) if edgework & _EDGE_PARALLEL else ())
+        self.button = rules_in_use.button(
+            n_batteries, [label for flag, label in ((_EDGE_FRK, "FRK"),
+                                                     (_EDGE_CAR, "CAR"))
+                          if edgework & flag])
+        self.simon = _simon_tables(bool(serial_facts & _SERIAL_VOWEL))
+
+
+def _specialize(serial_facts, edgework):
+    """
+    Get the decision tables of an edgework signature, resolving them if needed.
+
+    Parameters
+    ----------
+    serial_facts : int
+        The packed facts about the serial number.
+    edgework : int
+        The rest of the edgework, as from `_pack_edgework`.
+
+    Returns
+    -------
+    _Specialization
+        The tables, for the manual in use.
+
+    """
+    rules_in_use = _manual or manual()
+    key = (serial_facts, edgework, rules_in_use)
+    try:
+        specialization = _specializations[key]
+    except KeyError:
+        pass
+    else:
+        _specializations.move_to_end(key)
+        _specialization_stats["hits"] += 1
+        return specialization
+    _specialization_stats["misses"] += 1
+    specialization = _specializations[key] = _Specialization(
+        serial_facts, edgework, rules_in_use)
+    while len(_specializations) > SPECIALIZATION_CACHE_SIZE:
+        _specializations.popitem(last=False)
+        _specialization_stats["evictions"] += 1
+    return specialization
+
+
+def specialization_stats():
+    """
+    Get the statistics of the cache of edgework decision tables.
+
+    Returns
+    -------
+    dict
+        The number of ``hits``, ``misses`` and ``evictions`` since the cache
+        was last cleared, its current ``size`` and its ``capacity``, which is
+        `SPECIALIZATION_CACHE_SIZE`.
+
+    """
+    stats = dict(_specialization_stats)
+    stats["size"] = len(_specializations)
+    stats["capacity"] = SPECIALIZATION_CACHE_SIZE
+    return stats
+
+
+def clear_specializations():
+    """
+    Empty the cache of edgework decision tables, and reset its statistics.
+
+    Existing bombs keep the tables they have resolved.
+
+    """
+    _specializations.clear()
+    for stat in _specialization_stats:
+        _specialization_stats[stat] = 0
+
+
 class SerialNumber(object):
     """
     Class for the serial number.
@@ -28,54 +1476,830 @@ class SerialNumber(object):
         The sequence of digits in the serial number.
 
     """
-    def __init__(self, number):
-        self.number = number
-        self.digits = [int(i) for i in self.number if i.isdigit()]
-
-    def has_vowel(self):
-        """
-        Check if the serial number contains any vowels.
+    __slots__ = ("_number", "_facts")
+
+    def __init__(self, number):
+        self.number = number
+
+    @property
+    def number(self):
+        return self._number
+
+    @number.setter
+    def number(self, number):
+        self._number = number
+        facts = 0 if _VOWELS.isdisjoint(number.lower()) else _SERIAL_VOWEL
+        for char in reversed(number):
+            if char.isdigit():
+                facts |= _SERIAL_DIGIT | (_SERIAL_ODD if int(char) % 2 else 0)
+                break
+        self._facts = facts
+
+    @property
+    def digits(self):
+        return [int(i) for i in self._number if i.isdigit()]
+
+    def has_vowel(self):
+        """
+        Check if the serial number contains any vowels.
+
+        Returns
+        -------
+        bool
+            True if the serial number contains a vowel.
+
+        """
+        return bool(self._facts & _SERIAL_VOWEL)
+
+    def last_odd(self):
+        """
+        Check if the last digit in the serial number is odd.
+
+        Returns
+        -------
+        bool
+            True if the last digit is odd.
+
+        Raises
+        ------
+        IndexError
+            If the serial number has no digits.
+
+        """
+        if not self._facts & _SERIAL_DIGIT:
+            raise IndexError("The serial number has no digits")
+        return self._facts >> 1 & 1
+
+    def last_even(self):
+        """
+        Check if the last digit in the serial number is even.
+
+        Returns
+        -------
+        bool
+            True if the last digit is odd.
+
+        """
+        return not self.last_odd()
+
+
+def _edgework_flag(flag, doc):
+    """
+    Make a property for a single bit of `Bomb` edgework.
+
+    Parameters
+    ----------
+    flag : int
+        The bit of the packed edgework.
+    doc : str
+        The docstring of the property.
+
+    Returns
+    -------
+    property
+        A boolean property.
+
+    """
+    def get(self):
+        return bool(self._edgework & flag)
+
+    def set(self, value):
+        if value:
+            self._edgework |= flag
+        else:
+            self._edgework &= ~flag
+        self._refresh()
+
+    return property(get, set, doc=doc)
+
+
+class StateMachine(object):
+    """
+    A non-interactive solver for a module which needs several observations.
+
+    Send each observation to the machine, and it returns the instruction for
+    the diffuser, if any.
+
+    Attributes
+    ----------
+    prompt : str
+        A description of the next observation.
+    done : bool
+        Whether the module has been solved.
+
+    """
+    prompt = ""
+    done = False
+
+    def send(self, observation):
+        """
+        Advance the machine with an observation.
+
+        Parameters
+        ----------
+        observation : str
+            The next observation, as described by `prompt`.
+
+        Returns
+        -------
+        str or None
+            The instruction for the diffuser, if any.
+
+        """
+        raise NotImplementedError
+
+
+class PasswordSession(StateMachine):
+    """
+    Narrow down the possible passwords one column at a time.
+
+    As a state machine, each observation is the letters of the next column,
+    and the instruction is the list of passwords which are still possible.
+
+    Parameters
+    ----------
+    initial : str, optional
+        The letters initially shown in each column. Only the passwords with
+        at least one of them in place are kept.
+
+    Attributes
+    ----------
+    mask : int
+        The bitmask of the passwords in `PASSWORDS` which are still possible.
+    position : int
+        The position of the next column to be fed.
+
+    """
+    def __init__(self, initial=None):
+        index = _password_index()
+        if initial:
+            self.mask = 0
+            for key in enumerate(initial):
+                self.mask |= index.get(key, 0)
+        else:
+            self.mask = (1 << len(PASSWORDS)) - 1
+        self.position = 0
+
+    @property
+    def remaining(self):
+        """list of str: The passwords which are still possible."""
+        return [word for i, word in enumerate(PASSWORDS) if self.mask >> i & 1]
+
+    @property
+    def prompt(self):
+        return "All possible in position {}: ".format(self.position)
+
+    @property
+    def done(self):
+        return self.position >= 5 or self.mask & (self.mask - 1) == 0
+
+    def send(self, letters):
+        return self.feed(letters)
+
+    def feed(self, letters, position=None):
+        """
+        Narrow down the passwords with the letters of one column.
+
+        Parameters
+        ----------
+        letters : str
+            All the letters which can be entered in the column.
+        position : int, optional
+            The position of the column. Defaults to the one after the column
+            which was fed last.
+
+        Returns
+        -------
+        list of str
+            The passwords which are still possible.
+
+        """
+        if position is None:
+            position = self.position
+        index = _password_index()
+        column = 0
+        for letter in letters.lower():
+            column |= index.get((position, letter), 0)
+        self.mask &= column
+        self.position = position + 1
+        return self.remaining
+
+    def feed_all(self, columns):
+        """
+        Narrow down the passwords with several consecutive columns.
+
+        Parameters
+        ----------
+        columns : iterable of str
+            The letters of each column, starting from the next one.
+
+        Returns
+        -------
+        list of str
+            The passwords which are still possible.
+
+        """
+        for letters in columns:
+            self.feed(letters)
+        return self.remaining
+
+
+class MorseDecoder(object):
+    """
+    Decode an unbroken *Morse Code* signal against the frequency words.
+
+    Each dit or dah moves one step down a precomputed trie, so the cost is
+    proportional to the length of the signal.
+
+    Attributes
+    ----------
+    node : int or None
+        The current node in the trie, or None if no word matches.
+
+    """
+    def __init__(self):
+        self.node = 0
+
+    @property
+    def candidates(self):
+        """tuple of str: The words which are still possible."""
+        if self.node is None:
+            return ()
+        return _morse_trie()[1][self.node]
+
+    @property
+    def frequency(self):
+        """str or None: The frequency, once only one word is possible."""
+        candidates = self.candidates
+        if len(candidates) == 1:
+            return FREQUENCIES[candidates[0]]
+
+    def feed(self, signal):
+        """
+        Decode more of the signal.
+
+        Parameters
+        ----------
+        signal : str
+            The next dits (".") and dahs ("-"). Any other characters are
+            ignored.
+
+        Returns
+        -------
+        tuple of str
+            The words which are still possible.
+
+        """
+        children = _morse_trie()[0]
+        for symbol in signal:
+            if self.node is None:
+                break
+            if symbol in ".-":
+                self.node = children[self.node].get(symbol)
+        return self.candidates
+
+
+class MorseTiming(object):
+    """
+    Decode *Morse Code* from the durations of the light being on and off.
+
+    The length of a dit is learnt from the signal, and follows it as it
+    drifts. Each duration is classified by its length in dits: a flash is a
+    dit below two and a dah otherwise, and a gap is between elements below
+    two, between letters below five, and between words otherwise. The dits
+    and dahs are fed to a `MorseDecoder` as they come, and nothing is kept of
+    the events themselves, so an unbounded stream takes constant memory.
+
+    Since the signal loops, decoding starts after the first gap between
+    words, unless the events are known to start with the word. If the
+    decoded signal matches no word, as after a misread flash, decoding starts
+    again after the next gap between words.
+
+    Parameters
+    ----------
+    unit : float, optional
+        The expected length of a dit. By default, it is the shortest of the
+        first durations, which is only right once a dit or a gap between
+        elements has been seen.
+    synchronized : bool, optional
+        Whether the events start at the beginning of the word. The unit
+        should then be given, or the first flashes may be misread.
+    smoothing : float, optional
+        The weight of each new duration in the estimate of the unit.
+
+    Attributes
+    ----------
+    unit : float or None
+        The estimated length of a dit.
+    decoder : MorseDecoder
+        The decoder of the current attempt at the word.
+    synchronized : bool
+        Whether the start of the word has been seen.
+    restarts : int
+        The number of times decoding started again.
+    done : bool
+        Whether only one word is possible.
+
+    """
+    def __init__(self, unit=None, synchronized=False, smoothing=0.25):
+        self.unit = unit
+        self.synchronized = synchronized
+        self.smoothing = smoothing
+        self.decoder = MorseDecoder()
+        self.restarts = 0
+        self.done = False
+
+    @property
+    def frequency(self):
+        """str or None: The frequency, once only one word is possible."""
+        if self.synchronized:
+            return self.decoder.frequency
+
+    def feed(self, lit, duration):
+        """
+        Decode the next event.
+
+        Parameters
+        ----------
+        lit : bool
+            Whether the light was on.
+        duration : float
+            How long for, in any unit of time.
+
+        Returns
+        -------
+        str or None
+            The frequency, once only one word is possible.
+
+        """
+        if self.done or duration <= 0:
+            return self.frequency
+        unit = self.unit
+        # Nothing is shorter than a dit, so this one is.
+        if unit is None or duration < unit / 2:
+            unit = self.unit = duration
+        units = duration / unit
+        if lit:
+            size = 1 if units < 2 else 3
+        else:
+            size = 1 if units < 2 else 3 if units < 5 else 7
+        self.unit += self.smoothing * (duration / size - unit)
+
+        decoder = self.decoder
+        if not lit:
+            if size == 7 and (not self.synchronized or decoder.node is None):
+                if self.synchronized:
+                    self.restarts += 1
+                self.synchronized = True
+                decoder.node = 0
+        elif self.synchronized and decoder.node is not None:
+            decoder.feed("." if size == 1 else "-")
+            self.done = decoder.frequency is not None
+        return self.frequency
+
+    def feed_all(self, events):
+        """
+        Decode events until only one word is possible.
+
+        Parameters
+        ----------
+        events : iterable of (bool, float)
+            Whether the light was on, and for how long. It is not read past
+            the event which completes the word.
+
+        Returns
+        -------
+        str or None
+            The frequency, if only one word is possible.
+
+        """
+        for lit, duration in events:
+            if self.feed(lit, duration) is not None:
+                break
+        return self.frequency
+
+
+class SimonMachine(StateMachine):
+    """
+    Solve a *Simon Says* module.
+
+    Each observation is one or more flashes, such as "r" or "rgb", and the
+    instruction is the colours to press in response. The colour map follows
+    the strikes on the bomb as they are registered.
+
+    When a strike is registered with `Bomb.strike`, every flash seen so far is
+    translated again with the new map. The result is kept in `correction`,
+    and passed to the callback, if any.
+
+    Parameters
+    ----------
+    bomb : Bomb
+        The bomb the module is on.
+    callback : callable, optional
+        Called with the corrected sequence after each strike.
+
+    Attributes
+    ----------
+    sequence : str
+        Every flash seen so far.
+    correction : str or None
+        The full sequence of presses after the latest strike.
+
+    """
+    prompt = "Colour: "
+
+    def __init__(self, bomb, callback=None):
+        self.bomb = bomb
+        self.callback = callback
+        self.sequence = ""
+        self.correction = None
+        bomb._watch(self)
+
+    def translate(self, flashes):
+        """
+        Translate flashes with the current colour map, without recording them.
+
+        Parameters
+        ----------
+        flashes : str
+            The colours of the flashes. Whitespace is ignored.
+
+        Returns
+        -------
+        str
+            The colours to press.
+
+        Raises
+        ------
+        ValueError
+            If a colour is not known.
+
+        """
+        flashes = "".join(flashes.split())
+        if not _SIMON_COLOURS.issuperset(flashes):
+            raise ValueError("Unknown colour in {}".format(flashes))
+        bomb = self.bomb
+        tables = bomb._resolved().simon
+        return flashes.translate(tables[min(bomb.n_strikes, 2)])
+
+    def send(self, flashes):
+        presses = self.translate(flashes)
+        self.sequence += "".join(flashes.split())
+        return presses
+
+    def on_strike(self):
+        """
+        Translate the whole sequence again after a strike.
+
+        """
+        self.correction = self.translate(self.sequence)
+        if self.callback is not None:
+            self.callback(self.correction)
+
+
+class WhosMachine(StateMachine):
+    """
+    Solve a *Who's on First* module.
+
+    The observations alternate between the text on the display, answered
+    with the position of the button to read, and the label of that button,
+    answered with the list of words to check.
+
+    """
+    prompt = "Display: "
+
+    def send(self, observation):
+        if self.prompt == "Display: ":
+            position = _whos_position(observation.lower())
+            self.prompt = "Button label: "
+            return position
+        words = WHOS_RESPONSES[observation.upper()]
+        self.prompt = "Display: "
+        return words
+
+
+class MemoryMachine(StateMachine):
+    """
+    Solve a *Memory* module.
+
+    Each stage takes the number on the display, answered with the position or
+    label of the button to press, and then the other of the two, once it has
+    been pressed.
+
+    Attributes
+    ----------
+    stage : int
+        The current stage, starting with one.
+    pressed : list of MemoryStage
+        The buttons pressed in the completed stages.
+
+    """
+    def __init__(self):
+        self.stage = 1
+        self.pressed = []
+        self.current = None
+        self.prompt = "Stage 1. Display: "
+
+    def send(self, observation):
+        if self.current is None:
+            self.current = _memory_stage(self.stage, observation, self.pressed)
+            if self.current.position is None:
+                self.prompt = "Button position: "
+                return self.current.label
+            self.prompt = "Button label: "
+            return self.current.position
+
+        if self.current.position is None:
+            self.current.position = observation
+        else:
+            self.current.label = observation
+        self.pressed.append(self.current)
+        self.current = None
+        self.stage += 1
+        self.done = self.stage > 5
+        self.prompt = "Stage {}. Display: ".format(self.stage)
+
+
+class MorseMachine(StateMachine):
+    """
+    Solve a *Morse Code* module, one letter at a time.
+
+    Each letter is either given directly, or as its dits and dahs. Since the
+    word loops, the letters may start anywhere in it. Nothing is returned
+    until only one word is possible, which is as soon as the letters so far
+    can tell the words apart.
+
+    Parameters
+    ----------
+    from_start : bool, optional
+        Whether the letters start with the first one of the word, as after
+        the long gap between repeats. The words are then told apart sooner.
+
+    Attributes
+    ----------
+    position : int
+        The number of letters received.
+    frequency : str or None
+        The frequency to be selected, once known.
+
+    """
+    def __init__(self, from_start=False):
+        self._index = _morse_rotations(from_start)
+        self.node = 0
+        self.position = 0
+        self.frequency = None
+        self.prompt = "Letter or morse ({} more at most): ".format(
+            self.remaining)
+
+    @property
+    def active(self):
+        """set of str: The words which are still possible."""
+        if self.node is None:
+            return set()
+        return set(self._index[1][self.node])
+
+    @property
+    def remaining(self):
+        """
+        int or None: The most letters still needed to know the word, or None
+        if no word matches.
+
+        """
+        if self.node is not None:
+            return self._index[2][self.node]
+
+    def send(self, char):
+        if char.isalnum():
+            letter = char.lower()
+        else:
+            letter = MORSE_LETTERS[char].lower()
+        self.position += 1
+        if self.node is not None:
+            self.node = self._index[0][self.node].get(letter)
+        if self.node is None:
+            self.prompt = "No word matches: "
+            return
+        self.prompt = "Letter or morse ({} more at most): ".format(
+            self.remaining)
+        words = self._index[1][self.node]
+        if len(words) == 1:
+            self.frequency = FREQUENCIES[words[0]]
+            self.done = True
+            return self.frequency
+
+
+class ComplicatedMachine(StateMachine):
+    """
+    Solve a *Complicated Wires* module, one wire at a time.
+
+    Each wire is given as its LED, colour and star, such as "1s0".
+
+    Parameters
+    ----------
+    bomb : Bomb
+        The bomb the module is on.
+
+    """
+    def __init__(self, bomb):
+        self.bomb = bomb
+        self.wire = 1
+        self.prompt = "Wire 1. led, colour, star: "
+
+    def send(self, wire):
+        instruction = self.bomb.complicated_panel([wire])[0]
+        self.wire += 1
+        self.prompt = "Wire {}. led, colour, star: ".format(self.wire)
+        return instruction
+
+
+class SequencesMachine(StateMachine):
+    """
+    Solve a *Wire Sequences* module, one wire at a time.
+
+    Each wire is given as its colour and the letter it is connected to, such
+    as "ra".
+
+    """
+    prompt = "Colour and connection: "
+
+    def __init__(self):
+        self.counts = {"r": 0, "b": 0, "k": 0}
+
+    def send(self, wire):
+        colour, connection = wire
+        to_cut = connection in SEQUENCE_CUTS[colour][self.counts[colour]]
+        self.counts[colour] += 1
+        return "CUT" if to_cut else "DO NOT CUT"
+
+
+class PlanStep(object):
+    """
+    A module of a bomb, as planned by `Bomb.solve_all`.
+
+    Attributes
+    ----------
+    index : int
+        The position of the module in those given.
+    module : str
+        The name of the module.
+    answer : object
+        The instruction of a single-step module, or the instructions for the
+        observations sent to a multi-step module. None if there are none.
+    machine : StateMachine or None
+        The multi-step module, if it is still in progress.
+    prompt : str or None
+        What to ask the diffuser for next, if the module needs live input.
+    error : str or None
+        Why the module failed, if it did.
+
+    """
+    __slots__ = ("index", "module", "answer", "machine", "prompt", "error")
+
+    def __init__(self, index, module):
+        self.index = index
+        self.module = module
+        self.answer = None
+        self.machine = None
+        self.prompt = None
+        self.error = None
+
+    @property
+    def needs_input(self):
+        return self.prompt is not None
+
+    def __repr__(self):
+        if self.error is not None:
+            return "PlanStep({!r}, {!r}, error={!r})".format(
+                self.index, self.module, self.error)
+        elif self.needs_input:
+            return "PlanStep({!r}, {!r}, prompt={!r})".format(
+                self.index, self.module, self.prompt)
+        return "PlanStep({!r}, {!r}, answer={!r})".format(
+            self.index, self.module, self.answer)
+
+
+def plan_module(bomb, module, args=()):
+    """
+    Solve a single-step module without waiting on standard input.
 
-        Returns
-        -------
-        bool
-            True if the serial number contains a vowel.
+    Parameters
+    ----------
+    bomb : Bomb
+        The bomb of the module.
+    module : str
+        The name of the module, in `SOLVERS`.
+    args : sequence, optional
+        The arguments of its `Bomb` method. An observation which is not known
+        yet, such as the strip colour of a button, may be left out or given
+        as None.
+
+    Returns
+    -------
+    answer : object
+        The instruction, or the instruction so far if an observation is
+        needed, such as "HOLD" for a held button.
+    prompt : str or None
+        What to ask the diffuser for, if an observation is needed.
+
+    Raises
+    ------
+    ValueError
+        If the module is not a single-step module.
 
-        """
-        return any(letter in self.number.lower() for letter in "aeiou")
+    """
+    if module not in SOLVERS:
+        raise ValueError("Not a single-step module: {}".format(module))
+    args = list(args)
+    if module in ("button", "knob"):
+        while args and args[-1] is None:
+            args.pop()
+    if module == "button" and len(args) == 2:
+        if bomb._resolved().button.hold(*args):
+            return "HOLD", "Strip colour: "
+    elif module == "knob" and len(args) == 1:
+        direction = (_manual or manual()).knob(*args)
+        return direction, None if direction is not None else "Bottom row: "
+    return getattr(bomb, module)(*args), None
+
+
+def solve_module(bomb, module, args=()):
+    """
+    Solve a single-step module, given every observation it needs.
 
-    def last_odd(self):
-        """
-        Check if the last digit in the serial number is odd.
+    Parameters
+    ----------
+    bomb : Bomb
+        The bomb of the module.
+    module : str
+        The name of the module, in `SOLVERS`.
+    args : sequence, optional
+        The arguments of its `Bomb` method.
+
+    Returns
+    -------
+    object
+        The instruction.
+
+    Raises
+    ------
+    ValueError
+        If the module is not a single-step module, or an observation it
+        needs is missing.
 
-        Returns
-        -------
-        bool
-            True if the last digit is odd.
+    """
+    answer, prompt = plan_module(bomb, module, args)
+    if prompt is not None:
+        raise ValueError("The {} is needed".format(
+            prompt.rstrip(": ").lower()))
+    return answer
 
-        """
-        return self.digits[-1] % 2
 
-    def last_even(self):
-        """
-        Check if the last digit in the serial number is even.
+def start_module(bomb, module, args=()):
+    """
+    Start a multi-step module from plain arguments.
 
-        Returns
-        -------
-        bool
-            True if the last digit is odd.
+    Parameters
+    ----------
+    bomb : Bomb
+        The bomb of the module.
+    module : str
+        The name of the module, in `MACHINES`.
+    args : list, optional
+        The arguments of its `Bomb` method, which must be plain data, such as
+        a boolean for ``morse`` or the initial letters for ``passwords``.
+
+    Returns
+    -------
+    StateMachine
+        The module.
+
+    Raises
+    ------
+    ValueError
+        If the module is not a multi-step module, or does not take such
+        arguments.
 
-        """
-        return not self.last_odd()
+    """
+    if module not in MACHINES:
+        raise ValueError("Not a multi-step module: {}".format(module))
+    kinds = _MACHINE_ARGS.get(module, ())
+    if (not isinstance(args, (list, tuple)) or len(args) > len(kinds) or
+            not all(isinstance(arg, kind) for arg, kind in zip(args, kinds))):
+        raise ValueError("Invalid arguments for {}: {!r}".format(
+            module, args))
+    return getattr(bomb, module + "_machine")(*args)
 
 
 class Bomb(object):
     """
     The bomb to be defused.
 
+    The edgework is packed into a single int, and instances have no
+    ``__dict__``, so that many bombs can be held at once.
+
     Parameters
     ----------
-    serial_number : SerialNumber
+    serial_number : str or SerialNumber
         The serial number of the bomb.
     n_batteries : int
         The number of batteries on the bomb.
@@ -88,7 +2312,7 @@ class Bomb(object):
 
     Attributes
     ----------
-    serial_number : string
+    serial_number : SerialNumber
         The serial number of the bomb.
     n_batteries : int
         The number of batteries on the bomb.
@@ -102,20 +2326,106 @@ class Bomb(object):
         The number of strikes the team has committed.
 
     """
+    __slots__ = ("_serial_number", "_edgework", "_tables", "_watchers",
+                 "n_strikes")
+
     def __init__(self, serial_number, n_batteries, has_parallel=False, frk=False, car=False):
-        self.serial_number = SerialNumber(serial_number)
-        self.n_batteries = n_batteries
-        self.has_parallel = has_parallel
-        self.frk = frk
-        self.car = car
+        if not isinstance(serial_number, SerialNumber):
+            serial_number = SerialNumber(serial_number)
+        self._serial_number = serial_number
+        self._edgework = _pack_edgework(n_batteries, has_parallel, frk, car)
         self.n_strikes = 0
+        self._watchers = None
+        self._refresh()
+
+    def _refresh(self):
+        """
+        Resolve the decision tables which depend on the edgework.
+
+        Bombs with the same edgework share them. See `specialization_stats`.
+
+        """
+        self._tables = _specialize(self._serial_number._facts, self._edgework)
+
+    def _resolved(self):
+        """
+        Get the decision tables which depend on the edgework.
+
+        They are resolved again if the serial number was changed in place,
+        through its ``number``.
+
+        """
+        tables = self._tables
+        if tables.serial_facts != self._serial_number._facts:
+            self._refresh()
+            tables = self._tables
+        return tables
+
+    @property
+    def serial_number(self):
+        return self._serial_number
+
+    @serial_number.setter
+    def serial_number(self, serial_number):
+        if not isinstance(serial_number, SerialNumber):
+            serial_number = SerialNumber(serial_number)
+        self._serial_number = serial_number
+        self._refresh()
+
+    @property
+    def n_batteries(self):
+        return self._edgework >> _EDGE_COUNT_SHIFT
+
+    @n_batteries.setter
+    def n_batteries(self, n_batteries):
+        self._edgework = _pack_edgework(n_batteries, self.has_parallel,
+                                        self.frk, self.car)
+        self._refresh()
+
+    has_parallel = _edgework_flag(_EDGE_PARALLEL,
+                                  "Whether the bomb has a parallel port.")
+    frk = _edgework_flag(_EDGE_FRK, "Whether the bomb has a FRK indicator.")
+    car = _edgework_flag(_EDGE_CAR, "Whether the bomb has a CAR indicator.")
+
+    def _watch(self, machine):
+        """
+        Notify a state machine of every strike, for as long as it exists.
+
+        Parameters
+        ----------
+        machine : StateMachine
+            The machine, with an ``on_strike`` method.
+
+        """
+        # Drop the machines which are gone, so that a bomb which starts many
+        # of them does not keep a reference to each.
+        watchers = [ref for ref in self._watchers or () if ref() is not None]
+        watchers.append(weakref.ref(machine))
+        self._watchers = watchers
 
     def strike(self):
         """
         Register a strike.
 
+        Any machines following the strikes, such as those for *Simon Says*,
+        are updated straight away.
+
         """
         self.n_strikes += 1
+        if self._watchers:
+            machines = [ref() for ref in self._watchers]
+            self._watchers = [ref for ref, machine in
+                              zip(self._watchers, machines)
+                              if machine is not None]
+            for machine in machines:
+                if machine is not None:
+                    machine.on_strike()
+
+    def _last_odd(self):
+        last_odd = self._resolved().last_odd
+        if last_odd is None:
+            raise IndexError("The serial number has no digits")
+        return last_odd
 
     def wires(self, wires):
         """
@@ -144,47 +2454,39 @@ class Bomb(object):
 
         """
         wires = wires.lower()
-        ordinal = ["FIRST", "SECOND", "THIRD", "FOURTH", "FIFTH", "SIXTH"]
-        if len(wires) == 3:
-            if "r" not in wires:
-                to_cut = "SECOND"
-            elif wires[-1] == "w":
-                to_cut = "THIRD"
-            elif wires.count("b") > 1:
-                to_cut = ordinal[2 - wires[::-1].index("b")]
-            else:
-                to_cut = "THIRD"
-        elif len(wires) == 4:
-            if wires.count("r") > 1 and self.serial_number.last_odd():
-                to_cut = ordinal[2 - wires[::-1].index("r")]
-            elif ((wires[-1] == "y"and wires.count("r") == 0)
-                  or wires.count("b") == 1):
-                to_cut = "FIRST"
-            elif wires.count("y") > 1:
-                to_cut = "FOURTH"
-            else:
-                to_cut = "SECOND"
-        elif len(wires) == 5:
-            if wires[-1] == "k" and self.serial_number.last_odd():
-                to_cut = "FOURTH"
-            elif wires.count("r") == 1 and wires.count("y") > 1:
-                to_cut = "FIRST"
-            elif wires.count("k") == 0:
-                to_cut = "SECOND"
-            else:
-                to_cut = "FIRST"
-        else:
-            if wires.count("y") == 0 and self.serial_number.last_odd():
-                to_cut = "THIRD"
-            elif wires.count("y") == 0 and wires.count("w") > 1:
-                to_cut = "FOURTH"
-            elif wires.count("r") == 0:
-                to_cut = "SIXTH"
-            else:
-                to_cut = "FOURTH"
-        return to_cut
+        last_odd = self._last_odd()
+        try:
+            return _wires_table()[last_odd][wires]
+        except KeyError:
+            return _solve_wires(wires, last_odd)
+
+    def wires_batch(self, panels):
+        """
+        Solve many *Wires* modules on this bomb at once.
+
+        Parameters
+        ----------
+        panels : iterable of str
+            The wire codes, in the same format as for `wires`.
+
+        Returns
+        -------
+        list of str
+            The wire to cut for each panel, in order.
+
+        """
+        last_odd = self._last_odd()
+        table = _wires_table()[last_odd]
+        answers = []
+        for wires in panels:
+            wires = wires.lower()
+            try:
+                answers.append(table[wires])
+            except KeyError:
+                answers.append(_solve_wires(wires, last_odd))
+        return answers
 
-    def button(self, text, colour):
+    def button(self, text, colour, strip=None):
         """
         Solve a *Button* module.
 
@@ -202,6 +2504,9 @@ class Bomb(object):
             - white : w
             - yellow : y
             - none : n
+        strip : char, optional
+            The colour of the strip, if already known. Otherwise, it is
+            requested when the button is to be held.
 
         Returns
         -------
@@ -209,42 +2514,10 @@ class Bomb(object):
             Instruction for the diffuser
 
         """
-        def release():
-            """
-            Determine the number at which to release the button.
-
-            Returns
-            -------
-            The number at which to release the button.
-
-            """
-            colour = input("Strip colour: ").lower()
-            if colour == "b":
-                number = "FOUR"
-            elif colour == "y":
-                number = "FIVE"
-            else:
-                number = "ONE"
-            return number
-
-        text = text.lower()
-        if text == "abort" and colour == "b":
-            to_hold = True
-        elif self.n_batteries > 1 and text == "detonate":
-            to_hold = False
-        elif colour == "w" and self.car:
-            to_hold = True
-        elif self.n_batteries > 2 and self.frk:
-            to_hold = False
-        elif colour == "y":
-            to_hold = True
-        elif text == "hold" and colour == "r":
-            to_hold = False
-        else:
-            to_hold = True
-
-        if to_hold:
-            return "HOLD until the timer contains a {n}".format(n=release())
+        if self._resolved().button.hold(text, colour):
+            if strip is None:
+                strip = input("Strip colour: ")
+            return "HOLD until the timer contains a " + manual().release(strip)
         else:
             return "PRESS and immediately RELEASE"
 
@@ -258,8 +2531,8 @@ class Bomb(object):
             The names of the buttons. The order does not matter. Use as many as
             needed.
 
-            The symbols below have the recommended name in the beginning. Feel
-            free to change them.
+            The symbols below may be given by any of their names, in any case.
+            The names used in the columns are listed first.
 
             - Ϙ: Q, neuter, uncrossed-female, hand-mirror, O-with-a-♥♥♥♥
             - Ѧ: at, three-legged A, A-with-a-♥♥♥♥, little Yus
@@ -273,13 +2546,13 @@ class Bomb(object):
             - ☆: star, open star, empty star
             - ¿: que, question, upside-down question mark, Spanish question mark
             - ©: copy, copyright
-            - Ѽ: butt, ot, xbox, cyrillic omega
+            - Ѽ: ot, butt, xbox, cyrillic omega
             - Ж: zhe, X with an I
             - Ԇ: hoe, komi dzje, incomplete R, trailing off 3
             - ƀ: B, keyblade, crossed b, barred b, BT smashed
             - б: 6, six, smashed 6, upside-down g, hooktop b
             - ¶: para, paragraph, line-break, backwards P
-            - ټ: derp-face, smiley, Isolated Teh
+            - ټ: smile, derp-face, smiley, Isolated Teh
             - Ͼ: C, C with a dot
             - Ѯ: ksi, dragon, alien 3, 3-with-antenna
             - ★: black, blackstar, filled star, full star
@@ -293,46 +2566,65 @@ class Bomb(object):
 
             - [q, at, lambda, koppa, an, h, moon]
             - [eh, q, moon, loop, star, h, que]
-            - [copy, butt, loop, zhe, hoe, lambda, star]
+            - [copy, ot, loop, zhe, hoe, lambda, star]
             - [6, para, b, an, zhe, que, smile]
             - [psi, smile, b, c, para, ksi, black]
             - [6, eh, neq, ae, psi, i, omega]
 
         Returns
         -------
-        str
+        list of str
             The order in which the buttons are to be pressed.
 
+        Raises
+        ------
+        ValueError
+            If no column contains all the buttons.
+
         """
-        columns = [
-            ['q', 'at', 'lambda', 'koppa', 'an', 'h', 'moon'],
-            ['eh', 'q', 'moon', 'loop', 'star', 'h', 'que'],
-            ['copy', 'ot', 'loop', 'zhe', 'hoe', 'lambda', 'star'],
-            ['6', 'para', 'b', 'an', 'zhe', 'que', 'smile'],
-            ['psi', 'smile', 'b', 'c', 'para', 'ksi', 'black'],
-            ['6', 'eh', 'neq', 'ae', 'psi', 'i', 'omega']
-        ]
-
-        working_column = None
-        keyset = set(keys)
-        output = []
-        for column in columns:
-            if len(set(column).intersection(keyset)) == 4:
-                working_column = column
-                break
-        for key in working_column:
-            if key in keys:
-                output.append(key)
-        return output
+        aliases = _keypad_aliases or keypad_aliases()
+        names = {}
+        for key in keys:
+            names[aliases.get(key.lower(), key)] = key
+        return [names[symbol] for symbol in _keypad_order(frozenset(names))]
+
+    def keypad_batch(self, quadruples):
+        """
+        Solve many *Keypads* modules at once.
+
+        Parameters
+        ----------
+        quadruples : iterable of sequence of str
+            The names of the buttons of each module, as for `keypad`.
+
+        Returns
+        -------
+        list of list of str
+            The order in which the buttons of each module are to be pressed.
+
+        Raises
+        ------
+        ValueError
+            If no column contains all the buttons of a module.
+
+        """
+        orders = []
+        for i, keys in enumerate(quadruples):
+            try:
+                orders.append(self.keypad(*keys))
+            except ValueError as error:
+                raise ValueError("Module {}: {}".format(i, error))
+        return orders
 
     def simon(self):
         """
         Solve a *Simon Says* module.
 
-        Run the solver, then input a colour every time. The solver will
-        generate the appropriate response. If a strike is incurred during the
-        loop, simply halt the operation of the program, run `strike`, and try
-        again.
+        Run the solver, then input one or more colours every time. The solver
+        will generate the appropriate response. If a strike is incurred during
+        the loop, halt the operation of the program, run `strike`, and try
+        again, or call `strike` from elsewhere to print the corrected sequence
+        and carry on.
 
         **Colours :**
 
@@ -342,41 +2634,24 @@ class Bomb(object):
         - yellow : y
 
         """
-        map_with_vowel = {
-            0: {"r": "b",
-                "b": "r",
-                "g": "y",
-                "y": "g"},
-            1: {"r": "y",
-                "b": "g",
-                "g": "b",
-                "y": "r"},
-            2: {"r": "g",
-                "b": "r",
-                "g": "y",
-                "y": "b"}
-        }
-        map_with_no_vowel = {
-            0: {"r": "b",
-                "b": "y",
-                "g": "g",
-                "y": "r"},
-            1: {"r": "r",
-                "b": "b",
-                "g": "y",
-                "y": "g"},
-            2: {"r": "y",
-                "b": "g",
-                "g": "b",
-                "y": "r"}
-        }
-        colour_map = map_with_vowel if self.serial_number.has_vowel() else map_with_no_vowel
-        while True:
-            try:
-                colour = input("Colour: ")
-                print(colour_map[n_strikes][colour])
-            except KeyboardInterrupt:
-                break
+        _interact(self.simon_machine(callback=print))
+
+    def simon_machine(self, callback=None):
+        """
+        Prepare a non-interactive *Simon Says* solver.
+
+        Parameters
+        ----------
+        callback : callable, optional
+            Called with the full corrected sequence after each strike.
+
+        Returns
+        -------
+        SimonMachine
+            The solver, which takes one or more colours at a time.
+
+        """
+        return SimonMachine(self, callback)
 
     def whos(self):
         """
@@ -388,84 +2663,53 @@ class Bomb(object):
         until a match is found. The diffuser presses the matching button.
 
         """
-        responses = {
-            "READY": ("YES, OKAY, WHAT, MIDDLE, LEFT, PRESS, RIGHT, BLANK, "
-                      "READY, NO, FIRST, UHHH, NOTHING, WAIT"),
-            "FIRST": ("LEFT, OKAY, YES, MIDDLE, NO, RIGHT, NOTHING, UHHH, "
-                      "WAIT, READY, BLANK, WHAT, PRESS, FIRST"),
-            "NO": ("BLANK, UHHH, WAIT, FIRST, WHAT, READY, RIGHT, YES, "
-                   "NOTHING, LEFT, PRESS, OKAY, NO, MIDDLE"),
-            "BLANK": ("WAIT, RIGHT, OKAY, MIDDLE, BLANK, PRESS, READY, "
-                      "NOTHING, NO, WHAT, LEFT, UHHH, YES, FIRST"),
-            "NOTHING": ("UHHH, RIGHT, OKAY, MIDDLE, YES, BLANK, NO, PRESS, "
-                        "LEFT, WHAT, WAIT, FIRST, NOTHING, READY"),
-            "YES": ("OKAY, RIGHT, UHHH, MIDDLE, FIRST, WHAT, PRESS, READY, "
-                    "NOTHING, YES, LEFT, BLANK, NO, WAIT"),
-            "WHAT": ("UHHH, WHAT, LEFT, NOTHING, READY, BLANK, MIDDLE, NO, "
-                     "OKAY, FIRST, WAIT, YES, PRESS, RIGHT"),
-            "UHHH": ("READY, NOTHING, LEFT, WHAT, OKAY, YES, RIGHT, NO, PRESS, "
-                     "BLANK, UHHH, MIDDLE, WAIT, FIRST"),
-            "LEFT": ("RIGHT, LEFT, FIRST, NO, MIDDLE, YES, BLANK, WHAT, UHHH, "
-                     "WAIT, PRESS, READY, OKAY, NOTHING"),
-            "RIGHT": ("YES, NOTHING, READY, PRESS, NO, WAIT, WHAT, RIGHT, "
-                      "MIDDLE, LEFT, UHHH, BLANK, OKAY, FIRST"),
-            "MIDDLE": ("BLANK, READY, OKAY, WHAT, NOTHING, PRESS, NO, WAIT, "
-                       "LEFT, MIDDLE, RIGHT, FIRST, UHHH, YES"),
-            "OKAY": ("MIDDLE, NO, FIRST, YES, UHHH, NOTHING, WAIT, OKAY, LEFT, "
-                     "READY, BLANK, PRESS, WHAT, RIGHT"),
-            "WAIT": ("UHHH, NO, BLANK, OKAY, YES, LEFT, FIRST, PRESS, WHAT, "
-                     "WAIT, NOTHING, READY, RIGHT, MIDDLE"),
-            "PRESS": ("RIGHT, MIDDLE, YES, READY, PRESS, OKAY, NOTHING, UHHH, "
-                      "BLANK, LEFT, FIRST, WHAT, NO, WAIT"),
-            "YOU": ("SURE, YOU ARE, YOUR, YOU'RE, NEXT, UH HUH, UR, HOLD, "
-                    "WHAT?, YOU, UH UH, LIKE, DONE, U"),
-            "YOU ARE": ("YOUR, NEXT, LIKE, UH HUH, WHAT?, DONE, UH UH, HOLD, "
-                        "YOU, U, YOU'RE, SURE, UR, YOU ARE"),
-            "YOUR": ("UH UH, YOU ARE, UH HUH, YOUR, NEXT, UR, SURE, U, YOU'RE, "
-                     "YOU, WHAT?, HOLD, LIKE, DONE"),
-            "YOU'RE": ("YOU, YOU'RE, UR, NEXT, UH UH, YOU ARE, U, YOUR, WHAT?, "
-                       "UH HUH, SURE, DONE, LIKE, HOLD"),
-            "UR": ("DONE, U, UR, UH HUH, WHAT?, SURE, YOUR, HOLD, YOU'RE, "
-                   "LIKE, NEXT, UH UH, YOU ARE, YOU"),
-            "U": ("UH HUH, SURE, NEXT, WHAT?, YOU'RE, UR, UH UH, DONE, U, YOU, "
-                  "LIKE, HOLD, YOU ARE, YOUR"),
-            "UH HUH": ("UH HUH, YOUR, YOU ARE, YOU, DONE, HOLD, UH UH, NEXT, "
-                       "SURE, LIKE, YOU'RE, UR, U, WHAT?"),
-            "UH UH": ("UR, U, YOU ARE, YOU'RE, NEXT, UH UH, DONE, YOU, UH HUH, "
-                      "LIKE, YOUR, SURE, HOLD, WHAT?"),
-            "WHAT?": ("YOU, HOLD, YOU'RE, YOUR, U, DONE, UH UH, LIKE, YOU ARE, "
-                      "UH HUH, UR, NEXT, WHAT?, SURE"),
-            "DONE": ("SURE, UH HUH, NEXT, WHAT?, YOUR, UR, YOU'RE, HOLD, LIKE, "
-                     "YOU, U, YOU ARE, UH UH, DONE"),
-            "NEXT": ("WHAT?, UH HUH, UH UH, YOUR, HOLD, SURE, NEXT, LIKE, "
-                     "DONE, YOU ARE, UR, YOU'RE, U, YOU"),
-            "HOLD": ("YOU ARE, U, DONE, UH UH, YOU, UR, SURE, WHAT?, YOU'RE, "
-                     "NEXT, HOLD, UH HUH, YOUR, LIKE"),
-            "SURE": ("YOU ARE, DONE, LIKE, YOU'RE, YOU, HOLD, UH HUH, UR, "
-                     "SURE, U, WHAT?, NEXT, YOUR, UH UH"),
-            "LIKE": ("YOU'RE, NEXT, U, UR, HOLD, DONE, UH UH, WHAT?, UH HUH, "
-                     "YOU, LIKE, SURE, YOU ARE, YOUR")
-        }
-        while True:
-            try:
-                display = input("Display: ")
-                if display == "ur":
-                    print("TOP LEFT")
-                elif display in ("first", "okay", "c"):
-                    print("TOP RIGHT")
-                elif display in ("yes", "nothing", "led", "they are"):
-                    print("MIDDLE LEFT")
-                elif display in ("blank", "read", "red", "you", "your", "you're", "their"):
-                    print("MIDDLE RIGHT")
-                elif display in ("", "reed", "leed", "they're"):
-                    print("BOTTOM LEFT")
-                else:
-                    print("BOTTOM RIGHT")
+        _interact(self.whos_machine())
 
-                label = input("Button label: ")
-                print(responses[label.upper()])
-            except KeyboardInterrupt:
-                break
+    def whos_machine(self):
+        """
+        Prepare a non-interactive *Who's on First* solver.
+
+        Returns
+        -------
+        WhosMachine
+            The solver, which alternately takes the display and a label.
+
+        """
+        return WhosMachine()
+
+    def whos_step(self, display, labels):
+        """
+        Solve one stage of a *Who's on First* module in a single call.
+
+        Parameters
+        ----------
+        display : str
+            The text on the display.
+        labels : sequence of str
+            The labels of the six buttons, from left to right and top to
+            bottom.
+
+        Returns
+        -------
+        str
+            The position of the button to press.
+
+        Raises
+        ------
+        ValueError
+            If the label of the button to read is not known.
+
+        """
+        labels = [label.upper() for label in labels]
+        read = labels[_WHOS_DISPLAYS.get(display.lower(), 5)]
+        try:
+            ranks = _whos_ranks()[read]
+        except KeyError:
+            raise ValueError("Unknown label: {}".format(read))
+        unranked = len(ranks)
+        best = min(range(len(labels)),
+                   key=lambda i: ranks.get(labels[i], unranked))
+        return WHOS_POSITIONS[best]
 
     def memory(self):
         """
@@ -479,87 +2723,20 @@ class Bomb(object):
         position, which is then input into the solver.
 
         """
-        class Solution(object):
-            """
-            A solution container.
-
-            """
-            def __init__(self):
-                self.position = None
-                self.label = None
-
-        def solve_stage(stage, display):
-            """
-            Solve a given stage.
+        _interact(self.memory_machine())
 
-            Appends a solution to the `pressed` array.
-
-            Parameters
-            ----------
-            stage : int
-                The stage to be solved.
-            display : str
-                The text on the module display.
-
-            """
-            soln = Solution()
-            if stage == 1:
-                if display in ("1", "2"):
-                    soln.position = "SECOND"
-                elif display == "3":
-                    soln.position = "THIRD"
-                else:
-                    soln.position = "FOURTH"
-            elif stage == 2:
-                if display in ("2", "4"):
-                    soln.position = pressed[0].position
-                elif display == "1":
-                    soln.label = "FOUR"
-                else:
-                    soln.position = "FIRST"
-            elif stage == 3:
-                if display == "1":
-                    soln.label = pressed[1].label
-                elif display == "2":
-                    soln.label = pressed[0].label
-                elif display == "3":
-                    soln.position = "THIRD"
-                elif display == "4":
-                    soln.value = "FOUR"
-            elif stage == 4:
-                if display in ("3", "4"):
-                    soln.position = pressed[1].position
-                elif display == "1":
-                    soln.position = pressed[0].position
-                else:
-                    soln.position = "FIRST"
-            else:
-                if display == "1":
-                    soln.label = pressed[0].label
-                elif display == "2":
-                    soln.label = pressed[1].label
-                elif display == "3":
-                    soln.label = pressed[3].label
-                else:
-                    soln.label = pressed[2].label
+    def memory_machine(self):
+        """
+        Prepare a non-interactive *Memory* solver.
 
-            if soln.position is None:
-                print(soln.label)
-                soln.position = input("Button position: ")
-            else:
-                print(soln.position)
-                soln.label = input("Button label: ")
-            pressed.append(soln)
+        Returns
+        -------
+        MemoryMachine
+            The solver, which takes the display, then the button pressed, for
+            each stage.
 
-        pressed = []
-        for i in range(1, 6):
-            try:
-                print("Stage {}:".format(i))
-                display = input("Display: ")
-                solve_stage(i, display)
-                print("-" * 20)
-            except KeyboardInterrupt:
-                break
+        """
+        return MemoryMachine()
 
     def morse(self):
         """
@@ -568,7 +2745,8 @@ class Bomb(object):
         If the diffuser knows morse code, they can relay the letter directly.
         Otherwise, they may speak the dits (dots) and dahs (dashes) out loud.
         The expert would enter them one at a time and the solver will
-        interpret them.
+        interpret them. The letters may start anywhere in the word, and the
+        prompt says how many more may be needed at most.
 
         Returns
         -------
@@ -576,52 +2754,79 @@ class Bomb(object):
             The frequency to be selected.
 
         """
-        decrypt = {
-            ".-"  : "A",   "-...": "B",   "-.-.": "C",
-            "-.." : "D",   "."   : "E",   "..-.": "F",
-            "--." : "G",   "....": "H",   ".."  : "I",
-            ".---": "J",   "-.-" : "K",   ".-..": "L",
-            "--"  : "M",   "-."  : "N",   "---" : "O",
-            ".--.": "P",   "--.-": "Q",   ".-." : "R",
-            "..." : "S",   "-"   : "T",   "..-" : "U",
-            "...-": "V",   ".--" : "W",   "-..-": "X",
-            "-.--": "Y",   "--..": "Z",
-        }
-        frequency = {
-            "shell": "3.505",
-            "halls": "3.515",
-            "slick": "3.522",
-            "trick": "3.532",
-            "boxes": "3.535",
-            "leaks": "3.542",
-            "strobe": "3.545",
-            "bistro": "3.552",
-            "flick": "3.555",
-            "bombs": "3.565",
-            "break": "3.572",
-            "brick": "3.575",
-            "steak": "3.582",
-            "sting": "3.592",
-            "vector": "3.595",
-            "beats": "3.600"
-        }
-        active = set(frequency.keys())
-        for i in range(6):
-            try:
-                char = input("Letter or morse: ")
-                if char.isalnum():
-                    letter = char
-                else:
-                    letter = decrypt[char].lower()
-                working_active = active.copy()
-                for word in active:
-                    if word[i] != letter:
-                        working_active.remove(word)
-                active = working_active
-                if len(active) == 1:
-                    return frequency[active.pop()], " Mhz"
-            except KeyboardInterrupt:
-                break
+        frequency = _interact(self.morse_machine())
+        if frequency is not None:
+            return frequency, " Mhz"
+
+    def morse_machine(self, from_start=False):
+        """
+        Prepare a non-interactive *Morse Code* solver.
+
+        Parameters
+        ----------
+        from_start : bool, optional
+            Whether the letters start with the first one of the word.
+            Otherwise, they may start anywhere in it.
+
+        Returns
+        -------
+        MorseMachine
+            The solver, which takes one letter at a time.
+
+        """
+        return MorseMachine(from_start)
+
+    def morse_stream(self, signal):
+        """
+        Solve a *Morse Code* problem from an unbroken signal.
+
+        The diffuser relays the dits and dahs from the start of the word
+        without separating the letters.
+
+        Parameters
+        ----------
+        signal : str
+            The dits (".") and dahs ("-") received so far. Any other characters
+            are ignored.
+
+        Returns
+        -------
+        str or list of str
+            The frequency to be selected if only one word matches. Otherwise,
+            the frequencies which are still possible.
+
+        """
+        decoder = MorseDecoder()
+        decoder.feed(signal)
+        if decoder.frequency is not None:
+            return decoder.frequency
+        return sorted(FREQUENCIES[word] for word in decoder.candidates)
+
+    def morse_timing(self, events):
+        """
+        Solve a *Morse Code* problem from the timing of the light.
+
+        Parameters
+        ----------
+        events : iterable of (bool, float)
+            Whether the light was on, and for how long, in order. It may be
+            unbounded, such as from a capture device, and is read until only
+            one word is possible. See `MorseTiming`.
+
+        Returns
+        -------
+        str or list of str
+            The frequency to be selected if only one word matches. Otherwise,
+            the frequencies which are still possible.
+
+        """
+        timing = MorseTiming()
+        frequency = timing.feed_all(events)
+        if frequency is not None:
+            return frequency
+        if not timing.synchronized:
+            return sorted(FREQUENCIES.values())
+        return sorted(FREQUENCIES[word] for word in timing.decoder.candidates)
 
     def complicated(self):
         """
@@ -642,50 +2847,50 @@ class Bomb(object):
         cut the wire before proceeding.
 
         """
-        def decide(letter):
-            """Print out whether or not to cut a wire."""
-            if letter == "C":
-                to_cut = True
-            elif letter == "D":
-                to_cut = False
-            elif letter == "S":
-                to_cut = True if self.serial_number.last_even() else False
-            elif letter == "P":
-                to_cut = True if self.has_parallel else False
-            else:
-                to_cut = True if self.n_batteries >= 2 else False
-            if to_cut:
-                print("CUT")
-            else:
-                print("DO NOT CUT")
+        _interact(self.complicated_machine())
 
-        instructions = ["C", "C", "S", "D",  # 0000 to 0011
-                        "S", "C", "S", "P",  # 0100 to 0111
-                        "D", "B", "P", "P",  # 1000 to 1011
-                        "B", "B", "S", "D"]  # 1100 to 1111
+    def complicated_machine(self):
+        """
+        Prepare a non-interactive *Complicated Wires* solver.
 
-        idx = 1
-        while True:
-            try:
-                led, colour, star = input("Wire {}. led, colour, star: ".format(idx))
-                if colour == "r":
-                    blue = "0"
-                    red = "1"
-                elif colour == "b":
-                    blue = "1"
-                    red = "0"
-                elif colour == "s":
-                    blue = "1"
-                    red = "1"
-                else:
-                    blue = "0"
-                    red = "0"
-                case = int("".join((led, red, blue, star)), 2)
-                letter = instructions[case]
-                decide(letter)
-                idx += 1
-            except KeyboardInterrupt:
-                break
+        Returns
+        -------
+        ComplicatedMachine
+            The solver, which takes one wire at a time.
+
+        """
+        return ComplicatedMachine(self)
+
+    def complicated_panel(self, wires):
+        """
+        Solve a whole *Complicated Wires* module at once.
+
+        Parameters
+        ----------
+        wires : list of str or ndarray of int
+            Each wire as its LED, colour and star, as for `complicated`, such
+            as ``["101", "0s0"]``. Alternatively, a NumPy array of any shape
+            holding the case of each wire, as from
+            `columnar.encode_complicated`, to solve many panels at once.
+
+        Returns
+        -------
+        list of str or ndarray of bool
+            For a list, "CUT" or "DO NOT CUT" for each wire. For an array,
+            whether each wire is to be cut.
+
+        """
+        mask = self._resolved().complicated_mask
+        if hasattr(wires, "dtype"):
+            return (mask >> wires & 1).astype(bool)
+        cases = _complicated_cases()
+        answers = []
+        for wire in wires:
+            case = cases.get(wire)
+            if case is None:
+                case = _complicated_case(*wire)
+            answers.append("CUT" if mask >> case & 1 else "DO NOT CUT")
+        return answers
 
     def sequences(self):
         """
@@ -701,20 +2906,19 @@ class Bomb(object):
         - red : r
 
         """
-        counts = {"r": 0, "b": 0, "k": 0}
-        cuts = {
-            "r": ["c", "b", "a", "ac", "b", "ac", "abc", "ab", "b"],
-            "b": ["b", "ac", "b", "a", "b", "bc", "c", "ac", "a"],
-            "k": ["abc", "ac", "b", "ac", "b", "bc", "ab", "c", "c"]
-        }
-        while True
-            try:
-                colour, connection = input("Colour and connection: ")
-                print("CUT" if connection in cuts[colour][counts[colour]]
-                      else "DO NOT CUT")
-                counts[colour] += 1
-            except KeyboardInterrupt:
-                break
+        _interact(self.sequences_machine())
+
+    def sequences_machine(self):
+        """
+        Prepare a non-interactive *Wire Sequences* solver.
+
+        Returns
+        -------
+        SequencesMachine
+            The solver, which takes one wire at a time.
+
+        """
+        return SequencesMachine()
 
     def maze(self, indicator, start, target):
         """
@@ -738,139 +2942,53 @@ class Bomb(object):
         Returns
         -------
         instructions : list of str
-            A list of directions to take one at a time.
-
-        """
-        if indicator in [(0, 1), (5, 2)]:
-            maze = [
-                ["rd", "lr", "ld", "rd", "lr", "l"],
-                ["ud", "rd", "ul", "ur", "lr", "ld"],
-                ["ud", "ur", "ld", "rd", "lr", "uld"],
-                ["ud", "r", "ulr", "lu", "r", "uld"],
-                ["urd", "lr", "ld", "rd", "l", "ud"],
-                ["ur", "l", "ur", "ul", "r", "ul"]
-            ]
-        elif indicator in [(4, 1), (1, 3)]:
-            maze = [
-                ["r", "lrd", "l", "rd", "lrd", "l"],
-                ["rd", "ul", "rd", "ul", "ur", "ld"],
-                ["ud", "rd", "ul", "rd", "lr", "uld"],
-                ["urd", "ul", "rd", "ul", "d", "ud"],
-                ["ud", "d", "ud", "rd", "ul", "ud"],
-                ["u", "ur", "ul", "ur", "lr", "lu"]
-            ]
-        elif indicator in [(3, 3), (5, 3)]:
-            maze = [
-                ["dr", "lr", "ld", "d", "dr", "dl"],
-                ["u", "d", "ud", "ur", "lu", "ud"],
-                ["dr", "uld", "ud", "rd", "ld", "ud"],
-                ["ud", "ud", "ud", "ud", "ud", "ud"],
-                ["ud", "ur", "ul", "ud", "ud", "ud"],
-                ["ur", "lr", "lr", "ul", "ur", "ul"]
-            ]
-        elif indicator in [(0, 0), (0, 3)]:
-            maze = [
-                ["rd", "ld", "r", "lr", "lr", "ld"],
-                ["ud", "ud", "dr", "lr", "lr", "uld"],
-                ["ud", "ur", "lu", "rd", "l", "ud"],
-                ["ud", "r", "lr", "lru", "lr", "lud"],
-                ["udr", "lr", "lr", "lr", "ld", "ud"],
-                ["ur", "lr", "l", "r", "ul", "u"]
-            ]
-        elif indicator in [(4, 2), (3, 5)]:
-            maze = [
-                ["r", "lr", "lr", "lr", "lrd", "ld"],
-                ["rd", "lr", "lr", "lrd", "lu", "u"],
-                ["udr", "ld", "r", "ul", "rd", "ld"],
-                ["ud", "ur", "lr", "ld", "u", "ud"],
-                ["ud", "rd", "lr", "ulr", "l", "ud"],
-                ["u", "ur", "lr", "lr", "lr", "lu"]
-            ]
-        elif indicator in [(4, 0), (2, 4)]:
-            maze = [
-                ["d", "dr", "ld", "r", "ldr", "ld"],
-                ["ud", "ud", "ud", "rd", "ul", "ud"],
-                ["udr", "ul", "u", "ud", "rd", "ul"],
-                ["ur", "ld", "dr", "udl", "ud", "d"],
-                ["rd", "ul", "u", "ud", "ur", "uld"],
-                ["ur", "lr", "lr", "ul", "r", "ul"]
-            ]
-        elif indicator in [(1, 0), (1, 5)]:
-            maze = [
-                ["dr", "lr", "lr", "ld", "dr", "ld"],
-                ["ud", "rd", "l", "ur", "lu", "ud"],
-                ["ur", "ul", "rd", "l", "rd", "ul"],
-                ["dr", "ld", "udr", "lr", "ul", "d"],
-                ["ud", "u", "ur", "lr", "ld", "ud"],
-                ["ur", "lr", "lr", "lr", "ulr", "ul"]
-            ]
-        elif indicator in [(3, 0), (2, 3)]:
-            maze = [
-                ["d", "dr", "lr", "ld", "dr", "ld"],
-                ["udr", "ulr", "l", "ur", "ul", "ud"],
-                ["ud", "dr", "lr", "lr", "ld", "ud"],
-                ["ud", "ur", "ld", "r", "ulr", "ul"],
-                ["ud", "d", "ur", "lr", "lr", "l"],
-                ["ur", "ulr", "lr", "lr", "lr", "l"]
-            ]
-        elif indicator in [(1, 2), (0, 4)]:
-            maze = [
-                ["d", "dr", "lr", "lr", "ldr", "ld"],
-                ["ud", "ud", "rd", "l", "ud", "ud"],
-                ["udr", "ulr", "ul", "rd", "ul", "ud"],
-                ["ud", "d", "dr", "ul", "r", "uld"],
-                ["ud", "ud", "ud", "dr", "dl", "u"],
-                ["ur", "ul", "ur", "ul", "ur", "l"]
-            ]
-        else:
+            A list of directions to take one at a time, along a shortest
+            route.
+
+        Raises
+        ------
+        ValueError
+            If a location is not in the maze.
+
+        """
+        _maze_cell(indicator)
+        try:
+            routes = _maze_routing_table(_MAZE_INDEX[tuple(indicator)])
+        except KeyError:
             return "Error: Maze not found!"
+        return _maze_route(routes, start, target)
 
-        visited = []
-        branches = []
-        moves = []
-        i, j = start
-        while (i, j) != target:
-            print(i, j)
-            visited.append((i, j))
-            moves.append((i, j))
-            val = maze[j][i]
-            n_possible = len(val)
-            if "u" in val and (i, j-1) in visited:
-                n_possible -= 1
-            if "d" in val and (i, j+1) in visited:
-                n_possible -= 1
-            if "l" in val and (i-1, j) in visited:
-                n_possible -= 1
-            if "r" in val and (i+1, j) in visited:
-                n_possible -= 1
-
-            if n_possible > 1:
-                branches.append((i, j))
-
-            if "u" in val and (i, j-1) not in visited:
-                j -= 1
-            elif "d" in val and (i, j+1) not in visited:
-                j += 1
-            elif "l" in val and (i-1, j) not in visited:
-                i -= 1
-            elif "r" in val and (i+1, j) not in visited:
-                i += 1
-            else:
-                i, j = branches.pop()
-                moves = moves[:moves.index((i, j))]
-
-        moves.append(target)
-        instructions = []
-        for current, move in zip(moves, moves[1:]):
-            if move[1] < current[1]:
-                instructions.append("up")
-            elif move[1] > current[1]:
-                instructions.append("down")
-            elif move[0] < current[0]:
-                instructions.append("left")
-            else:
-                instructions.append("right")
-        return instructions
+    def maze_many(self, indicator, queries):
+        """
+        Solve many routes through the same *Maze* module.
+
+        Parameters
+        ----------
+        indicator : (int, int)
+            The location of one indicator.
+        queries : iterable of ((int, int), (int, int))
+            The pairs of starting and target locations.
+
+        Returns
+        -------
+        list of list of str
+            The directions for each query, in order.
+
+        Raises
+        ------
+        ValueError
+            If a location is not in the maze, or no maze has an indicator
+            there.
+
+        """
+        _maze_cell(indicator)
+        try:
+            routes = _maze_routing_table(_MAZE_INDEX[tuple(indicator)])
+        except KeyError:
+            raise ValueError("No maze has an indicator at {}".format(
+                tuple(indicator)))
+        return [_maze_route(routes, start, target)
+                for start, target in queries]
 
     def passwords(self, initial):
         """
@@ -885,30 +3003,35 @@ class Bomb(object):
         initial : str
             The initial sequence of letters.
 
+        Returns
+        -------
+        list of str
+            The passwords which are still possible.
+
         """
-        all_passwords = (
-            "about", "after", "again", "below", "could",
-            "every", "first", "found", "great", "house",
-            "large", "learn", "never", "other", "place",
-            "plant", "point", "right", "small", "sound",
-            "spell", "still", "study", "their", "there",
-            "these", "thing", "think", "three", "water",
-            "where", "which", "world", "would", "write"
-        )
-        active = set()
-        for pos, letter in enumerate(initial):
-            for word in all_passwords:
-                if word[pos] == letter:
-                    active.add(word)
-        print("Active words: {}".format(active))
+        session = self.passwords_machine(initial)
+        print("Active words: {}".format(session.remaining))
         for i in range(5):
             possibilities = input("All possible in position {}: ".format(i))
-            working_active = active.copy()
-            for word in active:
-                if word[i] not in possibilities:
-                    working_active.remove(word)
-            active = working_active
-            print("Active words: {}".format(active))
+            print("Active words: {}".format(session.feed(possibilities)))
+        return session.remaining
+
+    def passwords_machine(self, initial=None):
+        """
+        Prepare a non-interactive *Passwords* solver.
+
+        Parameters
+        ----------
+        initial : str, optional
+            The initial sequence of letters.
+
+        Returns
+        -------
+        PasswordSession
+            The solver, which takes one column at a time.
+
+        """
+        return PasswordSession(initial)
 
     def venting(self):
         """Solve a *Venting Gas* module."""
@@ -918,7 +3041,7 @@ class Bomb(object):
         """Solve a *Capacitor Discharge* module."""
         return "HOLD DOWN LEVER"
 
-    def knob(self, top_row):
+    def knob(self, top_row, bottom_row=None):
         """
         Solve a *Knob* module.
 
@@ -929,6 +3052,9 @@ class Bomb(object):
         top_row : str
             The status of the LEDs on the top row, from left to right. "1"
             denotes a lit LED, and "0" denotes one which is off.
+        bottom_row : str, optional
+            The status of the LEDs on the bottom row, in the same format. It is
+            requested if needed and not provided.
 
         Returns
         -------
@@ -936,18 +3062,94 @@ class Bomb(object):
             The direction relative to "UP" in which to move the knob.
 
         """
-        if top_row == "101010":
-            bottom_row = input("Bottom row: ")
-            if bottom_row == "011011":
-                return "UP"
+        direction = (_manual or manual()).knob(top_row, bottom_row)
+        if direction is None:
+            direction = manual().knob(top_row, input("Bottom row: "))
+        return direction
+
+    def solve_all(self, modules, executor=None):
+        """
+        Plan every module of the bomb in one call.
+
+        Each single-step module is solved, unless it needs an observation
+        which was not given, such as the strip colour of a held button. Each
+        multi-step module is started, and sent the observations given so far.
+        No module waits on standard input.
+
+        Parameters
+        ----------
+        modules : iterable of dict
+            Each module as its ``module`` name, its ``args``, if any, and for
+            a multi-step module, its ``observations`` so far, if any, as in
+            `batch`:
+            ``[{"module": "wires", "args": ["wbk"]}, {"module": "simon"}]``.
+        executor : concurrent.futures.Executor, optional
+            Solve the single-step modules on this executor, such as a
+            ``ThreadPoolExecutor`` shared between bombs. The solvers hold the
+            GIL, so this only helps those which spend their time in NumPy,
+            such as `complicated_panel` on arrays. By default, the modules
+            are solved in turn, which gives the first instruction soonest.
+
+        Returns
+        -------
+        list of PlanStep
+            The modules which are solved or failed, then those which need
+            live input, each in the order given.
+
+        """
+        steps = []
+        solvers = []
+        machines = []
+        for index, module in enumerate(modules):
+            try:
+                step = PlanStep(index, module["module"])
+            except (KeyError, TypeError):
+                step = PlanStep(index, None)
+                step.error = "Not a module: {!r}".format(module)
             else:
-                return "DOWN"
+                if step.module in SOLVERS:
+                    solvers.append((step, module.get("args", ())))
+                elif step.module in MACHINES:
+                    machines.append((step, module))
+                else:
+                    step.error = "Unknown module: {}".format(step.module)
+            steps.append(step)
+
+        if executor is None:
+            for step, args in solvers:
+                self._plan_solver(step, args)
         else:
-            if top_row == "001011":
-                return "UP"
-            elif top_row == "011001":
-                return "DOWN"
-            elif top_row == "000010":
-                return "LEFT"
+            futures = [executor.submit(self._plan_solver, step, args)
+                       for step, args in solvers]
+        for step, module in machines:
+            try:
+                machine = start_module(self, step.module,
+                                       module.get("args", ()))
+                observations = module.get("observations")
+                if observations is not None:
+                    step.answer = [machine.send(observation)
+                                   for observation in observations]
+            except Exception as error:
+                step.error = "{}: {}".format(type(error).__name__, error)
             else:
-                return "RIGHT"
+                if not machine.done:
+                    step.machine = machine
+                    step.prompt = machine.prompt
+        if executor is not None:
+            for future in futures:
+                future.result()
+        # The sort is stable, so each group stays in the order given.
+        steps.sort(key=lambda step: step.needs_input)
+        return steps
+
+    def _plan_solver(self, step, args):
+        """Solve a single-step module for `solve_all`."""
+        try:
+            step.answer, step.prompt = plan_module(self, step.module, args)
+        except Exception as error:
+            step.error = "{}: {}".format(type(error).__name__, error)
+
+
+if __name__ == "__main__":
+    import sys
+    print("Compiled {}".format(write_answers(*sys.argv[1:2])))
@@ -0,0 +1,237 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+"""
+Replay a session from newline-delimited commands.
+
+Each line is a command followed by its arguments, separated by whitespace.
+Arguments containing whitespace, or empty ones, are wrapped in double
+quotes. Blank lines, and lines starting with "#", are skipped.
+
+- ``new ipzcv0 1 parallel frk car`` starts a new bomb, with its serial
+  number, number of batteries, and any of the optional edgework.
+- ``strike`` registers a strike, and answers with the number of strikes and
+  the corrections of the Simon Says module in progress, if any.
+- A single-step module, such as ``wires wbk``, ``button abort b y`` or
+  ``knob 101010 011011``, answers with its instruction. Coordinates are
+  written as ``x,y``: ``maze 0,1 0,0 5,5``. Lists are written as separate
+  arguments: ``wires_batch wbk yby``, or as comma-separated items within one:
+  ``keypad_batch q,at,lambda,moon six,para,an,smile``. A query of
+  ``maze_many`` is written as ``x,y-x,y``. The events of ``morse_timing``
+  are written as durations, positive while the light is on and negative
+  while it is off: ``morse_timing +1 -1 +3 -3``.
+- A multi-step module, such as ``simon r g`` or ``memory 2 4``, sends each
+  argument as an observation to the module in progress, starting one if
+  needed. It answers with the instruction for each observation, separated by
+  " | ", with "-" where there is none. ``passwords`` is started with the
+  letters given to ``passwords_start``, if any.
+
+Every command answers with exactly one line, which starts with "error:" if
+it failed. Only the current bomb and its modules in progress are kept, so
+logs of any length can be replayed.
+
+    $ printf 'new ipzcv0 1 parallel\\nwires wbk\\nsimon r g\\n' |
+    > python stream.py
+    SECOND
+    b | y
+
+"""
+import argparse
+import shlex
+import sys
+
+from solver import Bomb, MACHINES, SOLVERS, solve_module, start_module
+
+
+class Session(object):
+    """
+    A bomb being defused, with its multi-step modules in progress.
+
+    Attributes
+    ----------
+    bomb : Bomb or None
+        The current bomb.
+    machines : dict
+        The state machines in progress, by module.
+
+    """
+    __slots__ = ("bomb", "machines")
+
+    def __init__(self):
+        self.bomb = None
+        self.machines = {}
+
+    def execute(self, line):
+        """
+        Execute a single command.
+
+        Parameters
+        ----------
+        line : str
+            The command and its arguments.
+
+        Returns
+        -------
+        str or None
+            The answer. None if the line has no command.
+
+        """
+        if '"' in line:
+            lexer = shlex.shlex(line, posix=True)
+            lexer.whitespace_split = True
+            lexer.quotes = '"'
+            lexer.escape = ""
+            lexer.commenters = ""
+            tokens = list(lexer)
+        else:
+            tokens = line.split()
+        if not tokens or tokens[0].startswith("#"):
+            return None
+        try:
+            command = COMMANDS[tokens[0].lower()]
+        except KeyError:
+            return "error: Unknown command: {}".format(tokens[0])
+        try:
+            return command(self, tokens[1:])
+        except Exception as error:
+            return "error: {}: {}".format(type(error).__name__, error)
+
+    def _bomb(self):
+        if self.bomb is None:
+            raise ValueError("No bomb: start one with new")
+        return self.bomb
+
+
+def _format(answer):
+    """Format an answer on a single line."""
+    if answer is None:
+        return "-"
+    elif isinstance(answer, (list, tuple)):
+        return ", ".join(_format(item) for item in answer)
+    return str(answer)
+
+
+def _point(token):
+    """Parse coordinates written as "x,y"."""
+    x, y = token.split(",")
+    return int(x), int(y)
+
+
+def _new(session, args):
+    if len(args) < 2:
+        raise ValueError("Usage: new SERIAL BATTERIES [parallel] [frk] [car]")
+    flags = set(arg.lower() for arg in args[2:])
+    unknown = flags - set(("parallel", "frk", "car"))
+    if unknown:
+        raise ValueError("Unknown edgework: {}".format(
+            ", ".join(sorted(unknown))))
+    session.bomb = Bomb(args[0], int(args[1]),
+                        has_parallel="parallel" in flags,
+                        frk="frk" in flags, car="car" in flags)
+    session.machines.clear()
+    return "OK"
+
+
+def _strike(session, args):
+    bomb = session._bomb()
+    bomb.strike()
+    simon = session.machines.get("simon")
+    if simon is not None and simon.correction is not None:
+        return "{} | {}".format(bomb.n_strikes, simon.correction)
+    return str(bomb.n_strikes)
+
+
+def _passwords_start(session, args):
+    session.machines["passwords"] = start_module(
+        session._bomb(), "passwords", ["".join(args) or None])
+    return "OK"
+
+
+def _solver(module, parse):
+    """Make the command of a single-step module."""
+    def command(session, args):
+        return _format(solve_module(session._bomb(), module, parse(args)))
+    return command
+
+
+def _machine(module):
+    """Make the command of a multi-step module."""
+    def command(session, args):
+        machines = session.machines
+        answers = []
+        for observation in args:
+            machine = machines.get(module)
+            if machine is None:
+                machine = machines[module] = start_module(session._bomb(),
+                                                          module)
+            answers.append(_format(machine.send(observation)))
+            if machine.done:
+                del machines[module]
+        return " | ".join(answers)
+    return command
+
+
+# How to parse the arguments of each single-step module.
+_PARSERS = {
+    "wires_batch": lambda args: [args],
+    "keypad_batch": lambda args: [[arg.split(",") for arg in args]],
+    "whos_step": lambda args: [args[0], args[1:]],
+    "complicated_panel": lambda args: [args],
+    "maze": lambda args: [_point(arg) for arg in args],
+    "morse_timing": lambda args: [[(float(arg) > 0, abs(float(arg)))
+                                   for arg in args]],
+    "maze_many": lambda args: [
+        _point(args[0]), [tuple(_point(point) for point in query.split("-"))
+                          for query in args[1:]]],
+}
+
+COMMANDS = dict(
+    [(module, _solver(module, _PARSERS.get(module, list)))
+     for module in SOLVERS] +
+    [(module, _machine(module)) for module in MACHINES] +
+    [("new", _new), ("strike", _strike),
+     ("passwords_start", _passwords_start)])
+
+
+def run(lines, output, flush=True):
+    """
+    Execute commands, writing each answer as soon as it is known.
+
+    A module is never asked for more observations while the commands run, so
+    a command with too few arguments fails instead.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        The commands, one per line.
+    output : file-like
+        Where to write the answers, one per line.
+    flush : bool, optional
+        Whether to flush the output after each answer.
+
+    Returns
+    -------
+    Session
+        The session at the end.
+
+    """
+    session = Session()
+    for line in lines:
+        answer = session.execute(line)
+        if answer is not None:
+            output.write(answer + "\n")
+            if flush:
+                output.flush()
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--buffered", action="store_true",
+                        help="do not flush after each answer, for replaying "
+                             "logs faster")
+    args = parser.parse_args()
+    run(sys.stdin, sys.stdout, flush=not args.buffered)
+
+
+if __name__ == "__main__":
+    main()
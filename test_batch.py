@@ -0,0 +1,57 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+import io
+import json
+
+import batch
+import solver
+
+
+RECORD = {"id": 7, "serial": "IPZCV0", "batteries": 2, "parallel": True,
+          "modules": [{"module": "wires", "args": ["yby"]},
+                      {"module": "simon", "observations": ["r"]},
+                      {"module": "strike"},
+                      {"module": "knob", "args": ["000010"]}]}
+
+
+class TestSolveRecord(object):
+    def test_record(self):
+        assert batch.solve_record(RECORD) == {
+            "id": 7, "answers": ["SECOND", ["b"], 1, "LEFT"]}
+
+    def test_errors(self):
+        answer = batch.solve_record({"serial": "IPZCV0", "modules": [
+            {"module": "button", "args": ["abort", "b"]},
+            {"module": "knob", "args": ["101010", None]},
+            {"module": "simon", "args": ["print"]},
+            {"module": "dance"},
+            {"module": "wires", "args": ["yby"]}]})
+        assert answer["answers"][:2] == [
+            {"error": "ValueError: The strip colour is needed"},
+            {"error": "ValueError: The bottom row is needed"}]
+        assert [type(result) for result in answer["answers"]] == [
+            dict, dict, dict, dict, str]
+        assert "input" not in vars(solver)
+        assert "error" in batch.solve_record({"modules": []})
+
+    def test_chunk(self):
+        output, n_errors = batch.solve_chunk(
+            [json.dumps(RECORD), "{", "[]"])
+        assert [json.loads(line) for line in output.splitlines()] == [
+            batch.solve_record(RECORD), {"error": "Invalid JSON"},
+            {"error": "Not a bomb"}]
+        assert n_errors == 2
+
+
+def test_run():
+    records = [dict(RECORD, id=i) for i in range(50)]
+    lines = [json.dumps(record) + "\n" for record in records]
+    lines.insert(10, "\n")
+    lines.insert(20, "{\n")
+    output = io.StringIO()
+    stats = batch.run(lines, output, workers=2, chunk_size=3, pending=1,
+                      report=None)
+    answers = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [answer.get("id") for answer in answers] == (
+        list(range(19)) + [None] + list(range(19, 50)))
+    assert (stats["records"], stats["errors"]) == (51, 1)
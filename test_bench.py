@@ -0,0 +1,48 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+import pytest
+
+pytest.importorskip("tracemalloc")
+
+import bench
+import solver
+
+
+class TestBench(object):
+    def test_corpus_seeded(self):
+        first = bench.corpus("keypad", 20, seed=3)
+        second = bench.corpus("keypad", 20, seed=3)
+        assert [call.args for call in first] == [call.args for call in second]
+        assert ([call.args for call in first] !=
+                [call.args for call in bench.corpus("keypad", 20, seed=4)])
+
+    def test_every_method(self):
+        methods = set(name for name in dir(solver.Bomb)
+                      if not name.startswith("_") and
+                      callable(getattr(solver.Bomb, name)))
+        assert methods == set(bench.GENERATORS)
+
+    def test_run(self):
+        results = bench.run(n_calls=5, repeat=1)
+        assert set(results["methods"]) == set(bench.GENERATORS)
+        for result in results["methods"].values():
+            assert result["calls"] == 5
+            assert result["p50"] <= result["p90"] <= result["p99"]
+        assert not hasattr(solver, "input")
+
+    def test_keeps_input(self, monkeypatch):
+        def patched(prompt=""):
+            return ""
+        monkeypatch.setattr(solver, "input", patched, raising=False)
+        bench.benchmark("wires", bench.corpus("wires", 3), repeat=1)
+        assert solver.input is patched
+
+    def test_compare(self):
+        baseline = {"methods": {"wires": {"p50": 2.0, "bytes_per_call": 100},
+                                "knob": {"p50": 1.0, "bytes_per_call": 64}}}
+        results = {"methods": {"wires": {"p50": 4.0, "bytes_per_call": 100},
+                               "knob": {"p50": 1.2, "bytes_per_call": 64},
+                               "maze": {"p50": 9.0, "bytes_per_call": 0}}}
+        assert bench.compare(results, baseline) == [
+            "wires: p50 went from 2.00 to 4.00 us"]
+        assert bench.compare(baseline, baseline) == []
@@ -0,0 +1,102 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+import itertools
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import columnar
+from solver import Bomb, KEYPAD_COLUMNS, WIRE_COLOURS
+
+
+def scripted(monkeypatch, lines):
+    """Feed lines to `input`, then interrupt."""
+    lines = iter(lines)
+
+    def fake_input(prompt=""):
+        try:
+            return next(lines)
+        except StopIteration:
+            raise KeyboardInterrupt
+    monkeypatch.setattr("builtins.input", fake_input)
+
+
+class TestColumnar(object):
+    def test_wires(self):
+        panels = ["".join(code) for n_wires in range(3, 7)
+                  for code in itertools.product(WIRE_COLOURS, repeat=n_wires)]
+        codes = columnar.encode_wires(panels + ["WBK"])
+        for serial, last_odd in (("IPZCV0", False), ("IPZCV1", True)):
+            bomb = Bomb(serial, 1)
+            answers = columnar.wires(codes, np.full(len(codes), last_odd))
+            assert list(answers) == bomb.wires_batch(panels + ["WBK"])
+
+    def test_wires_invalid(self):
+        with pytest.raises(ValueError):
+            columnar.encode_wires(["wb"])
+        with pytest.raises(ValueError):
+            columnar.encode_wires(["wbg"])
+        with pytest.raises(ValueError, match="No Wires rules for 8 wires"):
+            columnar.encode_wires(["wbk", "wbkwbkwb"])
+
+    def test_button(self):
+        rows = list(itertools.product(
+            ("abort", "Detonate", "hold", "press", "other"),
+            ("b", "r", "w", "y", "n"), range(4), (False, True),
+            (False, True), ("b", "y", "w")))
+        texts, colours, batteries, car, frk, strips = zip(*rows)
+        answers = columnar.button(texts, colours, batteries, car, frk, strips)
+        for row, answer in zip(rows, answers):
+            text, colour, n_batteries, car, frk, strip = row
+            bomb = Bomb("IPZCV0", n_batteries, car=car, frk=frk)
+            assert answer == bomb.button(text, colour, strip)
+
+    def test_keypad(self):
+        bomb = Bomb("IPZCV0", 1)
+        quads = sorted(set(tuple(sorted(keys)) for column in KEYPAD_COLUMNS
+                           for keys in itertools.combinations(column, 4)))
+        answers = columnar.keypad(columnar.encode_keypad(quads))
+        for keys, answer in zip(quads, answers):
+            assert list(answer) == bomb.keypad(*keys)
+
+    def test_keypad_aliases(self):
+        keys = columnar.encode_keypad([["six", "Para", "an", "derp-face"]])
+        assert list(columnar.keypad(keys)[0]) == ["6", "para", "an", "smile"]
+
+    def test_keypad_invalid(self):
+        with pytest.raises(ValueError):
+            columnar.keypad(columnar.encode_keypad([["q", "at", "psi", "i"]]))
+
+    def test_complicated(self, monkeypatch, capsys):
+        wires = ["".join(wire) for wire in
+                 itertools.product("01", "rbsn", "01")]
+        cases = columnar.encode_complicated(
+            [int(wire[0]) for wire in wires], [wire[1] for wire in wires],
+            [int(wire[2]) for wire in wires])
+        for serial, n_batteries, parallel in itertools.product(
+                ("IPZCV0", "IPZCV1"), (1, 2), (False, True)):
+            bomb = Bomb(serial, n_batteries, has_parallel=parallel)
+            n = len(wires)
+            answers = columnar.complicated(
+                cases, np.full(n, bomb.serial_number.last_odd()),
+                np.full(n, parallel), np.full(n, n_batteries))
+            assert list(bomb.complicated_panel(cases)) == list(answers)
+            scripted(monkeypatch, wires)
+            bomb.complicated()
+            printed = capsys.readouterr().out.splitlines()
+            assert list(answers) == [line == "CUT" for line in printed]
+
+    def test_knob(self):
+        bomb = Bomb("IPZCV0", 1)
+        tops = ["{:06b}".format(i) for i in range(64)]
+        bottoms = ["011011" if i % 2 else "111111" for i in range(64)]
+        answers = columnar.knob(tops, bottoms)
+        assert list(answers) == [bomb.knob(top, bottom)
+                                 for top, bottom in zip(tops, bottoms)]
+        assert list(columnar.knob(range(64), [0b011011] * 64)) == [
+            bomb.knob(top, "011011") for top in tops]
+        assert list(columnar.knob(["000010", "001011"])) == [
+            "LEFT", "UP"]
+        with pytest.raises(ValueError):
+            columnar.knob(["000010", "101010"])
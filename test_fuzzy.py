@@ -0,0 +1,94 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+import itertools
+
+import fuzzy
+from fuzzy import Candidate, FuzzyIndex
+from solver import Bomb, WHOS_RESPONSES, keypad_aliases
+
+
+def entries(candidates):
+    return [candidate.entry for candidate in candidates]
+
+
+def slow_distance(first, second):
+    previous = list(range(len(second) + 1))
+    for i, char in enumerate(first, 1):
+        current = [i]
+        for j, other in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char != other)))
+        previous = current
+    return previous[-1]
+
+
+class TestFuzzy(object):
+    def test_distance(self):
+        words = ["".join(word) for n in range(5)
+                 for word in itertools.product("ab", repeat=n)]
+        for first, second in itertools.product(words, repeat=2):
+            assert (fuzzy._distance(first, fuzzy._pattern(first), second) ==
+                    slow_distance(first, second))
+
+    def test_phonetic(self):
+        assert len(set(fuzzy._phonetic(fuzzy._normalize(word))
+                       for word in ("YOU'RE", "YOUR", "UR"))) == 1
+        assert len(set(fuzzy._phonetic(fuzzy._normalize(word))
+                       for word in ("READ", "RED", "REED"))) == 1
+        assert fuzzy._phonetic("COPYRIGHT") == fuzzy._phonetic("COPYRITE")
+        assert fuzzy._phonetic("6") != fuzzy._phonetic("R")
+        assert fuzzy._phonetic("UHHUH") == fuzzy._phonetic("YOU") == ""
+
+    def test_silent(self):
+        assert fuzzy.match_label("ewe") == []
+        assert "UH HUH" not in entries(fuzzy.match_label("you"))
+        assert not any(candidate.phonetic
+                       for candidate in fuzzy.match_keypad("you"))
+        assert "6" not in entries(fuzzy.match_keypad("your"))
+        for transcript in ("ewe", "you", "oh", "uh", "eye"):
+            for candidate in (fuzzy.match_label(transcript) +
+                              fuzzy.match_keypad(transcript)):
+                assert candidate.distance <= 2
+
+    def test_exact(self):
+        for label in WHOS_RESPONSES:
+            assert Candidate(label, 0, True) in fuzzy.match_label(
+                label.lower())
+        for alias, symbol in keypad_aliases().items():
+            assert fuzzy.match_keypad(alias)[0].entry == symbol
+
+    def test_homophones(self):
+        assert entries(fuzzy.match_label("your"))[:2] == ["YOUR", "YOU'RE"]
+        assert "UR" in entries(fuzzy.match_label("your"))
+        assert entries(fuzzy.match_display("red"))[:3] == [
+            "red", "read", "reed"]
+        assert "led" in entries(fuzzy.match_display("leed"))
+
+    def test_bottom_right_displays(self):
+        labels = ["READY", "FIRST", "NO", "BLANK", "NOTHING", "YES"]
+        for display in ("display", "says", "no", "lead", "hold on",
+                        "you are", "there", "see", "cee"):
+            assert fuzzy.match_display(display)[0] == Candidate(display, 0,
+                                                                True)
+            # The bottom right label is YES, whose list starts with FIRST.
+            assert Bomb("IPZCV0", 1).whos_step(display,
+                                               labels) == "TOP RIGHT"
+        assert entries(fuzzy.match_display("sea"))[:2] == ["see", "cee"]
+        assert entries(fuzzy.match_display("there"))[:2] == [
+            "there", "they're"]
+
+    def test_keypad(self):
+        assert entries(fuzzy.match_keypad("but"))[0] == "ot"
+        assert fuzzy.match_keypad("copyrite") == [Candidate("copy", 3, True)]
+
+    def test_empty(self):
+        assert fuzzy.match_display("") == [Candidate("", 0, True)]
+        assert "" not in entries(fuzzy.match_display("u"))
+        assert fuzzy.match_label("") == []
+
+    def test_limit(self):
+        index = FuzzyIndex({"one": 1, "won": 1, "two": 2, "too": 2, "to": 2},
+                           limit=1)
+        assert index.match("wun") == [Candidate(1, 1, True)]
+        assert index.match("xxxxxxxx") == []
+        assert len(FuzzyIndex(list(WHOS_RESPONSES), limit=2).match("u")) == 2
@@ -0,0 +1,107 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+import socket
+import threading
+
+import pytest
+
+import solver
+from instrument import Histogram, Instrumentation
+from solver import Bomb
+
+
+class TestHistogram(object):
+    def test_buckets(self):
+        histogram = Histogram((1.0, 2.0))
+        for value in (0.5, 1.0, 1.5, 3.0):
+            histogram.observe(value)
+        assert histogram.cumulative() == [("1.0", 2), ("2.0", 3), ("+Inf", 4)]
+        assert histogram.total == 6.0
+
+
+class TestInstrumentation(object):
+    def setup_method(self, method):
+        self.metrics = Instrumentation()
+        self.metrics.enable()
+        self.bomb = Bomb("IPZCV0", 1)
+
+    def teardown_method(self, method):
+        self.metrics.disable()
+
+    def test_disable(self):
+        wrapped = vars(Bomb)["wires"]
+        self.metrics.disable()
+        assert not self.metrics.enabled
+        assert not hasattr(solver, "input")
+        assert vars(Bomb)["wires"] is wrapped.__wrapped__
+
+    def test_calls(self):
+        self.bomb.wires("wbk")
+        self.bomb.wires("yby")
+        with pytest.raises(ValueError):
+            self.bomb.keypad("q", "at", "psi", "i")
+        snapshot = self.metrics.snapshot()
+        assert snapshot["wires"]["calls"] == 2
+        assert snapshot["wires"]["errors"] == 0
+        assert snapshot["keypad"]["errors"] == 1
+        assert snapshot["wires"]["compute_buckets"][-1] == ("+Inf", 2)
+        assert snapshot["maze"]["calls"] == 0
+
+    def test_nested(self):
+        self.bomb.keypad_batch([("q", "at", "lambda", "moon")] * 3)
+        self.bomb.solve_all([{"module": "wires", "args": ["wbk"]},
+                             {"module": "simon"}])
+        snapshot = self.metrics.snapshot()
+        assert [snapshot[method]["calls"] for method in (
+            "keypad_batch", "keypad", "solve_all", "wires",
+            "simon_machine")] == [1, 0, 1, 0, 0]
+
+    def test_input_wait(self, monkeypatch):
+        lines = iter(["r", "g"])
+        monkeypatch.setattr("builtins.input", lambda prompt="": next(lines))
+        monkeypatch.setattr("builtins.print", lambda *args: None)
+        with pytest.raises(StopIteration):
+            self.bomb.simon()
+        simon = self.metrics.snapshot()["simon"]
+        assert simon["inputs"] == 3
+        assert simon["input_buckets"][-1] == ("+Inf", 1)
+        assert simon["errors"] == 1
+        assert self.metrics.snapshot()["simon_machine"]["inputs"] == 0
+
+    def test_render(self):
+        self.bomb.wires("wbk")
+        text = self.metrics.render()
+        assert 'ktane_calls_total{module="wires"} 1\n' in text
+        assert 'ktane_compute_seconds_count{module="wires"} 1\n' in text
+        assert ('ktane_compute_seconds_bucket{module="wires",le="+Inf"} 1\n'
+                in text)
+        assert "# TYPE ktane_input_wait_seconds histogram\n" in text
+
+    def test_write(self, tmpdir):
+        self.bomb.wires("wbk")
+        path = str(tmpdir.join("ktane.prom"))
+        self.metrics.write(path)
+        with open(path) as metrics:
+            assert metrics.read() == self.metrics.render()
+
+    def test_send(self):
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        received = []
+
+        def accept():
+            connection, _ = server.accept()
+            with connection:
+                chunks = iter(lambda: connection.recv(4096), b"")
+                received.append(b"".join(chunks))
+        thread = threading.Thread(target=accept)
+        thread.start()
+        self.metrics.send(server.getsockname())
+        thread.join()
+        server.close()
+        assert received[0].decode() == self.metrics.render()
+
+    def test_single_instance(self):
+        with pytest.raises(RuntimeError):
+            Instrumentation().enable()
@@ -0,0 +1,246 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+import itertools
+import json
+
+import pytest
+
+import rules
+import solver
+from solver import Bomb, MemoryStage, ORDINALS, WIRE_COLOURS
+
+
+# The rules as they were written before they were read from the manual, to
+# check the compiled ones against.
+
+def chain_wires(wires, last_odd):
+    if len(wires) == 3:
+        if "r" not in wires:
+            return "SECOND"
+        elif wires[-1] == "w":
+            return "THIRD"
+        elif wires.count("b") > 1:
+            return ORDINALS[2 - wires[::-1].index("b")]
+        return "THIRD"
+    elif len(wires) == 4:
+        if wires.count("r") > 1 and last_odd:
+            return ORDINALS[2 - wires[::-1].index("r")]
+        elif ((wires[-1] == "y" and wires.count("r") == 0)
+              or wires.count("b") == 1):
+            return "FIRST"
+        elif wires.count("y") > 1:
+            return "FOURTH"
+        return "SECOND"
+    elif len(wires) == 5:
+        if wires[-1] == "k" and last_odd:
+            return "FOURTH"
+        elif wires.count("r") == 1 and wires.count("y") > 1:
+            return "FIRST"
+        elif wires.count("k") == 0:
+            return "SECOND"
+        return "FIRST"
+    else:
+        if wires.count("y") == 0 and last_odd:
+            return "THIRD"
+        elif wires.count("y") == 0 and wires.count("w") > 1:
+            return "FOURTH"
+        elif wires.count("r") == 0:
+            return "SIXTH"
+        return "FOURTH"
+
+
+def chain_hold(text, colour, n_batteries, car, frk):
+    text = text.lower()
+    if text == "abort" and colour == "b":
+        return True
+    elif n_batteries > 1 and text == "detonate":
+        return False
+    elif colour == "w" and car:
+        return True
+    elif n_batteries > 2 and frk:
+        return False
+    elif colour == "y":
+        return True
+    elif text == "hold" and colour == "r":
+        return False
+    return True
+
+
+def chain_complicated_mask(last_even, has_parallel, two_batteries):
+    instructions = "CCSDSCSPDBPPBBSD"
+    cut = {"C": True, "D": False, "S": last_even, "P": has_parallel,
+           "B": two_batteries}
+    return sum(1 << case for case, letter in enumerate(instructions)
+               if cut[letter])
+
+
+def chain_knob(top_row, bottom_row):
+    if top_row == "101010":
+        return "UP" if bottom_row == "011011" else "DOWN"
+    return {"001011": "UP", "011001": "DOWN",
+            "000010": "LEFT"}.get(top_row, "RIGHT")
+
+
+def chain_memory(stage, display, pressed):
+    soln = MemoryStage()
+    if stage == 1:
+        soln.position = {"1": "SECOND", "2": "SECOND",
+                         "3": "THIRD"}.get(display, "FOURTH")
+    elif stage == 2:
+        if display in ("2", "4"):
+            soln.position = pressed[0].position
+        elif display == "1":
+            soln.label = "4"
+        else:
+            soln.position = "FIRST"
+    elif stage == 3:
+        if display == "1":
+            soln.label = pressed[1].label
+        elif display == "2":
+            soln.label = pressed[0].label
+        elif display == "3":
+            soln.position = "THIRD"
+        elif display == "4":
+            soln.label = "4"
+    elif stage == 4:
+        if display in ("3", "4"):
+            soln.position = pressed[1].position
+        elif display == "1":
+            soln.position = pressed[0].position
+        else:
+            soln.position = "FIRST"
+    else:
+        soln.label = pressed[{"1": 0, "2": 1, "3": 3}.get(display, 2)].label
+    return soln
+
+
+def manual_data():
+    with open(solver.MANUAL_PATH) as manual:
+        return json.load(manual)
+
+
+def corrected(wires, last_odd):
+    """Whether the manual disagrees with the chains on these wires."""
+    if len(wires) == 4:
+        return wires.count("r") > 1 and last_odd
+    elif len(wires) == 6:
+        return (wires.count("y") < 2 and wires.count("w") > 1 and
+                wires.count("r") == 0 and
+                not (wires.count("y") == 0 and last_odd))
+    return False
+
+
+class TestManual(object):
+    def setup_method(self, method):
+        self.manual = solver.manual()
+
+    def test_version(self):
+        assert (self.manual.version, self.manual.verification) == ("v1r2", 241)
+
+    def test_wires(self):
+        n_changed = 0
+        for last_odd in (False, True):
+            for n_wires in range(3, 7):
+                for code in itertools.product(WIRE_COLOURS, repeat=n_wires):
+                    wires = "".join(code)
+                    changed = (ORDINALS[self.manual.wires(wires, last_odd) - 1]
+                               != chain_wires(wires, last_odd))
+                    assert changed == corrected(wires, last_odd)
+                    n_changed += changed
+        assert n_changed == 2158
+
+    def test_wires_last_red(self):
+        assert self.manual.wires("rbrr", True) == 4
+        assert self.manual.wires("rrbw", True) == 2
+        assert self.manual.wires("rrbw", False) == 1
+
+    def test_wires_one_yellow(self):
+        assert self.manual.wires("ywwkkk", False) == 4
+        assert self.manual.wires("wwkkkk", False) == 6
+        assert self.manual.wires("wwkkkk", True) == 3
+
+    def test_wires_too_many(self):
+        with pytest.raises(ValueError):
+            self.manual.wires("rrrrrrr", False)
+
+    def test_button(self):
+        texts = ("abort", "Detonate", "HOLD", "press", "other")
+        for n_batteries, car, frk in itertools.product(range(5), (False, True),
+                                                       (False, True)):
+            lit = [label for label, on in (("CAR", car), ("FRK", frk)) if on]
+            table = self.manual.button(n_batteries, lit)
+            for text, colour in itertools.product(texts, "brwynx"):
+                assert (table.hold(text, colour) ==
+                        chain_hold(text, colour, n_batteries, car, frk))
+
+    def test_button_tables_shared(self):
+        assert self.manual.button(3, ["FRK", "BOB"]) is self.manual.button(
+            7, ["frk"])
+
+    def test_release(self):
+        assert self.manual.release("B") == "FOUR"
+        assert self.manual.release("y") == "FIVE"
+        assert self.manual.release("w") == "ONE"
+
+    def test_complicated(self):
+        for last_odd, parallel, n_batteries in itertools.product(
+                (False, True), (False, True), range(5)):
+            ports = ["parallel"] if parallel else ["serial"]
+            assert (self.manual.complicated_mask(last_odd, n_batteries, ports)
+                    == chain_complicated_mask(not last_odd, parallel,
+                                              n_batteries >= 2))
+
+    def test_knob(self):
+        rows = ["{:06b}".format(row) for row in range(64)]
+        for top, bottom in itertools.product(rows, rows):
+            assert self.manual.knob(top, bottom) == chain_knob(top, bottom)
+        assert [row for row in rows
+                if self.manual.knob_needs_bottom(row)] == ["101010"]
+
+    def test_memory(self):
+        labels = ("1", "2", "3", "4")
+        for positions in itertools.product(ORDINALS[:4], repeat=4):
+            pressed = [MemoryStage(position, labels[ORDINALS.index(position)])
+                       for position in positions]
+            for stage, display in itertools.product(range(1, 7), labels):
+                assert (solver._memory_stage(stage, display, pressed) ==
+                        chain_memory(stage, display, pressed))
+
+
+class TestCompile(object):
+    def test_unknown_condition(self):
+        data = manual_data()
+        data["wires"]["3"][0]["if"] = [["strikes", ">", 1]]
+        with pytest.raises(ValueError):
+            rules.Manual(data)
+
+    def test_unknown_memory_action(self):
+        data = manual_data()
+        data["memory"][0]["1"] = ["press", "2"]
+        with pytest.raises(ValueError):
+            rules.Manual(data)
+
+    def test_missing_letter(self):
+        data = manual_data()
+        del data["complicated"]["letters"]["B"]
+        with pytest.raises(ValueError):
+            rules.Manual(data)
+
+    def test_use_manual(self, tmp_path):
+        data = manual_data()
+        data["knob"]["*"] = "LEFT"
+        data["wires"]["3"] = [{"cut": 1}]
+        data["button"]["release"]["w"] = "SEVEN"
+        path = tmp_path / "manual.json"
+        path.write_text(json.dumps(data))
+        original = solver.MANUAL_PATH
+        try:
+            solver.use_manual(str(path))
+            bomb = Bomb("IPZCV0", 1)
+            assert bomb.knob("111111") == "LEFT"
+            assert bomb.wires("rrr") == "FIRST"
+            assert bomb.button("abort", "b", "w") == (
+                "HOLD until the timer contains a SEVEN")
+        finally:
+            solver.use_manual(original)
+        assert Bomb("IPZCV0", 1).knob("111111") == "RIGHT"
@@ -0,0 +1,165 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+import asyncio
+import json
+
+from server import Client, SessionServer, load_test
+
+
+class TestSessionServer(object):
+    def setup_method(self, method):
+        self.server = SessionServer()
+        self.session = self.server.handle(
+            {"op": "new", "serial": "IPZCV0", "batteries": 2,
+             "parallel": True})["session"]
+
+    def request(self, op, **fields):
+        fields["op"] = op
+        fields["session"] = self.session
+        return self.server.handle(fields)
+
+    def test_solve(self):
+        assert self.request("solve", module="wires", args=["yby"]) == {
+            "result": "SECOND"}
+        assert self.request("solve", module="maze",
+                            args=[[2, 4], [0, 0], [0, 1]]) == {
+            "result": ["down"]}
+
+    def test_button(self):
+        assert self.request("solve", module="button",
+                            args=["detonate", "r"]) == {
+            "result": "PRESS and immediately RELEASE"}
+        assert self.request("solve", module="button",
+                            args=["abort", "b", "y"]) == {
+            "result": "HOLD until the timer contains a FIVE"}
+
+    def test_machine(self):
+        response = self.request("start", module="simon")
+        assert response == {"machine": "simon1", "prompt": "Colour: "}
+        assert self.request("send", machine="simon1", observation="r")[
+            "result"] == "b"
+        assert self.request("strike") == {"strikes": 1,
+                                          "corrections": {"simon1": "y"}}
+        assert self.request("send", machine="simon1", observation="r") == {
+            "result": "y", "prompt": "Colour: ", "done": False}
+
+    def test_machine_done(self):
+        self.request("start", module="morse")
+        for letter in "bri":
+            response = self.request("send", machine="morse1",
+                                    observation=letter)
+        assert response["result"] == "3.575"
+        assert response["done"]
+        assert "error" in self.request("send", machine="morse1",
+                                       observation="c")
+
+    def test_solve_all(self):
+        response = self.request("solve_all", modules=[
+            {"module": "simon"}, {"module": "wires", "args": ["yby"]},
+            {"module": "button", "args": ["hold", "b"]}])
+        assert response == {"plan": [
+            {"index": 1, "module": "wires", "result": "SECOND"},
+            {"index": 0, "module": "simon", "result": None,
+             "machine": "simon1", "prompt": "Colour: "},
+            {"index": 2, "module": "button", "result": "HOLD",
+             "prompt": "Strip colour: "}]}
+        assert self.request("send", machine="simon1", observation="r")[
+            "result"] == "b"
+
+    def test_errors(self):
+        assert self.server.handle({"op": "explode", "id": 7}) == {
+            "id": 7, "error": "Unknown op: explode"}
+        assert "error" in self.request("solve", module="simon")
+        assert self.request("solve", module="button",
+                            args=["abort", "b"]) == {
+            "error": "ValueError: The strip colour is needed"}
+        assert self.request("solve", module="button",
+                            args=["abort", "b", None]) == {
+            "error": "ValueError: The strip colour is needed"}
+        assert self.request("solve", module="knob", args=["101010"]) == {
+            "error": "ValueError: The bottom row is needed"}
+        assert self.request("solve", module="wires", args=["ww"]) == {
+            "error": "ValueError: No Wires rules for 2 wires"}
+        self.request("close")
+        assert "error" in self.request("strike")
+
+    def test_machine_args(self):
+        for args in (["print"], [None], "r", [True, True]):
+            assert "error" in self.request("start", module="simon", args=args)
+        assert "error" in self.request("solve_all", modules=[
+            {"module": "simon", "args": ["print"]}])["plan"][0]
+        assert self.server.sessions[self.session].machines == {}
+        assert self.request("start", module="morse", args=[True])[
+            "prompt"].startswith("Letter or morse")
+        assert "error" in self.request("start", module="morse", args=["x"])
+        assert self.request("start", module="passwords", args=["w"]) == {
+            "machine": "passwords2",
+            "prompt": "All possible in position 0: "}
+        assert self.request("strike") == {"strikes": 1, "corrections": {}}
+
+    def test_not_a_request(self):
+        for request in ([1], 5, "x", None):
+            assert "error" in self.server.handle(request)
+        assert self.server.handle({"op": None, "id": 3}) == {
+            "id": 3, "error": "Unknown op: None"}
+        assert "error" in self.server.handle({"op": ["solve"]})
+
+
+def test_client():
+    async def run():
+        server = await SessionServer().start()
+        client = await Client.connect(*server.sockets[0].getsockname()[:2])
+        session = (await client.request("new", serial="IPZCV0",
+                                        batteries=1))["session"]
+        response = await client.request("solve", session=session,
+                                        module="wires", args=["wbk"])
+        await client.close()
+        server.close()
+        await server.wait_closed()
+        return response
+
+    assert asyncio.run(run()) == {"id": 2, "result": "SECOND"}
+
+
+def test_bad_line():
+    async def run():
+        server = await SessionServer().start()
+        reader, writer = await asyncio.open_connection(
+            *server.sockets[0].getsockname()[:2])
+        responses = []
+        for line in (b"[1]\n", b'{"op": null}\n', b'{"op": "new"}\n'):
+            writer.write(line)
+            responses.append(json.loads(await reader.readline()))
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return responses
+
+    responses = asyncio.run(run())
+    assert all("error" in response for response in responses)
+    assert responses[2]["error"].startswith("KeyError")
+
+
+def test_long_line():
+    async def run():
+        server = await SessionServer().start()
+        reader, writer = await asyncio.open_connection(
+            *server.sockets[0].getsockname()[:2])
+        responses = []
+        for line in (b" " * 2 ** 21 + b"\n", b" " * (2 ** 20 + 1) + b"\n",
+                     b'{"op": "new", "serial": "IPZCV0"}\n'):
+            writer.write(line)
+            responses.append(json.loads(await reader.readline()))
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return responses
+
+    assert asyncio.run(run()) == [{"error": "Line too long"},
+                                  {"error": "Line too long"},
+                                  {"session": "s1"}]
+
+
+def test_load():
+    stats = asyncio.run(load_test(200, n_clients=50))
+    assert stats["requests"] == 200 * 14
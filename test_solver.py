@@ -1,6 +1,16 @@
 # (C) 2015  Jean Nassar
 # Released under the GNU General Public License, version 3
-from solver import Bomb, SerialNumber
+import concurrent.futures
+import itertools
+import random
+
+import pytest
+
+import solver
+from solver import (Bomb, FREQUENCIES, MemoryStage, MORSE_LETTERS,
+                    MorseDecoder, MorseTiming, PasswordSession, SerialNumber,
+                    SIMON_MAPS, WIRE_COLOURS, _solve_wires, solve_memory,
+                    solve_memory_batch)
 
 
 class TestSerialNumber(object):
@@ -30,6 +40,207 @@ class TestSerialNumber(object):
         assert not serial_odd.last_even()
         assert not serial_odd_2.last_even()
 
+    def test_serial_digits(self):
+        serial = SerialNumber("DS50L8")
+        assert serial.digits == [5, 0, 8]
+        serial.number = "IPZCV1"
+        assert serial.digits == [1]
+        assert serial.has_vowel()
+        assert serial.last_odd()
+
+    def test_serial_no_digits(self):
+        with pytest.raises(IndexError):
+            SerialNumber("ABCDEF").last_odd()
+
+
+class TestPasswordSession(object):
+    def test_feed(self):
+        session = PasswordSession()
+        assert len(session.remaining) == 35
+        assert session.feed("tpw") == ["place", "plant", "point", "their",
+                                       "there", "these", "thing", "think",
+                                       "three", "water", "where", "which",
+                                       "world", "would", "write"]
+        assert session.feed("hlo") == ["place", "plant", "point", "their",
+                                       "there", "these", "thing", "think",
+                                       "three", "where", "which", "world",
+                                       "would"]
+        assert session.feed("ei", position=2) == ["point", "their", "there",
+                                                  "these", "thing", "think",
+                                                  "where", "which"]
+        assert session.feed("rsn") == ["point", "there", "these", "thing",
+                                       "think", "where"]
+        assert session.feed("e") == ["there", "these", "where"]
+        assert session.position == 5
+
+    def test_feed_all(self):
+        session = PasswordSession()
+        assert session.feed_all(["tpw", "hlo", "ei", "rsn", "es"]) == [
+            "there", "these", "where"]
+        assert PasswordSession().feed_all(["xyz"]) == []
+
+    def test_initial(self):
+        assert PasswordSession("wxxxx").remaining == [
+            "water", "where", "which", "world", "would", "write"]
+
+
+class TestMorseDecoder(object):
+    def test_whole_words(self):
+        codes = dict((letter, code) for code, letter in MORSE_LETTERS.items())
+        for word, frequency in FREQUENCIES.items():
+            decoder = MorseDecoder()
+            decoder.feed("".join(codes[letter] for letter in word.upper()))
+            assert decoder.frequency == frequency
+
+    def test_incremental(self):
+        decoder = MorseDecoder()
+        assert decoder.feed("-...") == ("beats", "bistro", "bombs", "boxes",
+                                        "break", "brick")
+        assert decoder.frequency is None
+        assert decoder.feed(" .-.") == ("break", "brick")
+        assert decoder.feed("..--") == ("break",)
+        assert decoder.frequency == "3.572"
+
+    def test_no_match(self):
+        decoder = MorseDecoder()
+        assert decoder.feed("-----") == ()
+        assert decoder.feed(".") == ()
+
+
+def timing(word, unit=1.0, loops=2, jitter=0.0, drift=1.0, seed=0):
+    """Time the looping signal of a word, as the light would show it."""
+    rng = random.Random(seed)
+    codes = dict((letter, code) for code, letter in MORSE_LETTERS.items())
+    for _ in range(loops):
+        for i, letter in enumerate(word.upper()):
+            for j, symbol in enumerate(codes[letter]):
+                if j:
+                    yield False, unit * rng.uniform(1 - jitter, 1 + jitter)
+                yield True, (unit * (1 if symbol == "." else 3) *
+                             rng.uniform(1 - jitter, 1 + jitter))
+            yield False, (unit * (3 if i < len(word) - 1 else 7) *
+                          rng.uniform(1 - jitter, 1 + jitter))
+            unit *= drift
+
+
+class TestMorseTiming(object):
+    def test_whole_words(self):
+        for word, frequency in FREQUENCIES.items():
+            decoder = MorseTiming(unit=1.0, synchronized=True)
+            assert decoder.feed_all(timing(word, loops=1)) == frequency
+
+    def test_from_anywhere(self):
+        for seed, (word, frequency) in enumerate(sorted(FREQUENCIES.items())):
+            events = itertools.islice(timing(word, unit=0.12, loops=3,
+                                             jitter=0.25, drift=1.02,
+                                             seed=seed), seed % 7, None)
+            assert MorseTiming().feed_all(events) == frequency
+
+    def test_stops_early(self):
+        events = timing("shell", loops=10 ** 9)
+        decoder = MorseTiming()
+        assert decoder.feed_all(events) == "3.505"
+        assert decoder.done
+        # The rest of the stream is left unread.
+        assert next(events) is not None
+
+    def test_restart(self):
+        decoder = MorseTiming(synchronized=True, unit=1.0)
+        for lit, duration in [(True, 3), (False, 1), (True, 3), (False, 1),
+                              (True, 3), (False, 1), (True, 3)]:
+            decoder.feed(lit, duration)
+        assert decoder.decoder.candidates == ()
+        assert decoder.feed_all(timing("vector")) == "3.595"
+        assert decoder.restarts == 1
+
+    def test_bomb(self):
+        bomb = Bomb("IPZCV0", 1)
+        assert bomb.morse_timing(timing("brick", unit=0.2, loops=3)) == "3.575"
+        assert bomb.morse_timing([(True, 1)]) == sorted(FREQUENCIES.values())
+
+
+class TestSolveMemory(object):
+    displays = [3, 2, 1, 4, 4]
+    labels = [[4, 1, 2, 3], [1, 3, 4, 2], [4, 2, 3, 1], [2, 4, 3, 1],
+              [1, 4, 3, 2]]
+    presses = [MemoryStage("THIRD", "2"), MemoryStage("THIRD", "4"),
+               MemoryStage("FIRST", "4"), MemoryStage("THIRD", "3"),
+               MemoryStage("SECOND", "4")]
+
+    def test_solve(self):
+        assert solve_memory(self.displays, self.labels) == self.presses
+
+    def test_matches_machine(self):
+        machine = Bomb("IPZCV0", 1).memory_machine()
+        for display, buttons, press in zip(self.displays, self.labels,
+                                           self.presses):
+            machine.send(str(display))
+            if machine.prompt == "Button label: ":
+                machine.send(press.label)
+            else:
+                machine.send(press.position)
+        assert machine.pressed == self.presses
+
+    def test_batch(self):
+        games = [(self.displays, self.labels),
+                 ("44444", ["1234"] * 5)]
+        assert solve_memory_batch(games) == [self.presses, [
+            MemoryStage("FOURTH", "4")] * 5]
+
+    def test_missing_label(self):
+        with pytest.raises(ValueError):
+            solve_memory("31", [[4, 1, 2, 3], [1, 3, 2, 2]])
+
+    def test_unknown_display(self):
+        with pytest.raises(ValueError, match="Stage 3: no rule for display 5"):
+            solve_memory("115", [[1, 2, 3, 4]] * 3)
+
+
+class TestAnswerFile(object):
+    def setup_method(self, method):
+        self.original = solver.ANSWERS_PATH
+
+    def teardown_method(self, method):
+        solver.open_answers(self.original)
+
+    def test_compiled(self, tmpdir):
+        path = solver.write_answers(str(tmpdir.join("solver.answers")))
+        assert solver.open_answers(path)
+        for last_odd, table in enumerate(solver._wires_table()):
+            for n_wires in range(3, 7):
+                for code in itertools.product(WIRE_COLOURS, repeat=n_wires):
+                    wires = "".join(code)
+                    assert table[wires] == _solve_wires(wires, last_odd)
+        with pytest.raises(KeyError):
+            solver._wires_table()[0]["wbg"]
+        for index in range(9):
+            assert ([tuple(hops) for hops in solver._maze_routing_table(index)]
+                    == list(solver._build_maze_routes(index)))
+        masks = solver._build_password_masks()
+        index = solver._password_index()
+        for position in range(6):
+            for letter in "aqzA?":
+                assert (index.get((position, letter), 0) ==
+                        masks.get((position, letter), 0))
+
+        bomb = Bomb("IPZCV1", 1)
+        assert bomb.wires("WBK") == "SECOND"
+        assert bomb.maze((0, 1), (0, 0), (0, 1)) == ["down"]
+        assert bomb.passwords_machine().feed_all(
+            ["tpw", "hlx", "eai", "rno", "ees"]) == ["there", "where"]
+
+    def test_stale(self, tmpdir):
+        path = solver.write_answers(str(tmpdir.join("solver.answers")))
+        with open(path, "r+b") as answers:
+            answers.seek(12)
+            answers.write(b"stale")
+        assert not solver.open_answers(path)
+        assert isinstance(solver._wires_table()[0], type(solver._freeze({})))
+
+    def test_missing(self, tmpdir):
+        assert not solver.open_answers(str(tmpdir.join("missing")))
+        assert Bomb("IPZCV0", 1).wires("wbk") == "SECOND"
+
 
 class TestBomb(object):
     def setup_method(self, method):
@@ -38,6 +249,57 @@ class TestBomb(object):
     def test_initialization(self):
         assert self.bomb.n_strikes == 0
 
+    def test_edgework(self):
+        assert not hasattr(self.bomb, "__dict__")
+        assert self.bomb.serial_number.number == "IPZCV0"
+        assert self.bomb.n_batteries == 2
+        assert self.bomb.has_parallel
+        assert not self.bomb.frk
+        assert not self.bomb.car
+        self.bomb.n_batteries = 5
+        self.bomb.car = True
+        self.bomb.has_parallel = False
+        assert self.bomb.n_batteries == 5
+        assert self.bomb.car
+        assert not self.bomb.has_parallel
+        assert not self.bomb.frk
+        self.bomb.serial_number = "DS50L7"
+        assert self.bomb.serial_number.last_odd()
+
+    def test_shared_tables(self, monkeypatch):
+        monkeypatch.setattr(solver, "SPECIALIZATION_CACHE_SIZE", 2)
+        solver.clear_specializations()
+        first = Bomb("IPZCV0", 2, has_parallel=True)
+        second = Bomb("AB1CD2", 2, has_parallel=True)
+        assert first._tables is second._tables
+        assert solver.specialization_stats() == {
+            "hits": 1, "misses": 1, "evictions": 0, "size": 1, "capacity": 2}
+        second.frk = True
+        assert first._tables is not second._tables
+        Bomb("IPZCV1", 2)
+        assert solver.specialization_stats()["evictions"] == 1
+        assert Bomb("IPZCV0", 2, has_parallel=True).wires("yby") == "SECOND"
+        assert solver.specialization_stats() == {
+            "hits": 1, "misses": 4, "evictions": 2, "size": 2, "capacity": 2}
+
+    def test_serial_changed_in_place(self):
+        bomb = Bomb("IPZCV0", 2)
+        assert bomb.wires("kkkkk") == "FIRST"
+        assert bomb.simon_machine().send("b") == "r"
+        assert bomb.complicated_panel(["0r0"]) == ["CUT"]
+        bomb.serial_number.number = "IPZCV1"
+        assert bomb.wires("kkkkk") == "FOURTH"
+        assert bomb.complicated_panel(["0r0"]) == ["DO NOT CUT"]
+        assert bomb.complicated_machine().send("0r0") == "DO NOT CUT"
+        bomb.serial_number.number = "BCDFG2"
+        assert bomb.simon_machine().send("b") == "y"
+
+    def test_no_digits(self):
+        bomb = Bomb("ABCDEF", 1)
+        with pytest.raises(IndexError):
+            bomb.wires("wbk")
+        assert bomb.complicated_panel(["0w0"]) == ["CUT"]
+
     def test_strike(self):
         self.bomb.strike()
         assert self.bomb.n_strikes == 1
@@ -47,6 +309,19 @@ class TestBomb(object):
     def test_wires(self):
         assert self.bomb.wires("yby") == "SECOND"
 
+    def test_wires_matches_rules(self):
+        odd_bomb = Bomb("IPZCV1", 2)
+        for n_wires in range(3, 7):
+            for code in itertools.product(WIRE_COLOURS, repeat=n_wires):
+                wires = "".join(code)
+                assert self.bomb.wires(wires) == _solve_wires(wires, False)
+                assert odd_bomb.wires(wires) == _solve_wires(wires, True)
+
+    def test_wires_batch(self):
+        panels = ["yby", "WBK", "rrbk", "kkkkk", "rrrrrr"]
+        assert (self.bomb.wires_batch(panels) ==
+                [self.bomb.wires(wires) for wires in panels])
+
     def test_button(self):
         assert self.bomb.button("detonate", "r") == "PRESS and immediately RELEASE"
 
@@ -54,31 +329,242 @@ class TestBomb(object):
         assert self.bomb.keypad("six", "para", "an", "smile") == ["six", "para", "an", "smile"]
         assert self.bomb.keypad("six", "ae", "i", "psi") == ["six", "ae", "psi", "i"]
 
+    def test_keypad_aliases(self):
+        assert self.bomb.keypad("Butt", "copyright", "zhe", "star") == [
+            "copyright", "Butt", "zhe", "star"]
+        assert self.bomb.keypad("q", "moon") == ["q", "moon"]
+
+    def test_keypad_invalid(self):
+        with pytest.raises(ValueError):
+            self.bomb.keypad("q", "at", "psi", "i")
+        with pytest.raises(ValueError):
+            self.bomb.keypad("q", "at", "lambda", "spoon")
+
+    def test_keypad_batch(self):
+        quadruples = [("six", "para", "an", "smile"), ("6", "eh", "neq", "ae")]
+        assert self.bomb.keypad_batch(quadruples) == [
+            ["six", "para", "an", "smile"], ["6", "eh", "neq", "ae"]]
+        with pytest.raises(ValueError) as error:
+            self.bomb.keypad_batch(quadruples + [("q", "at", "psi", "i")])
+        assert str(error.value).startswith("Module 2:")
+
     def test_simon_says(self):
-        pass
+        machine = self.bomb.simon_machine()
+        assert machine.send("r") == "b"
+        self.bomb.strike()
+        assert machine.send("r") == "y"
+        assert not machine.done
+
+    def test_simon_sequence(self):
+        corrections = []
+        machine = self.bomb.simon_machine(callback=corrections.append)
+        assert machine.send("rgb") == "byr"
+        assert machine.send("y g") == "gy"
+        assert machine.correction is None
+        self.bomb.strike()
+        assert machine.correction == corrections[0] == "ybgrb"
+        assert machine.send("r") == "y"
+        self.bomb.strike()
+        assert corrections[1] == "gyrbyg"
+        with pytest.raises(ValueError):
+            machine.send("x")
+
+    def test_simon_watchers(self):
+        for _ in range(100):
+            self.bomb.simon_machine()
+        machine = self.bomb.simon_machine()
+        # CPython frees the machines as soon as they are dropped.
+        assert len(self.bomb._watchers) <= 2
+        self.bomb.strike()
+        assert machine.send("r") == "y"
+
+    def test_simon_no_vowel(self):
+        machine = Bomb("DS50L8", 1).simon_machine()
+        assert machine.translate("rbgy") == "bygr"
+        assert machine.sequence == ""
 
     def test_whos_on_first(self):
-        pass
+        machine = self.bomb.whos_machine()
+        assert machine.prompt == "Display: "
+        assert machine.send("YOU'RE") == "MIDDLE RIGHT"
+        assert machine.prompt == "Button label: "
+        assert machine.send("first") == ("LEFT, OKAY, YES, MIDDLE, NO, RIGHT, "
+                                         "NOTHING, UHHH, WAIT, READY, BLANK, "
+                                         "WHAT, PRESS, FIRST")
+        assert machine.send("") == "BOTTOM LEFT"
+
+    def test_machine_errors(self):
+        machine = self.bomb.whos_machine()
+        machine.send("ready")
+        with pytest.raises(KeyError):
+            machine.send("bogus")
+        assert machine.prompt == "Button label: "
+        machine = self.bomb.complicated_machine()
+        with pytest.raises(ValueError):
+            machine.send("9z9")
+        assert (machine.wire, machine.prompt) == (
+            1, "Wire 1. led, colour, star: ")
+
+    def test_whos_step(self):
+        labels = ["YES", "FIRST", "WHAT", "UHHH", "LEFT", "NO"]
+        # Read MIDDLE LEFT, "WHAT", whose list starts with "UHHH".
+        assert self.bomb.whos_step("THEY ARE", labels) == "MIDDLE RIGHT"
+        # Read TOP LEFT, "YES", whose list starts with "OKAY, RIGHT, UHHH".
+        assert self.bomb.whos_step("ur", labels) == "MIDDLE RIGHT"
+        # Read BOTTOM RIGHT, "NO", whose list starts with "BLANK, UHHH".
+        assert self.bomb.whos_step("cee", [label.lower() for label in labels]
+                                   ) == "MIDDLE RIGHT"
+        # Read BOTTOM LEFT, "LIKE", whose list starts with "YOU'RE, NEXT".
+        assert self.bomb.whos_step("", ["U", "UR", "YOU", "DONE", "LIKE",
+                                        "NEXT"]) == "BOTTOM RIGHT"
+        # Read TOP RIGHT, "YOU", whose list has "UR" before "HOLD".
+        assert self.bomb.whos_step("first", ["U", "YOU", "UR", "DONE",
+                                             "LIKE", "HOLD"]) == "MIDDLE LEFT"
+        with pytest.raises(ValueError):
+            self.bomb.whos_step("ur", ["NOPE"] * 6)
 
     def test_memory(self):
-        pass
+        machine = self.bomb.memory_machine()
+        steps = [("3", "THIRD"), ("2", None), ("2", "THIRD"), ("4", None),
+                 ("1", "4"), ("FIRST", None), ("4", "THIRD"), ("3", None),
+                 ("4", "4"), ("SECOND", None)]
+        for observation, instruction in steps:
+            assert not machine.done
+            assert machine.send(observation) == instruction
+        assert machine.done
+        assert [(press.position, press.label)
+                for press in machine.pressed] == [
+            ("THIRD", "2"), ("THIRD", "4"), ("FIRST", "4"), ("THIRD", "3"),
+            ("SECOND", "4")]
+
+    def test_memory_interactive(self, monkeypatch, capsys):
+        answers = iter(["3", "2", "2", "4", "1", "FIRST", "4", "3", "4",
+                        "SECOND"])
+        monkeypatch.setattr("builtins.input", lambda prompt: next(answers))
+        self.bomb.memory()
+        assert capsys.readouterr().out.split() == ["THIRD", "THIRD", "4",
+                                                   "THIRD", "4"]
 
     def test_morse(self):
-        pass
+        machine = self.bomb.morse_machine()
+        assert machine.send("-...") is None
+        assert machine.send("r") is None
+        assert machine.send("i") == "3.575"
+        assert machine.done
+
+    def test_morse_rotated(self):
+        codes = dict((letter, code) for code, letter in MORSE_LETTERS.items())
+        worst = self.bomb.morse_machine().remaining
+        longest = 0
+        for word, frequency in FREQUENCIES.items():
+            for start in range(len(word)):
+                machine = self.bomb.morse_machine()
+                letters = itertools.cycle(word[start:] + word[:start])
+                for n_letters in itertools.count(1):
+                    remaining = machine.remaining
+                    letter = next(letters)
+                    result = machine.send(
+                        codes[letter.upper()] if n_letters % 2 else letter)
+                    assert machine.remaining <= remaining - 1
+                    if result is not None:
+                        break
+                assert result == frequency
+                longest = max(longest, n_letters)
+        assert longest == worst
+
+    def test_morse_from_start(self):
+        machine = self.bomb.morse_machine(from_start=True)
+        assert machine.remaining == 3
+        assert machine.send("s") is None
+        assert machine.send("t") is None
+        assert machine.remaining == 1
+        assert machine.send("r") == "3.545"
+
+    def test_morse_no_match(self):
+        machine = self.bomb.morse_machine()
+        assert machine.send("q") is None
+        assert machine.active == set()
+        assert machine.remaining is None
+        assert not machine.done
+
+    def test_morse_interactive(self, monkeypatch):
+        letters = iter(["...", "t", "i"])
+        monkeypatch.setattr("builtins.input", lambda prompt: next(letters))
+        assert self.bomb.morse() == ("3.592", " Mhz")
+
+    def test_morse_stream(self):
+        assert self.bomb.morse_stream(".........-..") == "3.505"
+        assert self.bomb.morse_stream("...-.") == ["3.545", "3.582", "3.592",
+                                                   "3.595"]
 
     def test_complicated(self):
-        pass
+        machine = self.bomb.complicated_machine()
+        assert machine.send("000") == "CUT"
+        assert machine.prompt == "Wire 2. led, colour, star: "
+        assert machine.send("0b0") == "CUT"
+        assert machine.send("1b1") == "CUT"
+        assert machine.send("1s1") == "DO NOT CUT"
+        machine = Bomb("IPZCV1", 1).complicated_machine()
+        assert machine.send("0b0") == "DO NOT CUT"
+
+    def test_complicated_panel(self):
+        assert self.bomb.complicated_panel(["000", "0b0", "1b1", "1s1"]) == [
+            "CUT", "CUT", "CUT", "DO NOT CUT"]
+        self.bomb.serial_number = "IPZCV1"
+        assert self.bomb.complicated_panel(["0b0", "001"]) == [
+            "DO NOT CUT", "CUT"]
+        self.bomb.n_batteries = 1
+        assert self.bomb.complicated_panel(["1r0", "0r0"]) == [
+            "DO NOT CUT", "DO NOT CUT"]
+        self.bomb.has_parallel = False
+        assert self.bomb.complicated_panel(["0s1"]) == ["DO NOT CUT"]
+
+    def test_complicated_panel_array(self):
+        np = pytest.importorskip("numpy")
+        panels = np.array([[0, 2, 13], [6, 15, 9]])
+        assert self.bomb.complicated_panel(panels).tolist() == [
+            [True, True, True], [True, False, True]]
 
     def test_sequences(self):
-        pass
+        machine = self.bomb.sequences_machine()
+        assert machine.send("ra") == "DO NOT CUT"
+        assert machine.send("rb") == "CUT"
+        assert machine.send("kc") == "CUT"
+        assert machine.send("ba") == "DO NOT CUT"
 
     def test_maze(self):
         assert (self.bomb.maze((4, 2), (5, 0), (2, 4)) ==
                 ["left", "down", "left", "left", "left", "left", "down",
                  "right", "down", "right", "right", "down", "left"])
 
-    def test_passwords(self):
-        pass
+    def test_maze_many(self):
+        queries = [((4, 2), (5, 0)), ((0, 0), (0, 0)), ((5, 0), (4, 2))]
+        routes = self.bomb.maze_many((2, 4), queries)
+        assert routes == [self.bomb.maze((2, 4), start, target)
+                          for start, target in queries]
+        assert routes[1] == []
+        assert len(routes[2]) == len(routes[0])
+
+    def test_maze_not_found(self):
+        assert (self.bomb.maze((5, 5), (0, 0), (1, 1)) ==
+                "Error: Maze not found!")
+
+    def test_maze_outside(self):
+        for points in (((0, 1), (6, 0), (0, 0)), ((0, 1), (0, 0), (7, 7)),
+                       ((0, 1), (-1, 0), (0, 0)), ((6, 1), (0, 0), (0, 0))):
+            with pytest.raises(ValueError):
+                self.bomb.maze(*points)
+        with pytest.raises(ValueError):
+            self.bomb.maze_many((0, 1), [((0, 0), (0, 6))])
+        with pytest.raises(ValueError, match="No maze"):
+            self.bomb.maze_many((1, 1), [((0, 0), (1, 0))])
+        assert self.bomb.maze((1, 1), (0, 0), (1, 0)) == (
+            "Error: Maze not found!")
+
+    def test_passwords(self, monkeypatch):
+        columns = iter(["tpw", "hlo", "ei", "rsn", "es"])
+        monkeypatch.setattr("builtins.input", lambda prompt: next(columns))
+        assert self.bomb.passwords("w") == ["where"]
 
     def test_venting(self):
         assert self.bomb.venting() == "YES"
@@ -88,3 +574,81 @@ class TestBomb(object):
 
     def test_knob(self):
         assert self.bomb.knob("000010") == "LEFT"
+
+    def test_solve_all(self):
+        plan = self.bomb.solve_all([
+            {"module": "simon"},
+            {"module": "wires", "args": ["yby"]},
+            {"module": "button", "args": ["hold", "b"]},
+            {"module": "knob", "args": ["101010", "011011"]},
+            {"module": "morse", "observations": ["b", "r", "i"]},
+            {"module": "memory", "observations": ["2"]},
+            {"module": "dance"},
+            "wires",
+        ])
+        assert [(step.index, step.module, step.needs_input)
+                for step in plan] == [
+            (1, "wires", False), (3, "knob", False), (4, "morse", False),
+            (6, "dance", False), (7, None, False), (0, "simon", True),
+            (2, "button", True), (5, "memory", True)]
+        assert [step.answer for step in plan[:3]] == [
+            "SECOND", "UP", [None, None, "3.575"]]
+        assert plan[3].error == "Unknown module: dance"
+        assert plan[4].error == "Not a module: 'wires'"
+        simon, button, memory = plan[5:]
+        assert simon.machine.send("r") == "b"
+        assert (button.answer, button.prompt) == ("HOLD", "Strip colour: ")
+        assert button.machine is None
+        assert memory.answer == ["SECOND"]
+        assert memory.prompt == memory.machine.prompt == "Button label: "
+        assert "input" not in vars(solver)
+
+    def test_solve_all_executor(self):
+        modules = [{"module": "wires", "args": [wires]}
+                   for wires in ("yby", "wbk", "kkkk", "ww")]
+        modules.append({"module": "knob", "args": ["101010"]})
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            plan = self.bomb.solve_all(modules, executor)
+        assert [repr(step) for step in plan] == [
+            repr(step) for step in self.bomb.solve_all(modules)]
+        assert plan[3].error == "ValueError: No Wires rules for 2 wires"
+        assert plan[4].prompt == "Bottom row: "
+
+    def test_solve_all_missing_observation(self):
+        plan = self.bomb.solve_all([
+            {"module": "knob", "args": ["101010", None]},
+            {"module": "button", "args": ["abort", "b", None]},
+            {"module": "button", "args": ["detonate", "r", None]}])
+        assert [(step.module, step.answer, step.prompt) for step in plan] == [
+            ("button", "PRESS and immediately RELEASE", None),
+            ("knob", None, "Bottom row: "),
+            ("button", "HOLD", "Strip colour: ")]
+        assert "input" not in vars(solver)
+
+    def test_solve_module(self):
+        assert solver.solve_module(self.bomb, "knob",
+                                   ["101010", "011011"]) == "UP"
+        for module, args in (("knob", ["101010", None]),
+                             ("button", ["abort", "b", None])):
+            with pytest.raises(ValueError):
+                solver.solve_module(self.bomb, module, args)
+        with pytest.raises(ValueError):
+            solver.solve_module(self.bomb, "simon")
+        with pytest.raises(ValueError):
+            solver.start_module(self.bomb, "simon", [print])
+        with pytest.raises(ValueError):
+            solver.start_module(self.bomb, "wires")
+        assert solver.start_module(self.bomb, "passwords", ["w"]).prompt == (
+            "All possible in position 0: ")
+        assert "input" not in vars(solver)
+
+    def test_tables_frozen(self):
+        with pytest.raises(TypeError):
+            FREQUENCIES["shell"] = "3.600"
+        with pytest.raises(TypeError):
+            SIMON_MAPS[True][0]["r"] = "r"
+        bomb = Bomb("IPZCV0", 1)
+        assert bomb.keypad("q", "at", "lambda", "moon") == [
+            "q", "at", "lambda", "moon"]
+        with pytest.raises(TypeError):
+            solver._keypad_index()["q"] = 0
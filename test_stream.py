@@ -0,0 +1,68 @@
+# (C) 2015  Jean Nassar
+# Released under the GNU General Public License, version 3
+import io
+
+import solver
+import stream
+from solver import Bomb, MACHINES, SOLVERS
+
+
+def replay(*lines):
+    output = io.StringIO()
+    stream.run(lines, output)
+    return output.getvalue().splitlines()
+
+
+class TestStream(object):
+    def test_every_module(self):
+        for module in SOLVERS + MACHINES:
+            assert module in stream.COMMANDS
+
+    def test_solvers(self):
+        bomb = Bomb("IPZCV0", 2, has_parallel=True)
+        assert replay(
+            "new IPZCV0 2 parallel",
+            "wires yby",
+            "maze 0,1 0,0 0,1",
+            "keypad_batch q,at,lambda,moon",
+            'whos_step "they are" yes okay what middle left press',
+            "knob 101010 011011",
+        ) == ["OK", "SECOND", "down", "q, at, lambda, moon",
+              bomb.whos_step("they are", ["yes", "okay", "what", "middle",
+                                          "left", "press"]),
+              "UP"]
+
+    def test_machines(self):
+        assert replay(
+            "new IPZCV0 2",
+            "# Simon Says, with a strike halfway.",
+            "simon r",
+            "",
+            "strike",
+            "simon r",
+            "morse b r",
+            "morse i",
+            "morse s",
+        ) == ["OK", "b", "1 | y", "y", "- | -", "3.575", "-"]
+
+    def test_errors(self):
+        assert replay("wires wbk", "new IPZCV0", "new IPZCV0 1 usb",
+                      "dance", "new IPZCV0 1", "knob 101010",
+                      "button abort b", "wires wbk") == [
+            "error: ValueError: No bomb: start one with new",
+            "error: ValueError: Usage: new SERIAL BATTERIES [parallel] "
+            "[frk] [car]",
+            "error: ValueError: Unknown edgework: usb",
+            "error: Unknown command: dance",
+            "OK",
+            "error: ValueError: The bottom row is needed",
+            "error: ValueError: The strip colour is needed",
+            "SECOND"]
+        assert "input" not in vars(solver)
+
+    def test_new_bomb(self):
+        session = stream.run(["new IPZCV0 1", "simon r", "new IPZCV1 3 frk"],
+                             io.StringIO())
+        assert session.bomb.serial_number.number == "IPZCV1"
+        assert session.bomb.frk
+        assert session.machines == {}